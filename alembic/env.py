@@ -32,6 +32,29 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Article full-text search objects (ARTICLE_SEARCH_DDL in app/models/article.py) are
+# created with raw DDL, not from the models, so autogenerate must not drop them:
+# SQLite's articles_fts FTS5 table and its shadow tables (articles_fts_data, ...),
+# PostgreSQL's generated articles.search_vector column and its GIN index.
+# (The articles_fts_* triggers are never compared by autogenerate.)
+SEARCH_TABLE_PREFIX = "articles_fts"
+SEARCH_COLUMNS = {("articles", "search_vector")}
+SEARCH_INDEXES = {"ix_articles_search_vector"}
+# Cat name / litter code prefix indexes (CAT_PREFIX_INDEX_DDL in app/models/cat.py), raw DDL too:
+# they are on expressions (lower(name) text_pattern_ops, name COLLATE NOCASE) the models can't declare
+PREFIX_INDEXES = {"ix_cats_name_prefix", "ix_cats_litter_code_prefix"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave the database objects created outside the models out of autogenerate."""
+    if type_ == "table" and name.startswith(SEARCH_TABLE_PREFIX):
+        return False
+    if type_ == "column" and (object.table.name, name) in SEARCH_COLUMNS:
+        return False
+    if type_ == "index" and (name in SEARCH_INDEXES or name in PREFIX_INDEXES):
+        return False
+    return True
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -53,6 +76,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -88,7 +112,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,28 @@
+"""add_media_asset_dominant_color
+
+Revision ID: 07ee0c21fc37
+Revises: 8ae5b25a3ea6
+Create Date: 2026-10-18 15:20:36.214870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '07ee0c21fc37'
+down_revision: Union[str, Sequence[str], None] = '8ae5b25a3ea6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('media_assets', sa.Column('dominant_color', sa.String(length=7), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('media_assets', 'dominant_color')
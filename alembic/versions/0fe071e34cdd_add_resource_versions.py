@@ -0,0 +1,39 @@
+"""add_resource_versions
+
+Revision ID: 0fe071e34cdd
+Revises: 610990ea0244
+Create Date: 2026-10-18 16:58:44.102937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0fe071e34cdd'
+down_revision: Union[str, Sequence[str], None] = '610990ea0244'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ['cats', 'articles', 'article_images', 'adoption_questions', 'adoption_requests', 'media_assets']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    resource_versions = op.create_table(
+        'resource_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # One row per table up front, so writers only ever UPDATE
+    op.bulk_insert(resource_versions, [{'name': name, 'version': 1} for name in VERSIONED_TABLES])
+    op.execute("UPDATE resource_versions SET changed_at = CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('resource_versions')
@@ -0,0 +1,73 @@
+"""add_article_search_index
+
+Revision ID: 4d8edee191ac
+Revises: 0fe071e34cdd
+Create Date: 2026-10-18 11:52:07.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d8edee191ac'
+down_revision: Union[str, Sequence[str], None] = '0fe071e34cdd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same as ARTICLE_SEARCH_DDL in app/models/article.py (used by create_all)
+UPGRADE = {
+    'postgresql': [
+        """ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(content, '')), 'B')
+            ) STORED""",
+        "CREATE INDEX IF NOT EXISTS ix_articles_search_vector ON articles USING GIN (search_vector)",
+    ],
+    'sqlite': [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, content, content='articles', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2')""",
+        """CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, content ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO articles_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END""",
+        "INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')",
+    ],
+}
+
+DOWNGRADE = {
+    'postgresql': [
+        "DROP INDEX IF EXISTS ix_articles_search_vector",
+        "ALTER TABLE articles DROP COLUMN IF EXISTS search_vector",
+    ],
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS articles_fts_insert",
+        "DROP TRIGGER IF EXISTS articles_fts_delete",
+        "DROP TRIGGER IF EXISTS articles_fts_update",
+        "DROP TABLE IF EXISTS articles_fts",
+    ],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The generated column / FTS5 table is computed by the database on every write
+    for statement in UPGRADE.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in DOWNGRADE.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
@@ -0,0 +1,50 @@
+"""add_image_fingerprints
+
+Revision ID: 5fbb5c21ca6b
+Revises: 7c7e541d47d2
+Create Date: 2026-10-18 13:12:05.417209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5fbb5c21ca6b'
+down_revision: Union[str, Sequence[str], None] = '7c7e541d47d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'image_fingerprints',
+        sa.Column('source_hash', sa.String(length=64), nullable=False),
+        sa.Column('asset_hash', sa.String(length=64), nullable=False),
+        sa.Column('phash', sa.String(length=16), nullable=False),
+        sa.Column('phash_band_0', sa.Integer(), nullable=False),
+        sa.Column('phash_band_1', sa.Integer(), nullable=False),
+        sa.Column('phash_band_2', sa.Integer(), nullable=False),
+        sa.Column('phash_band_3', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('source_hash')
+    )
+    op.create_index(op.f('ix_image_fingerprints_asset_hash'), 'image_fingerprints', ['asset_hash'], unique=False)
+    op.create_index(op.f('ix_image_fingerprints_phash_band_0'), 'image_fingerprints', ['phash_band_0'], unique=False)
+    op.create_index(op.f('ix_image_fingerprints_phash_band_1'), 'image_fingerprints', ['phash_band_1'], unique=False)
+    op.create_index(op.f('ix_image_fingerprints_phash_band_2'), 'image_fingerprints', ['phash_band_2'], unique=False)
+    op.create_index(op.f('ix_image_fingerprints_phash_band_3'), 'image_fingerprints', ['phash_band_3'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_image_fingerprints_phash_band_3'), table_name='image_fingerprints')
+    op.drop_index(op.f('ix_image_fingerprints_phash_band_2'), table_name='image_fingerprints')
+    op.drop_index(op.f('ix_image_fingerprints_phash_band_1'), table_name='image_fingerprints')
+    op.drop_index(op.f('ix_image_fingerprints_phash_band_0'), table_name='image_fingerprints')
+    op.drop_index(op.f('ix_image_fingerprints_asset_hash'), table_name='image_fingerprints')
+    op.drop_table('image_fingerprints')
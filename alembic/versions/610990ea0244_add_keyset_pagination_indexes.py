@@ -0,0 +1,33 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: 610990ea0244
+Revises: 07ee0c21fc37
+Create Date: 2026-10-18 16:12:09.418263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '610990ea0244'
+down_revision: Union[str, Sequence[str], None] = '07ee0c21fc37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cats_created_at_id', 'cats', ['created_at', 'id'], unique=False)
+    op.create_index('ix_articles_created_at_id', 'articles', ['created_at', 'id'], unique=False)
+    op.create_index('ix_adoption_requests_submitted_at_id', 'adoption_requests',
+                    ['submitted_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_adoption_requests_submitted_at_id', table_name='adoption_requests')
+    op.drop_index('ix_articles_created_at_id', table_name='articles')
+    op.drop_index('ix_cats_created_at_id', table_name='cats')
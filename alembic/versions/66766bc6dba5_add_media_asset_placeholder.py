@@ -0,0 +1,28 @@
+"""add_media_asset_placeholder
+
+Revision ID: 66766bc6dba5
+Revises: 5fbb5c21ca6b
+Create Date: 2026-10-18 14:02:41.583106
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '66766bc6dba5'
+down_revision: Union[str, Sequence[str], None] = '5fbb5c21ca6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('media_assets', sa.Column('placeholder', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('media_assets', 'placeholder')
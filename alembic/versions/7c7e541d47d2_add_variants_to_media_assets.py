@@ -0,0 +1,28 @@
+"""add_variants_to_media_assets
+
+Revision ID: 7c7e541d47d2
+Revises: 9349da85158a
+Create Date: 2026-10-18 11:04:27.880513
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c7e541d47d2'
+down_revision: Union[str, Sequence[str], None] = '9349da85158a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('media_assets', sa.Column('variants', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('media_assets', 'variants')
@@ -0,0 +1,53 @@
+"""add_image_encode_profiles
+
+Revision ID: 8ae5b25a3ea6
+Revises: 66766bc6dba5
+Create Date: 2026-10-18 14:41:17.902634
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8ae5b25a3ea6'
+down_revision: Union[str, Sequence[str], None] = '66766bc6dba5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('media_assets', sa.Column('optimized_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_media_assets_optimized_at'), 'media_assets', ['optimized_at'], unique=False)
+    # Existing variants were all encoded with the slow settings already
+    op.execute("UPDATE media_assets SET optimized_at = CURRENT_TIMESTAMP WHERE variants IS NOT NULL")
+
+    op.create_table(
+        'image_encodes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('asset_hash', sa.String(length=64), nullable=False),
+        sa.Column('profile', sa.String(length=10), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=False),
+        sa.Column('bytes', sa.Integer(), nullable=False),
+        sa.Column('encode_ms', sa.Float(), nullable=False),
+        sa.Column('previous_bytes', sa.Integer(), nullable=True),
+        sa.Column('swapped', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_image_encodes_id'), 'image_encodes', ['id'], unique=False)
+    op.create_index(op.f('ix_image_encodes_asset_hash'), 'image_encodes', ['asset_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_image_encodes_asset_hash'), table_name='image_encodes')
+    op.drop_index(op.f('ix_image_encodes_id'), table_name='image_encodes')
+    op.drop_table('image_encodes')
+    op.drop_index(op.f('ix_media_assets_optimized_at'), table_name='media_assets')
+    op.drop_column('media_assets', 'optimized_at')
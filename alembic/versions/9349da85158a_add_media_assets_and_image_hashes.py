@@ -0,0 +1,51 @@
+"""add_media_assets_and_image_hashes
+
+Revision ID: 9349da85158a
+Revises: f85b74276a0a
+Create Date: 2026-10-18 10:12:41.513208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9349da85158a'
+down_revision: Union[str, Sequence[str], None] = 'f85b74276a0a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'media_assets',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('ext', sa.String(length=10), nullable=False),
+        sa.Column('content_type', sa.String(length=50), nullable=False),
+        sa.Column('byte_size', sa.Integer(), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True),
+                  server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('hash')
+    )
+    op.add_column('cats', sa.Column('photo_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_cats_photo_hash'), 'cats', ['photo_hash'], unique=False)
+    op.add_column('articles', sa.Column('featured_image_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_articles_featured_image_hash'), 'articles', ['featured_image_hash'], unique=False)
+    op.add_column('article_images', sa.Column('image_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_article_images_image_hash'), 'article_images', ['image_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_article_images_image_hash'), table_name='article_images')
+    op.drop_column('article_images', 'image_hash')
+    op.drop_index(op.f('ix_articles_featured_image_hash'), table_name='articles')
+    op.drop_column('articles', 'featured_image_hash')
+    op.drop_index(op.f('ix_cats_photo_hash'), table_name='cats')
+    op.drop_column('cats', 'photo_hash')
+    op.drop_table('media_assets')
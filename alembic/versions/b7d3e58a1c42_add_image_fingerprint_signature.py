@@ -0,0 +1,32 @@
+"""add_image_fingerprint_signature
+
+Revision ID: b7d3e58a1c42
+Revises: e04e0a4ef6f7
+Create Date: 2026-10-18 16:05:12.481930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e58a1c42'
+down_revision: Union[str, Sequence[str], None] = 'e04e0a4ef6f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('image_fingerprints', sa.Column('width', sa.Integer(), nullable=True))
+    op.add_column('image_fingerprints', sa.Column('height', sa.Integer(), nullable=True))
+    op.add_column('image_fingerprints', sa.Column('dominant_color', sa.String(length=7), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('image_fingerprints', 'dominant_color')
+    op.drop_column('image_fingerprints', 'height')
+    op.drop_column('image_fingerprints', 'width')
@@ -0,0 +1,49 @@
+"""add_cat_filter_indexes
+
+Revision ID: e04e0a4ef6f7
+Revises: 4d8edee191ac
+Create Date: 2026-10-18 12:31:46.905133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e04e0a4ef6f7'
+down_revision: Union[str, Sequence[str], None] = '4d8edee191ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same as CAT_PREFIX_INDEX_DDL in app/models/cat.py (used by create_all)
+PREFIX_INDEXES = {
+    'postgresql': [
+        "CREATE INDEX IF NOT EXISTS ix_cats_name_prefix ON cats (lower(name) text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_cats_litter_code_prefix ON cats (lower(litter_code) text_pattern_ops)",
+    ],
+    'sqlite': [
+        "CREATE INDEX IF NOT EXISTS ix_cats_name_prefix ON cats (name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS ix_cats_litter_code_prefix ON cats (litter_code COLLATE NOCASE)",
+    ],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cats_is_available_created_at_id', 'cats', ['is_available', 'created_at', 'id'], unique=False)
+    op.create_index('ix_cats_date_of_birth_id', 'cats', ['date_of_birth', 'id'], unique=False)
+    op.create_index('ix_cats_name_id', 'cats', ['name', 'id'], unique=False)
+    # Case-insensitive prefix search on name / litter code, in the form each database can use
+    for statement in PREFIX_INDEXES.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_cats_litter_code_prefix")
+    op.execute("DROP INDEX IF EXISTS ix_cats_name_prefix")
+    op.drop_index('ix_cats_name_id', table_name='cats')
+    op.drop_index('ix_cats_date_of_birth_id', table_name='cats')
+    op.drop_index('ix_cats_is_available_created_at_id', table_name='cats')
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from ..database import get_db
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
 from ..models import AdoptionQuestion, AdoptionRequest
 from ..schemas import (
     AdoptionQuestionCreate,
@@ -10,20 +11,22 @@ from ..schemas import (
     AdoptionSubmitRequest,
     AdoptionRequestResponse
 )
+from .conditional import Conditional
+from .pagination import Keyset, MAX_PAGE_SIZE
 from typing import List, Optional, Dict
 from datetime import datetime
 import os
 import json
 
 
-async def send_adoption_email_notification(request: AdoptionRequest, custom_answers: Dict[str, str], db: Session):
+async def send_adoption_email_notification(request: AdoptionRequest, custom_answers: Dict[str, str], db: AsyncSession):
     """Send email notification to admin about new adoption request."""
     # Get admin email from environment variable
     admin_email = os.getenv('ADMIN_EMAIL', 'admin@lavandercats.com')
 
     # Get question texts for the email
     question_texts = {}
-    questions = db.query(AdoptionQuestion).all()
+    questions = (await db.scalars(select(AdoptionQuestion))).all()
     for q in questions:
         question_texts[str(q.id)] = q.question_text
 
@@ -84,16 +87,21 @@ Please review this application in the admin panel.
 
 router = APIRouter(prefix="/adoption")
 
+ADOPTION_REQUEST_PAGES = Keyset(AdoptionRequest.submitted_at, AdoptionRequest.id)
+# Requests hold personal data: revalidated, but never kept in the response cache
+ADOPTION_REQUEST_VERSIONS = Conditional("adoption_requests")
+ADOPTION_QUESTION_VERSIONS = Conditional("adoption_questions", cache=True)
+
 
 @router.get("/requests/export")
-async def export_adoption_requests(db: Session = Depends(get_db)):
+async def export_adoption_requests(db: AsyncSession = Depends(get_async_db)):
     """Export adoption requests as CSV."""
     from fastapi.responses import StreamingResponse
     import csv
     import io
 
-    requests = db.query(AdoptionRequest).order_by(
-        AdoptionRequest.submitted_at.desc()).all()
+    requests = (await db.scalars(select(AdoptionRequest).order_by(
+        AdoptionRequest.submitted_at.desc()))).all()
 
     # Create CSV content
     output = io.StringIO()
@@ -132,16 +140,49 @@ async def export_adoption_requests(db: Session = Depends(get_db)):
 
 
 @router.get("/requests", response_model=List[AdoptionRequestResponse])
-async def get_adoption_requests(db: Session = Depends(get_db)):
-    requests = db.query(AdoptionRequest).order_by(
-        AdoptionRequest.submitted_at.desc()).all()
-    return requests
+async def get_adoption_requests(request: Request, response: Response,
+                                status: Optional[str] = None,
+                                limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                                cursor: Optional[str] = None,
+                                db: AsyncSession = Depends(get_async_db)):
+    """
+    Adoption requests, newest first, optionally only those with ?status=.
+    ?limit=N returns one page; pass the X-Next-Cursor header back as ?cursor= for the next.
+    """
+    validators = await ADOPTION_REQUEST_VERSIONS.validators(request, db)
+    if ADOPTION_REQUEST_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    query = select(AdoptionRequest)
+    if status:
+        query = query.where(AdoptionRequest.status == status)
+    requests, next_cursor = await ADOPTION_REQUEST_PAGES.page(db, query, limit, cursor)
+    requests = ADOPTION_REQUEST_VERSIONS.respond(response, requests, validators)
+    return ADOPTION_REQUEST_PAGES.respond(request, response, requests, next_cursor)
+
+
+@router.get("/requests/stats")
+async def get_adoption_request_stats(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Number of requests per status (the admin page's counters, without loading the requests)."""
+    validators = await ADOPTION_REQUEST_VERSIONS.validators(request, db)
+    if ADOPTION_REQUEST_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    response.headers.update(validators)
+    counts = dict((await db.execute(select(AdoptionRequest.status, func.count(AdoptionRequest.id))
+                                    .group_by(AdoptionRequest.status))).all())
+    return {
+        "total": sum(counts.values()),
+        "pending": counts.get("pending", 0),
+        "approved": counts.get("approved", 0),
+        "rejected": counts.get("rejected", 0),
+    }
 
 
 @router.get("/requests/{request_id}", response_model=AdoptionRequestResponse)
-async def get_adoption_request(request_id: int, db: Session = Depends(get_db)):
-    request = db.query(AdoptionRequest).filter(
-        AdoptionRequest.id == request_id).first()
+async def get_adoption_request(request_id: int, db: AsyncSession = Depends(get_async_db)):
+    request = await db.scalar(select(AdoptionRequest).where(
+        AdoptionRequest.id == request_id))
     if not request:
         raise HTTPException(
             status_code=404, detail="Adoption request not found")
@@ -149,9 +190,9 @@ async def get_adoption_request(request_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/requests/{request_id}")
-async def update_adoption_request(request_id: int, request_data: dict, db: Session = Depends(get_db)):
-    db_request = db.query(AdoptionRequest).filter(
-        AdoptionRequest.id == request_id).first()
+async def update_adoption_request(request_id: int, request_data: dict, db: AsyncSession = Depends(get_async_db)):
+    db_request = await db.scalar(select(AdoptionRequest).where(
+        AdoptionRequest.id == request_id))
     if not db_request:
         raise HTTPException(
             status_code=404, detail="Adoption request not found")
@@ -168,26 +209,26 @@ async def update_adoption_request(request_id: int, request_data: dict, db: Sessi
     if rejection_reason is not None:
         db_request.rejection_reason = rejection_reason
 
-    db.commit()
-    db.refresh(db_request)
+    await db.commit()
+    await db.refresh(db_request)
     return {"message": f"Request status updated to {status}"}
 
 
 @router.delete("/requests/{request_id}")
-async def delete_adoption_request(request_id: int, db: Session = Depends(get_db)):
-    db_request = db.query(AdoptionRequest).filter(
-        AdoptionRequest.id == request_id).first()
+async def delete_adoption_request(request_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_request = await db.scalar(select(AdoptionRequest).where(
+        AdoptionRequest.id == request_id))
     if not db_request:
         raise HTTPException(
             status_code=404, detail="Adoption request not found")
 
-    db.delete(db_request)
-    db.commit()
+    await db.delete(db_request)
+    await db.commit()
     return {"message": "Adoption request deleted successfully"}
 
 
 @router.get("/requests/export")
-async def export_adoption_requests(db: Session = Depends(get_db)):
+async def export_adoption_requests(db: AsyncSession = Depends(get_async_db)):
     output = io.StringIO()
     writer = csv.writer(output)
 
@@ -225,7 +266,7 @@ async def export_adoption_requests(db: Session = Depends(get_db)):
 
 
 @router.post("/submit")
-async def submit_adoption_request(request: AdoptionSubmitRequest, db: Session = Depends(get_db)):
+async def submit_adoption_request(request: AdoptionSubmitRequest, db: AsyncSession = Depends(get_async_db)):
     # Honeypot validation - reject if the hidden field is filled (bot detection)
     if request.website:
         raise HTTPException(
@@ -255,8 +296,8 @@ async def submit_adoption_request(request: AdoptionSubmitRequest, db: Session =
     )
 
     db.add(db_request)
-    db.commit()
-    db.refresh(db_request)
+    await db.commit()
+    await db.refresh(db_request)
 
     # Send email notification to admin
     try:
@@ -269,42 +310,50 @@ async def submit_adoption_request(request: AdoptionSubmitRequest, db: Session =
 
 
 @router.get("/form", response_model=List[AdoptionQuestionResponse])
-async def get_adoption_form(db: Session = Depends(get_db)):
+async def get_adoption_form(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """Get questions for the adoption form."""
-    questions = db.query(AdoptionQuestion).order_by(
-        AdoptionQuestion.display_order).all()
-    return questions
+    validators = await ADOPTION_QUESTION_VERSIONS.validators(request, db)
+    if ADOPTION_QUESTION_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    questions = (await db.scalars(select(AdoptionQuestion).order_by(
+        AdoptionQuestion.display_order))).all()
+    return ADOPTION_QUESTION_VERSIONS.respond(response, questions, validators)
 
 
 @router.get("/questions/", response_model=List[AdoptionQuestionResponse])
-async def get_adoption_questions(db: Session = Depends(get_db)):
-    questions = db.query(AdoptionQuestion).order_by(
-        AdoptionQuestion.display_order).all()
-    return questions
+async def get_adoption_questions(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    validators = await ADOPTION_QUESTION_VERSIONS.validators(request, db)
+    if ADOPTION_QUESTION_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    questions = (await db.scalars(select(AdoptionQuestion).order_by(
+        AdoptionQuestion.display_order))).all()
+    return ADOPTION_QUESTION_VERSIONS.respond(response, questions, validators)
 
 
 @router.post("/questions/", response_model=AdoptionQuestionResponse)
-async def create_adoption_question(question: AdoptionQuestionCreate, db: Session = Depends(get_db)):
+async def create_adoption_question(question: AdoptionQuestionCreate, db: AsyncSession = Depends(get_async_db)):
     db_question = AdoptionQuestion(**question.dict())
     db.add(db_question)
-    db.commit()
-    db.refresh(db_question)
+    await db.commit()
+    await db.refresh(db_question)
     return db_question
 
 
 @router.get("/questions/{question_id}", response_model=AdoptionQuestionResponse)
-async def get_adoption_question(question_id: int, db: Session = Depends(get_db)):
-    question = db.query(AdoptionQuestion).filter(
-        AdoptionQuestion.id == question_id).first()
+async def get_adoption_question(question_id: int, db: AsyncSession = Depends(get_async_db)):
+    question = await db.scalar(select(AdoptionQuestion).where(
+        AdoptionQuestion.id == question_id))
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     return question
 
 
 @router.put("/questions/{question_id}", response_model=AdoptionQuestionResponse)
-async def update_adoption_question(question_id: int, question: AdoptionQuestionUpdate, db: Session = Depends(get_db)):
-    db_question = db.query(AdoptionQuestion).filter(
-        AdoptionQuestion.id == question_id).first()
+async def update_adoption_question(question_id: int, question: AdoptionQuestionUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_question = await db.scalar(select(AdoptionQuestion).where(
+        AdoptionQuestion.id == question_id))
     if not db_question:
         raise HTTPException(status_code=404, detail="Question not found")
 
@@ -312,31 +361,31 @@ async def update_adoption_question(question_id: int, question: AdoptionQuestionU
     for key, value in update_data.items():
         setattr(db_question, key, value)
 
-    db.commit()
-    db.refresh(db_question)
+    await db.commit()
+    await db.refresh(db_question)
     return db_question
 
 
 @router.delete("/questions/{question_id}")
-async def delete_adoption_question(question_id: int, db: Session = Depends(get_db)):
-    db_question = db.query(AdoptionQuestion).filter(
-        AdoptionQuestion.id == question_id).first()
+async def delete_adoption_question(question_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_question = await db.scalar(select(AdoptionQuestion).where(
+        AdoptionQuestion.id == question_id))
     if not db_question:
         raise HTTPException(status_code=404, detail="Question not found")
 
-    db.delete(db_question)
-    db.commit()
+    await db.delete(db_question)
+    await db.commit()
     return {"message": "Question deleted successfully"}
 
 
 @router.post("/questions/renumber")
-async def renumber_questions(db: Session = Depends(get_db)):
+async def renumber_questions(db: AsyncSession = Depends(get_async_db)):
     """Renumber all questions sequentially starting from 0."""
-    questions = db.query(AdoptionQuestion).order_by(
-        AdoptionQuestion.display_order, AdoptionQuestion.id).all()
+    questions = (await db.scalars(select(AdoptionQuestion).order_by(
+        AdoptionQuestion.display_order, AdoptionQuestion.id))).all()
 
     for i, question in enumerate(questions):
         question.display_order = i
 
-    db.commit()
+    await db.commit()
     return {"message": f"Renumbered {len(questions)} questions"}
@@ -1,31 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
-from sqlalchemy.orm import Session
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
 from ..models.article import Article, ArticleImage
-from ..schemas.article import ArticleImageResponse, CreateArticleImageRequest
-from ..photo_utils import save_uploaded_photo
-from typing import List
+from ..schemas.article import ArticleImageResponse, ArticleImageSummaryResponse, CreateArticleImageRequest
+from ..photo_utils import save_image_to_media_store, store_base64_image
+from .conditional import Conditional
+from .fieldsets import FieldSet
+from typing import List, Optional
 import shutil
 import os
 
 router = APIRouter()
 
+ARTICLE_IMAGE_FIELDS = FieldSet(
+    ArticleImage, ArticleImageResponse, {"summary": ArticleImageSummaryResponse}, image_prefix="image",
+    expressions={"image_inline": ArticleImage.image_base64.isnot(None)})
+ARTICLE_IMAGE_VERSIONS = Conditional("article_images", "media_assets", cache=True)
+
 
 @router.get("/articles/{article_id}/images/", response_model=List[ArticleImageResponse])
-async def get_article_images(article_id: int, db: Session = Depends(get_db)) -> List[ArticleImageResponse]:
-    """Get all images for a specific article."""
-    images = db.query(ArticleImage).filter(
-        ArticleImage.article_id == article_id).order_by(ArticleImage.display_order).all()
+async def get_article_images(article_id: int, request: Request, response: Response,
+                             fields: Optional[str] = None, view: Optional[str] = None,
+                             db: AsyncSession = Depends(get_async_db)) -> List[ArticleImageResponse]:
+    """
+    Get all images for a specific article.
+    ?fields= / ?view=summary limit the response (and the columns loaded) like /articles/.
+    """
+    validators = await ARTICLE_IMAGE_VERSIONS.validators(request, db)
+    if ARTICLE_IMAGE_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    names = ARTICLE_IMAGE_FIELDS.resolve(fields, view)
+    query = select(ArticleImage).where(ArticleImage.article_id == article_id)
+    if names:
+        query = query.options(*ARTICLE_IMAGE_FIELDS.options(names))
+    images = (await db.scalars(query.order_by(ArticleImage.display_order))).all()
 
     # Format image URLs for proper display (backward compatibility)
     for image in images:
-        if image.image_path and not image.image_path.startswith(('http://', 'https://', '/static/')):
+        if ARTICLE_IMAGE_FIELDS.wants(names, "image_path") and image.image_path and not image.image_path.startswith(('http://', 'https://', '/static/')):
             image.image_path = f"/static/{image.image_path}"
         # Ensure base64 images are properly formatted
-        if image.image_base64 and not image.image_base64.startswith('data:'):
+        if ARTICLE_IMAGE_FIELDS.wants(names, "image_base64") and image.image_base64 and not image.image_base64.startswith('data:'):
             image.image_base64 = f"data:image/jpeg;base64,{image.image_base64}"
 
-    return images
+    return ARTICLE_IMAGE_VERSIONS.respond(
+        response, ARTICLE_IMAGE_FIELDS.response(images, names) if names else images, validators)
 
 
 @router.post("/articles/{article_id}/images/", response_model=ArticleImageResponse)
@@ -36,11 +57,11 @@ async def upload_article_image(
     image_base64: str = Form(None),
     caption: str = Form(None),
     display_order: int = Form(0),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Upload an image for a specific article."""
     # Check if article exists
-    article = db.query(Article).filter(Article.id == article_id).first()
+    article = await db.scalar(select(Article).where(Article.id == article_id))
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
 
@@ -52,43 +73,35 @@ async def upload_article_image(
             caption = json_data.get('caption', '')
             display_order = json_data.get('display_order', 0)
             image_path = json_data.get('image_path', '')
+            image_hash = json_data.get('image_hash')
         except:
             raise HTTPException(status_code=400, detail="Invalid JSON data")
     else:
         # Handle form data (for file uploads)
         image_path = ""
+        image_hash = None
 
     try:
-        base64_data = image_base64
-
-        # If no base64 provided, convert uploaded file
-        if not base64_data and file:
-            from ..photo_utils import convert_image_to_base64
-            base64_data = await convert_image_to_base64(file)
-
-            # Also save to filesystem for backward compatibility (if needed)
-            try:
-                from ..photo_utils import save_uploaded_photo
-                full_path, thumb_path = await save_uploaded_photo(file, f"article_{article_id}", article_image=True)
-                image_path = full_path
-            except:
-                # If file save fails, still return base64 (this is for Render compatibility)
-                image_path = ""
-        elif not base64_data and not file:
+        # Images are written to the media store; the row keeps only the hash
+        if file:
+            image_hash = (await save_image_to_media_store(file, db)).hash
+        elif image_base64:
+            image_hash = (await store_base64_image(image_base64, db)).hash
+        elif not image_hash:
             raise HTTPException(status_code=400, detail="No image data provided")
 
         # Create ArticleImage record
         article_image = ArticleImage(
             article_id=article_id,
-            image_path=image_path,
-            image_base64=base64_data,
+            image_path=image_path or "",
+            image_hash=image_hash,
             caption=caption,
             display_order=display_order
         )
 
         db.add(article_image)
-        db.commit()
-        db.refresh(article_image)
+        await db.commit()
+        await db.refresh(article_image)
 
         # Format URL for response
         if article_image.image_path:
@@ -96,24 +109,27 @@ async def upload_article_image(
 
         return article_image
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Error uploading image: {str(e)}")
 
 
 @router.post("/articles/{article_id}/images/clear/")
-async def clear_article_images(article_id: int, db: Session = Depends(get_db)):
+async def clear_article_images(article_id: int, db: AsyncSession = Depends(get_async_db)):
     """Clear all images for a specific article."""
     # Check if article exists
-    article = db.query(Article).filter(Article.id == article_id).first()
+    article = await db.scalar(select(Article).where(Article.id == article_id))
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
 
     try:
         # Get all images for this article
-        images = db.query(ArticleImage).filter(
-            ArticleImage.article_id == article_id).all()
+        images = (await db.scalars(select(ArticleImage).where(
+            ArticleImage.article_id == article_id))).all()
 
         # Delete physical files
         for image in images:
@@ -125,14 +141,14 @@ async def clear_article_images(article_id: int, db: Session = Depends(get_db)):
                     f"Warning: Could not delete file {image.image_path}: {e}")
 
         # Delete from database
-        db.query(ArticleImage).filter(
-            ArticleImage.article_id == article_id).delete()
-        db.commit()
+        await db.execute(delete(ArticleImage).where(
+            ArticleImage.article_id == article_id))
+        await db.commit()
 
         return {"message": f"Cleared {len(images)} images for article {article_id}"}
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Error clearing images: {str(e)}")
 
@@ -141,27 +157,32 @@ async def clear_article_images(article_id: int, db: Session = Depends(get_db)):
 async def associate_existing_image(
     article_id: int,
     image_data: CreateArticleImageRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Associate an existing uploaded image with an article."""
     # Check if article exists
-    article = db.query(Article).filter(Article.id == article_id).first()
+    article = await db.scalar(select(Article).where(Article.id == article_id))
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
 
     try:
-        # Create ArticleImage record with existing image path and base64
+        # Inline base64 data is moved to the media store, an existing hash is kept as-is
+        image_hash = image_data.image_hash
+        if image_data.image_base64 and not image_hash:
+            image_hash = (await store_base64_image(image_data.image_base64, db)).hash
+
+        # Create ArticleImage record with existing image path and media hash
         article_image = ArticleImage(
             article_id=article_id,
             image_path=image_data.image_path,
-            image_base64=image_data.image_base64,
+            image_hash=image_hash,
             caption=image_data.caption,
             display_order=image_data.display_order
         )
 
         db.add(article_image)
-        db.commit()
-        db.refresh(article_image)
+        await db.commit()
+        await db.refresh(article_image)
 
         # Format URL for response
         if article_image.image_path and not article_image.image_path.startswith(('http://', 'https://')):
@@ -169,19 +190,22 @@ async def associate_existing_image(
 
         return article_image
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Error associating image: {str(e)}")
 
 
 @router.delete("/articles/{article_id}/images/{image_id}")
-async def delete_article_image(article_id: int, image_id: int, db: Session = Depends(get_db)):
+async def delete_article_image(article_id: int, image_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete an article image."""
-    image = db.query(ArticleImage).filter(
+    image = await db.scalar(select(ArticleImage).where(
         ArticleImage.id == image_id,
         ArticleImage.article_id == article_id
-    ).first()
+    ))
 
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
@@ -194,7 +218,7 @@ async def delete_article_image(article_id: int, image_id: int, db: Session = Dep
         print(f"Warning: Could not delete file {image.image_path}: {e}")
 
     # Delete from database
-    db.delete(image)
-    db.commit()
+    await db.delete(image)
+    await db.commit()
 
     return {"message": "Image deleted successfully"}
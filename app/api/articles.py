@@ -1,49 +1,132 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
 from ..models.article import Article
-from ..schemas.article import CreateArticleRequest, ArticleApiResponse
-from typing import List
+from ..schemas.article import CreateArticleRequest, ArticleApiResponse, ArticleSummaryResponse, ArticleSearchResponse
+from ..photo_utils import move_base64_to_media_store
+from .conditional import Conditional
+from .fieldsets import FieldSet
+from .pagination import Keyset, MAX_PAGE_SIZE
+from .search import ArticleSearch
+from typing import List, Optional
 
 router = APIRouter()
 
+# Characters of content returned as the excerpt (enough for a card preview)
+ARTICLE_EXCERPT_LENGTH = 200
+
+ARTICLE_FIELDS = FieldSet(
+    Article, ArticleApiResponse, {"summary": ArticleSummaryResponse}, image_prefix="featured_image",
+    expressions={
+        "excerpt": func.substr(Article.content, 1, ARTICLE_EXCERPT_LENGTH),
+        "featured_image_inline": Article.featured_image_base64.isnot(None),
+    })
+ARTICLE_PAGES = Keyset(Article.created_at, Article.id)
+ARTICLE_VERSIONS = Conditional("articles", "media_assets", cache=True)
+ARTICLE_SEARCH = ArticleSearch()
+# Loaded for a search result; the search adds snippet and search_rank
+SEARCH_FIELDS = tuple(name for name in ArticleSearchResponse.model_fields if name not in ("snippet", "search_rank"))
+
 
 @router.get("/test")
-async def test_endpoint(db: Session = Depends(get_db)):
+async def test_endpoint(db: AsyncSession = Depends(get_async_db)):
     try:
-        count = db.query(Article).count()
+        count = await db.scalar(select(func.count()).select_from(Article))
         return {"message": f"Database working, {count} articles"}
     except Exception as e:
         return {"error": str(e)}
 
 
 @router.get("/articles/", response_model=List[ArticleApiResponse])
-async def get_all_articles(db: Session = Depends(get_db)) -> List[ArticleApiResponse]:
-    articles = db.query(Article).order_by(Article.created_at.desc()).all()
+async def get_all_articles(request: Request, response: Response,
+                           fields: Optional[str] = None, view: Optional[str] = None,
+                           published: Optional[bool] = None,
+                           limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                           cursor: Optional[str] = None,
+                           db: AsyncSession = Depends(get_async_db)) -> List[ArticleApiResponse]:
+    """
+    Articles, newest first. ?fields=title,published returns only those fields (plus id),
+    ?view=summary the fields of ArticleSummaryResponse (an excerpt instead of the content);
+    only the columns they need are loaded. ?published=true|false filters by status.
+    ?limit=N returns one page; pass the X-Next-Cursor header back as ?cursor= for the next.
+    """
+    validators = await ARTICLE_VERSIONS.validators(request, db)
+    if ARTICLE_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    names = ARTICLE_FIELDS.resolve(fields, view)
+    query = select(Article)
+    if names:
+        query = query.options(*ARTICLE_FIELDS.options(names, ARTICLE_PAGES.columns))
+    if published is not None:
+        query = query.where(Article.published == published)
+    articles, next_cursor = await ARTICLE_PAGES.page(db, query, limit, cursor)
 
     # Format photo URLs for proper display (backward compatibility)
     for article in articles:
-        if article.featured_image and not article.featured_image.startswith(('http://', 'https://', '/static/')):
+        if ARTICLE_FIELDS.wants(names, "featured_image") and article.featured_image and not article.featured_image.startswith(('http://', 'https://', '/static/')):
             article.featured_image = f"/static/{article.featured_image}"
         # Ensure base64 images are properly formatted
-        if article.featured_image_base64 and not article.featured_image_base64.startswith('data:'):
+        if ARTICLE_FIELDS.wants(names, "featured_image_base64") and article.featured_image_base64 and not article.featured_image_base64.startswith('data:'):
             article.featured_image_base64 = f"data:image/jpeg;base64,{article.featured_image_base64}"
 
-    return articles
+    result = ARTICLE_VERSIONS.respond(
+        response, ARTICLE_FIELDS.response(articles, names) if names else articles, validators)
+    return ARTICLE_PAGES.respond(request, response, result, next_cursor)
+
+
+@router.get("/articles/search", response_model=List[ArticleSearchResponse])
+async def search_articles(request: Request, response: Response,
+                          q: str = Query(..., min_length=1, max_length=200),
+                          published: Optional[bool] = None,
+                          limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                          cursor: Optional[str] = None,
+                          db: AsyncSession = Depends(get_async_db)) -> List[ArticleSearchResponse]:
+    """
+    Articles matching every word of ?q= in the title or content, best match first,
+    each with a highlighted snippet of the content. ?published=true|false filters
+    by status. Returns ?limit=N results (default 20); pass the X-Next-Cursor header
+    back as ?cursor= for the next page.
+    """
+    validators = await ARTICLE_VERSIONS.validators(request, db)
+    if ARTICLE_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    query = select(Article).options(*ARTICLE_FIELDS.options(SEARCH_FIELDS))
+    if published is not None:
+        query = query.where(Article.published == published)
+    articles, next_cursor = await ARTICLE_SEARCH.page(db, q, query, limit, cursor)
+
+    for article in articles:
+        if article.featured_image and not article.featured_image.startswith(('http://', 'https://', '/static/')):
+            article.featured_image = f"/static/{article.featured_image}"
+
+    result = ARTICLE_VERSIONS.respond(response, articles, validators)
+    return ARTICLE_PAGES.respond(request, response, result, next_cursor)
 
 
 @router.post("/articles/", response_model=ArticleApiResponse)
-async def create_article(article_data: CreateArticleRequest, db: Session = Depends(get_db)) -> ArticleApiResponse:
-    new_article = Article(**article_data.model_dump())
+async def create_article(article_data: CreateArticleRequest,
+                         db: AsyncSession = Depends(get_async_db)) -> ArticleApiResponse:
+    # Inline base64 images go to the media store, only the hash is kept on the row
+    article_values = await move_base64_to_media_store(
+        db, article_data.model_dump(), 'featured_image_base64', 'featured_image_hash')
+    new_article = Article(**article_values)
     db.add(new_article)
-    db.commit()
-    db.refresh(new_article)
+    await db.commit()
+    await db.refresh(new_article)
     return new_article
 
 
 @router.get("/articles/{article_id}", response_model=ArticleApiResponse)
-async def get_article(article_id: int, db: Session = Depends(get_db)) -> ArticleApiResponse:
-    article = db.query(Article).filter(Article.id == article_id).first()
+async def get_article(article_id: int, request: Request, response: Response,
+                      db: AsyncSession = Depends(get_async_db)) -> ArticleApiResponse:
+    validators = await ARTICLE_VERSIONS.validators(request, db)
+    if ARTICLE_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    article = await db.scalar(select(Article).where(Article.id == article_id))
 
     if not article:
         raise HTTPException(
@@ -53,19 +136,21 @@ async def get_article(article_id: int, db: Session = Depends(get_db)) -> Article
     if article.featured_image and not article.featured_image.startswith(('http://', 'https://')):
         article.featured_image = f"/static/{article.featured_image}"
 
-    return article
+    return ARTICLE_VERSIONS.respond(response, article, validators)
 
 
 @router.put("/articles/{article_id}", response_model=ArticleApiResponse)
-async def update_article(article_id: int, article_data: CreateArticleRequest, db: Session = Depends(get_db)) -> ArticleApiResponse:
-    article = db.query(Article).filter(Article.id == article_id).first()
+async def update_article(article_id: int, article_data: CreateArticleRequest,
+                         db: AsyncSession = Depends(get_async_db)) -> ArticleApiResponse:
+    article = await db.scalar(select(Article).where(Article.id == article_id))
 
     if not article:
         raise HTTPException(
             status_code=404, detail="Article not found, provide a valid id")
 
     # Update article fields
-    update_data = article_data.model_dump(exclude_unset=True)
+    update_data = await move_base64_to_media_store(
+        db, article_data.model_dump(exclude_unset=True), 'featured_image_base64', 'featured_image_hash')
 
     # Ensure featured_image is stored as relative path
     if 'featured_image' in update_data and update_data['featured_image'] and update_data['featured_image'].startswith('/static/'):
@@ -76,20 +161,20 @@ async def update_article(article_id: int, article_data: CreateArticleRequest, db
         setattr(article, key, value)
 
     # Save changes
-    db.commit()
-    db.refresh(article)
+    await db.commit()
+    await db.refresh(article)
     return article
 
 
 # Delete an article, no need of 'response_model' since returs simple message, don't need to validate through Pydantic schemas
 @router.delete("/articles/{article_id}")
-async def delete_article(article_id: int, db: Session = Depends(get_db)) -> dict:
-    article = db.query(Article).filter(Article.id == article_id).first()
+async def delete_article(article_id: int, db: AsyncSession = Depends(get_async_db)) -> dict:
+    article = await db.scalar(select(Article).where(Article.id == article_id))
 
     if not article:
         raise HTTPException(
             status_code=404, detail="Article not found, provide a valid id")
 
-    db.delete(article)
-    db.commit()
+    await db.delete(article)
+    await db.commit()
     return {"message": "Article deleted"}
@@ -1,34 +1,137 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import re
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func, or_, select
 from sqlalchemy.exc import IntegrityError
-from ..database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
 from ..models.cat import Cat
-from ..schemas.cat import CatSerializer, CreateCatRequest, CatApiResponse
-from typing import List
+from ..schemas.cat import CatSerializer, CreateCatRequest, CatApiResponse, CatSummaryResponse, AwareTimestamps
+from ..photo_utils import move_base64_to_media_store
+from .conditional import Conditional
+from .fieldsets import FieldSet
+from .pagination import Keyset, MAX_PAGE_SIZE
+from typing import List, Optional
 
 router = APIRouter()
 
+CAT_FIELDS = FieldSet(
+    Cat, CatApiResponse, {"summary": CatSummaryResponse}, image_prefix="photo",
+    expressions={"photo_inline": Cat.photo_base64.isnot(None)}, base=AwareTimestamps)
+CAT_PAGES = Keyset(Cat.created_at, Cat.id)
+# ?sort= values: a column, newest/highest first with a leading '-'
+CAT_SORTS = {"-created_at": CAT_PAGES, "created_at": Keyset(Cat.created_at, Cat.id, descending=False)}
+for column in (Cat.date_of_birth, Cat.name, Cat.litter_code):
+    CAT_SORTS[f"-{column.key}"] = Keyset(column, Cat.id)
+    CAT_SORTS[column.key] = Keyset(column, Cat.id, descending=False)
+CAT_GENDERS = ("Male", "Female")
+# Cat responses embed their photo's media asset (srcset, placeholder, ...)
+CAT_VERSIONS = Conditional("cats", "media_assets", cache=True)
+
+
+def prefix_match(dialect: str, column, prefix: str):
+    """Case-insensitive column LIKE 'prefix%', written the way the dialect's prefix index serves it."""
+    pattern = re.sub(r"([\\%_])", r"\\\1", prefix) + "%"
+    if dialect == "postgresql":
+        return func.lower(column).like(pattern.lower(), escape="\\")
+    # SQLite's LIKE ignores case already, and only uses an index on the bare column
+    return column.like(pattern, escape="\\")
+
+
+class CatFilters:
+    """
+    Filters and sort order of the cat list, applied in SQL (see the indexes on Cat):
+    ?available=true|false, ?gender=Male|Female, ?born_after= / ?born_before= (dates,
+    inclusive), ?q= (start of the name or litter code, any case) and ?sort= (a CAT_SORTS
+    key, default -created_at: newest first). A dependency of GET /api/cats/ and /cats.
+    """
+
+    def __init__(self, available: Optional[bool] = None, gender: Optional[str] = None,
+                 born_after: Optional[date] = None, born_before: Optional[date] = None,
+                 q: Optional[str] = Query(None, max_length=50), sort: str = "-created_at"):
+        if sort not in CAT_SORTS:
+            raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(CAT_SORTS)}")
+        # Empty values (a form's "any" option) don't filter
+        gender = gender.capitalize() if gender else None
+        if gender and gender not in CAT_GENDERS:
+            raise HTTPException(status_code=400, detail=f"gender must be one of: {', '.join(CAT_GENDERS)}")
+        self.available = available
+        self.gender = gender
+        self.born_after = born_after
+        self.born_before = born_before
+        self.q = q.strip() if q and q.strip() else None
+        self.sort = sort
+        self.pages = CAT_SORTS[sort]
+
+    @property
+    def narrowed(self) -> bool:
+        """Whether anything besides availability filters the list."""
+        return any(value is not None for value in (self.gender, self.born_after, self.born_before, self.q))
+
+    def apply(self, statement, db: AsyncSession):
+        if self.available is not None:
+            statement = statement.where(Cat.is_available == self.available)
+        if self.gender:
+            statement = statement.where(Cat.gender == self.gender)
+        if self.born_after:
+            statement = statement.where(Cat.date_of_birth >= self.born_after)
+        if self.born_before:
+            statement = statement.where(Cat.date_of_birth <= self.born_before)
+        if self.q:
+            dialect = db.bind.dialect.name
+            statement = statement.where(or_(prefix_match(dialect, Cat.name, self.q),
+                                            prefix_match(dialect, Cat.litter_code, self.q)))
+        return statement
+
 
 @router.get("/cats/", response_model=List[CatApiResponse])  # Get all cats
-async def get_all_cats(db: Session = Depends(get_db)) -> List[CatApiResponse]:
-    cats = db.query(Cat).all()
+async def get_all_cats(request: Request, response: Response,
+                       fields: Optional[str] = None, view: Optional[str] = None,
+                       filters: CatFilters = Depends(),
+                       limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                       cursor: Optional[str] = None,
+                       db: AsyncSession = Depends(get_async_db)) -> List[CatApiResponse]:
+    """
+    Cats, newest first. ?fields=litter_code,is_available returns only those fields (plus id),
+    ?view=summary the fields of CatSummaryResponse; only the columns they need are loaded.
+    ?available=, ?gender=, ?born_after=, ?born_before=, ?q= and ?sort= filter and order
+    the list in SQL (see CatFilters).
+    ?limit=N returns one page; pass the X-Next-Cursor header back as ?cursor= for the next.
+    """
+    validators = await CAT_VERSIONS.validators(request, db)
+    if CAT_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    names = CAT_FIELDS.resolve(fields, view)
+    pages = filters.pages
+    query = filters.apply(select(Cat), db)
+    if names:
+        query = query.options(*CAT_FIELDS.options(names, pages.columns))
+    cats, next_cursor = await pages.page(db, query, limit, cursor)
     # Format photo URLs for proper display (backward compatibility)
     for cat in cats:
-        if cat.photo_url and not cat.photo_url.startswith(('http://', 'https://')):
+        if CAT_FIELDS.wants(names, "photo_url") and cat.photo_url and not cat.photo_url.startswith(('http://', 'https://')):
             cat.photo_url = f"/static/{cat.photo_url}"
         # Ensure base64 images are properly formatted
-        if cat.photo_base64 and not cat.photo_base64.startswith('data:'):
+        if CAT_FIELDS.wants(names, "photo_base64") and cat.photo_base64 and not cat.photo_base64.startswith('data:'):
             cat.photo_base64 = f"data:image/jpeg;base64,{cat.photo_base64}"
-    return cats
+    result = CAT_VERSIONS.respond(response, CAT_FIELDS.response(cats, names) if names else cats, validators)
+    return pages.respond(request, response, result, next_cursor)
 
 
 @router.post("/cats/")
-async def create_cat(cat_data: CreateCatRequest, db: Session = Depends(get_db)):
+async def create_cat(cat_data: CreateCatRequest, db: AsyncSession = Depends(get_async_db)):
+    # Inline base64 photos go to the media store, only the hash is kept on the row
+    cat_values = await move_base64_to_media_store(
+        db, cat_data.model_dump(), 'photo_base64', 'photo_hash')
     # Unpack dictionary to keyword arguments
-    new_cat = Cat(**cat_data.model_dump())
+    new_cat = Cat(**cat_values)
     try:
         db.add(new_cat)
-        db.commit()
+        await db.commit()
+        # Load the photo's media asset (the photo_* fields below) without lazy loading
+        await db.refresh(new_cat)
         # Return as dict to avoid serialization issues
         result = {
             "id": new_cat.id,
@@ -39,6 +142,15 @@ async def create_cat(cat_data: CreateCatRequest, db: Session = Depends(get_db)):
             "description": new_cat.description,
             "photo_url": new_cat.photo_url,
             "photo_base64": new_cat.photo_base64,
+            "photo_hash": new_cat.photo_hash,
+            "photo_media_url": new_cat.photo_media_url,
+            "photo_srcset": new_cat.photo_srcset,
+            "photo_placeholder": new_cat.photo_placeholder,
+            "photo_width": new_cat.photo_width,
+            "photo_height": new_cat.photo_height,
+            "photo_format": new_cat.photo_format,
+            "photo_bytes": new_cat.photo_bytes,
+            "photo_color": new_cat.photo_color,
             "is_available": new_cat.is_available,
         }
         if new_cat.created_at:
@@ -47,37 +159,45 @@ async def create_cat(cat_data: CreateCatRequest, db: Session = Depends(get_db)):
             result["updated_at"] = new_cat.updated_at
         return result
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         if "litter_code" in str(e):
             raise HTTPException(status_code=400, detail="Litter code already exists. Please choose a different litter code.")
         raise HTTPException(status_code=400, detail="A database constraint was violated.")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="An error occurred while creating the cat.")
 
 
 @router.get("/cats/{cat_id}", response_model=CatApiResponse)
-async def get_cat(cat_id: int, db: Session = Depends(get_db)) -> CatApiResponse:
-    cat = db.query(Cat).filter(Cat.id == cat_id).first()
+async def get_cat(cat_id: int, request: Request, response: Response,
+                  db: AsyncSession = Depends(get_async_db)) -> CatApiResponse:
+    validators = await CAT_VERSIONS.validators(request, db)
+    if CAT_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    cat = await db.scalar(select(Cat).where(Cat.id == cat_id))
 
     if not cat:
         raise HTTPException(
             status_code=404, detail="Cat not found, provide a valid id")
 
-    return cat
+    return CAT_VERSIONS.respond(response, cat, validators)
 
 
 @router.put("/cats/{cat_id}", response_model=CatApiResponse)
-async def update_cat(cat_id: int, cat_data: CreateCatRequest, db: Session = Depends(get_db)) -> CatApiResponse:
+async def update_cat(cat_id: int, cat_data: CreateCatRequest,
+                     db: AsyncSession = Depends(get_async_db)) -> CatApiResponse:
     from datetime import datetime, timezone
-    cat = db.query(Cat).filter(Cat.id == cat_id).first()
+    cat = await db.scalar(select(Cat).where(Cat.id == cat_id))
 
     if not cat:
         raise HTTPException(
             status_code=404, detail="Cat not found, provide a valid id")
 
     # Update cat fields
-    for key, value in cat_data.model_dump().items():
+    cat_values = await move_base64_to_media_store(
+        db, cat_data.model_dump(), 'photo_base64', 'photo_hash')
+    for key, value in cat_values.items():
         setattr(cat, key, value)
 
     # Update timestamp manually
@@ -85,27 +205,29 @@ async def update_cat(cat_id: int, cat_data: CreateCatRequest, db: Session = Depe
 
     try:
         # Save changes
-        db.commit()
+        await db.commit()
+        # Reload the photo's media asset, photo_hash may have changed
+        await db.refresh(cat)
         return cat
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         if "litter_code" in str(e):
             raise HTTPException(status_code=400, detail="Litter code already exists. Please choose a different litter code.")
         raise HTTPException(status_code=400, detail="A database constraint was violated.")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="An error occurred while updating the cat.")
 
 
 # Delete a cat, no need of 'response_model' since returs simple message, don't need to validate through Pydantic schemas
 @router.delete("/cats/{cat_id}")
-async def delete_cat(cat_id: int, db: Session = Depends(get_db)) -> dict:
-    cat = db.query(Cat).filter(Cat.id == cat_id).first()
+async def delete_cat(cat_id: int, db: AsyncSession = Depends(get_async_db)) -> dict:
+    cat = await db.scalar(select(Cat).where(Cat.id == cat_id))
 
     if not cat:
         raise HTTPException(
             status_code=404, detail="Cat not found, provide a valid id")
 
-    db.delete(cat)
-    db.commit()
+    await db.delete(cat)
+    await db.commit()
     return {"message": "Cat deleted"}
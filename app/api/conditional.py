@@ -0,0 +1,100 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.resource_version import current_versions
+from .media import etag_matches
+
+# Newest template change: stands in for the release when the deploy doesn't say
+TEMPLATES_MTIME_NS = max((path.stat().st_mtime_ns for path in Path("templates").glob("*.html")), default=0)
+# Part of every validator: a deploy changes templates and response shapes without touching the data
+RELEASE_ID = os.getenv("RELEASE_ID") or str(TEMPLATES_MTIME_NS)
+# Clients may keep a copy but must revalidate it (a 304 when nothing changed) before using it
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Request state key listing the tables a cacheable response is built from (read by response_cache.py)
+CACHE_RESOURCES_STATE = "cache_resources"
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite hands timestamps back naive (they are stored as UTC)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def release_time(value: str) -> datetime:
+    """When the running release was deployed: RELEASE_TIME (ISO 8601 or Unix seconds), else the templates' mtime."""
+    if value:
+        try:
+            return datetime.fromtimestamp(float(value), timezone.utc)
+        except ValueError:
+            return as_utc(datetime.fromisoformat(value))
+    return datetime.fromtimestamp(TEMPLATES_MTIME_NS / 1e9, timezone.utc)
+
+
+# Last-Modified is never older than this, so a copy from a previous release (like the
+# ETag's RELEASE_ID) is never answered with a 304 to If-Modified-Since
+RELEASE_TIME = release_time(os.getenv("RELEASE_TIME", ""))
+
+
+class Conditional:
+    """
+    Conditional GET for a response built from some tables. The ETag and
+    Last-Modified come from those tables' version counters (ResourceVersion:
+    one primary-key lookup, no rows loaded), so a client whose copy is still
+    current gets a 304 without a body before the endpoint runs its queries.
+
+    The ETag also covers the URL (path and query: ?fields=, ?cursor=, ...) and
+    RELEASE_ID; it is weak, as it is derived from the data rather than the bytes.
+    Last-Modified is never older than RELEASE_TIME, so a new release is not
+    answered with a 304 to an If-Modified-Since copy from the previous one.
+
+    With cache=True the response is also kept in the response cache
+    (response_cache.py) until a write to one of the resources commits - for public
+    reads only, never for personal data.
+    """
+
+    def __init__(self, *resources: str, cache: bool = False):
+        self.resources = resources
+        self.cache = cache
+
+    async def validators(self, request: Request, db: AsyncSession) -> dict:
+        """ETag / Last-Modified / Cache-Control headers for the current state of the resources."""
+        if self.cache:
+            setattr(request.state, CACHE_RESOURCES_STATE, self.resources)
+        versions = await current_versions(db, self.resources)
+        key = ":".join([RELEASE_ID, request.url.path, request.url.query]
+                       + [f"{name}={versions[name][0]}" for name in self.resources])
+        headers = {
+            "ETag": f'W/"{hashlib.sha256(key.encode()).hexdigest()[:32]}"',
+            "Cache-Control": REVALIDATE_CACHE_CONTROL,
+        }
+        changed = [as_utc(changed_at) for _, changed_at in versions.values() if changed_at]
+        headers["Last-Modified"] = format_datetime(max(changed + [RELEASE_TIME]), usegmt=True)
+        return headers
+
+    @staticmethod
+    def not_modified(request: Request, validators: dict) -> bool:
+        """Whether the client's copy is current: If-None-Match, or If-Modified-Since without it."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            return etag_matches(if_none_match, validators["ETag"])
+
+        if_modified_since = request.headers.get("if-modified-since")
+        last_modified = validators.get("Last-Modified")
+        if not (if_modified_since and last_modified):
+            return False
+        try:
+            return parsedate_to_datetime(last_modified) <= as_utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def respond(response: Response, result, validators: dict):
+        """Add the validators to the endpoint's result (or its injected response)."""
+        target = result if isinstance(result, Response) else response
+        target.headers.update(validators)
+        return result
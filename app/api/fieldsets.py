@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy.orm import load_only, noload, selectinload, with_expression
+
+from ..models.media import MediaAsset
+
+# Image fields read from the row's media asset, by suffix (photo_width -> 'width'),
+# mapped to the MediaAsset columns they need
+ASSET_FIELDS = {
+    "media_url": ("ext",),
+    "srcset": ("variants",),
+    "placeholder": ("placeholder",),
+    "width": ("width",),
+    "height": ("height",),
+    "format": ("ext",),
+    "bytes": ("byte_size",),
+    "color": ("dominant_color",),
+}
+
+# Projection response models kept per FieldSet (least recently used dropped first)
+MAX_PROJECTION_ADAPTERS = 128
+
+
+class ProjectionBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class FieldSet:
+    """
+    Sparse fieldsets for a list endpoint: ?fields=a,b returns only those fields,
+    ?view=<name> a predefined set (the fields of that view's response model).
+    Only the columns the fields need are SELECTed (load_only), the media asset
+    is loaded only for image fields and only with the columns they read, and
+    each projection is validated by a response model with exactly its fields.
+    """
+
+    def __init__(self, model, schema: Type[BaseModel], views: Dict[str, Type[BaseModel]],
+                 image_prefix: str, expressions: Optional[dict] = None,
+                 base: Type[BaseModel] = ProjectionBase):
+        self.model = model
+        self.schema = schema
+        self.views = views
+        self.image_prefix = f"{image_prefix}_"
+        self.hash_column = getattr(model, f"{image_prefix}_hash")
+        self.asset_relationship = getattr(model, f"{image_prefix}_asset")
+        # query_expression() attributes -> the SQL expression they are loaded with
+        self.expressions = expressions or {}
+        self.base = base
+        self.columns = set(model.__table__.columns.keys())
+        self.fields = {}
+        for view_schema in [schema, *views.values()]:
+            for name, info in view_schema.model_fields.items():
+                self.fields.setdefault(name, info)
+        self._adapters = OrderedDict()  # field names -> TypeAdapter, least recently used first
+
+    def resolve(self, fields: Optional[str], view: Optional[str]) -> Optional[Tuple[str, ...]]:
+        """Field names requested by ?fields= / ?view=, or None for the full representation."""
+        if fields and view:
+            raise HTTPException(status_code=400, detail="Use either fields or view, not both")
+        if view:
+            if view not in self.views:
+                raise HTTPException(
+                    status_code=400, detail=f"view must be one of: {', '.join(self.views)}")
+            return tuple(self.views[view].model_fields)
+        if not fields:
+            return None
+
+        names = ["id"] + [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+        # id first, the rest in declaration order, so ?fields=a,b and ?fields=b,a
+        # share one projection model
+        requested = set(names)
+        return ("id",) + tuple(name for name in self.fields if name in requested and name != "id")
+
+    @staticmethod
+    def wants(names: Optional[Tuple[str, ...]], field: str) -> bool:
+        """Whether a response with these fields includes field (None = every field)."""
+        return names is None or field in names
+
+    def options(self, names: Tuple[str, ...], required: tuple = ()) -> list:
+        """
+        Loader options that fetch what the fields need and nothing else
+        (plus the required columns, e.g. the pagination key).
+        """
+        columns = [getattr(self.model, name) for name in names if name in self.columns]
+        columns.extend(column for column in required if column.key not in names)
+        asset_columns = set()
+        for name in names:
+            if name.startswith(self.image_prefix):
+                asset_columns.update(ASSET_FIELDS.get(name[len(self.image_prefix):], ()))
+
+        if asset_columns:
+            columns.append(self.hash_column)
+            options = [selectinload(self.asset_relationship).load_only(
+                *[getattr(MediaAsset, column) for column in sorted(asset_columns)])]
+        else:
+            options = [noload(self.asset_relationship)]
+        options.append(load_only(*columns))
+        options.extend(with_expression(getattr(self.model, name), self.expressions[name])
+                       for name in names if name in self.expressions)
+        return options
+
+    def adapter(self, names: Tuple[str, ...]) -> TypeAdapter:
+        if names in self._adapters:
+            self._adapters.move_to_end(names)
+            return self._adapters[names]
+        projection = create_model(
+            f"{self.schema.__name__}Projection", __base__=self.base,
+            **{name: (self.fields[name].annotation, self.fields[name]) for name in names})
+        adapter = self._adapters[names] = TypeAdapter(List[projection])
+        while len(self._adapters) > MAX_PROJECTION_ADAPTERS:
+            self._adapters.popitem(last=False)
+        return adapter
+
+    def response(self, items: list, names: Tuple[str, ...]) -> JSONResponse:
+        """Serialize rows loaded with options(names) with exactly those fields."""
+        adapter = self.adapter(names)
+        return JSONResponse(content=adapter.dump_python(
+            adapter.validate_python(items, from_attributes=True), mode="json"))
@@ -0,0 +1,123 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import hashlib
+
+from ..database import get_async_db
+from ..image_cache import resize_cache
+from ..image_engine import image_engine
+from ..media_store import media_store, CONTENT_TYPES
+from ..models.cat import Cat
+from ..models.article import Article, ArticleImage
+from ..models.media import MediaAsset
+from ..photo_utils import (
+    FULL_SIZE, VARIANT_ENCODERS, decode_base64_image, local_image_path, render_resized,
+)
+from .media import etag_matches
+
+router = APIRouter()
+
+# kind in /img/{kind}/{id} -> (model, hash column, base64 column, legacy path column)
+IMAGE_KINDS = {
+    "cat": (Cat, "photo_hash", "photo_base64", "photo_url"),
+    "article": (Article, "featured_image_hash", "featured_image_base64", "featured_image"),
+    "article-image": (ArticleImage, "image_hash", "image_base64", "image_path"),
+}
+FIT_MODES = ("contain", "cover")
+# The image behind an id can change, so clients revalidate (cheaply, via ETag) after an hour
+RESIZED_CACHE_CONTROL = "public, max-age=3600"
+# Sizes a requested width/height is rounded up to, so the cache holds a bounded set of
+# variants per image (arbitrary w/h would let anyone fill it and evict the real ones).
+# Covers the sizes templates ask for and the srcset VARIANT_WIDTHS.
+RESIZE_STEPS = (40, 80, 120, 160, 200, 240, 280, 320, 400, 480, 560, 640, 800, 960, 1024, 1280, 1600, 1920)
+
+
+def resize_step(size: Optional[int]) -> Optional[int]:
+    """The smallest RESIZE_STEPS size at least as large as size."""
+    if size is None:
+        return None
+    return next((step for step in RESIZE_STEPS if step >= size), RESIZE_STEPS[-1])
+
+
+async def image_source(db: AsyncSession, row, hash_field: str, base64_field: str, path_field: str):
+    """
+    The stored original for a row as (source, version), or None.
+    source is a file path or (for legacy rows) a base64 string, decoded only on a cache miss.
+    version identifies the source bytes, so a new photo never hits an old cache entry.
+    """
+    content_hash = getattr(row, hash_field)
+    asset = await db.get(MediaAsset, content_hash) if content_hash else None
+    if asset is not None and media_store.exists(asset.hash, asset.ext):
+        return media_store.path_for(asset.hash, asset.ext), asset.hash
+
+    base64_data = getattr(row, base64_field)
+    if base64_data:
+        return base64_data, hashlib.sha256(base64_data.encode()).hexdigest()
+
+    path = local_image_path(getattr(row, path_field))
+    if path is not None:
+        return path, f"{path}:{path.stat().st_mtime_ns}"
+    return None
+
+
+@router.get("/img/cache-stats")
+async def get_resize_cache_stats():
+    """Resize cache counters: hits, misses, coalesced misses, evictions and bytes used."""
+    return JSONResponse(content={
+        "success": True,
+        "data": resize_cache.stats()
+    })
+
+
+@router.get("/img/{kind}/{item_id}")
+async def get_resized_image(
+    kind: str,
+    item_id: int,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=FULL_SIZE[0]),
+    h: Optional[int] = Query(None, ge=1, le=FULL_SIZE[1]),
+    fit: str = "contain",
+    fmt: str = "webp",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Serve a cat/article/gallery image resized to the requested box, its sides rounded
+    up to RESIZE_STEPS. Results are kept in a byte-budgeted disk LRU cache.
+    """
+    if kind not in IMAGE_KINDS:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if fit not in FIT_MODES:
+        raise HTTPException(status_code=400, detail=f"fit must be one of: {', '.join(FIT_MODES)}")
+    if fmt not in VARIANT_ENCODERS:
+        raise HTTPException(status_code=400, detail=f"fmt must be one of: {', '.join(VARIANT_ENCODERS)}")
+
+    model, hash_field, base64_field, path_field = IMAGE_KINDS[kind]
+    row = await db.scalar(select(model).where(model.id == item_id))
+    source = await image_source(db, row, hash_field, base64_field, path_field) if row else None
+    if source is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    source, version = source
+    # Give the connection back before a resize ties the request up in the image engine
+    await db.close()
+
+    w, h = resize_step(w), resize_step(h)
+    cache_key = hashlib.sha256(f"{version}:{w}:{h}:{fit}:{fmt}".encode()).hexdigest()
+    etag = f'"{cache_key}"'
+    headers = {"ETag": etag, "Cache-Control": RESIZED_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    async def resize():
+        try:
+            image = decode_base64_image(source) if isinstance(source, str) else source
+            return await image_engine.run(render_resized, image, w, h, fit, fmt)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Error resizing image: {str(e)}")
+
+    data = await resize_cache.get_or_create(f"{cache_key}.{fmt}", resize)
+    return Response(content=data, media_type=CONTENT_TYPES[fmt], headers=headers)
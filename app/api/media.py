@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from ..media_store import media_store, CONTENT_TYPES
+import re
+
+router = APIRouter()
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+# Stored blobs never change, so browsers and proxies may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison, W/ is ignored)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+@router.get("/media/{content_hash}.{ext}")
+async def get_media(content_hash: str, ext: str, request: Request):
+    """Serve an image from the media store by its content hash."""
+    if not HASH_PATTERN.match(content_hash) or ext not in CONTENT_TYPES:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    path = media_store.path_for(content_hash, ext)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    # The content hash is a strong validator: same hash, same bytes
+    etag = f'"{content_hash}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(path, media_type=CONTENT_TYPES[ext], headers=headers)
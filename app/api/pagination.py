@@ -0,0 +1,110 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import Select, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Page size when a cursor comes without a limit, and the largest accepted limit
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(key: list) -> str:
+    """An opaque cursor for a row's sort key: base64url JSON."""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+class Keyset:
+    """
+    Keyset (cursor) pagination for a list endpoint, newest first by default:
+    ORDER BY <timestamp> DESC, id DESC, and each page continues WHERE
+    (<timestamp>, id) < the last row of the previous page (ascending: ASC and >).
+    Served from a (<timestamp>, id) index, so page 500 costs the same as page 1,
+    and rows inserted meanwhile never shift a page the way OFFSET does. Any
+    non-null column works as the sort column (a date, a name, ...).
+
+    The cursor is opaque to clients: base64url JSON of the last row's key.
+    The next page's cursor is returned in the X-Next-Cursor header (and as a
+    Link rel="next"), so the body stays the plain list it always was.
+    """
+
+    def __init__(self, sort_column, id_column, descending: bool = True):
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.descending = descending
+
+    @property
+    def columns(self) -> tuple:
+        """Columns a page needs loaded to build the next cursor."""
+        return self.sort_column, self.id_column
+
+    def order(self, statement):
+        if self.descending:
+            return statement.order_by(self.sort_column.desc(), self.id_column.desc())
+        return statement.order_by(self.sort_column.asc(), self.id_column.asc())
+
+    def encode(self, row) -> str:
+        sort_value = getattr(row, self.sort_column.key)
+        if isinstance(sort_value, date):
+            sort_value = sort_value.isoformat()
+        return encode_cursor([sort_value, getattr(row, self.id_column.key)])
+
+    def decode(self, cursor: str) -> Tuple[object, int]:
+        try:
+            sort_value, row_id = decode_cursor(cursor)
+            if sort_value is not None:
+                python_type = self.sort_column.type.python_type
+                # date/datetime travel as ISO strings
+                sort_value = (python_type.fromisoformat(sort_value) if issubclass(python_type, date)
+                              else python_type(sort_value))
+            return sort_value, int(row_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    async def page(self, db: AsyncSession, statement: Select, limit: Optional[int],
+                   cursor: Optional[str]) -> Tuple[list, Optional[str]]:
+        """
+        One page of the select(Model) statement and the cursor of the next one
+        (None on the last page). Without limit and cursor the whole list is
+        returned, as before pagination.
+        """
+        statement = self.order(statement)
+        if limit is None and cursor is None:
+            return (await db.scalars(statement)).all(), None
+
+        limit = limit or DEFAULT_PAGE_SIZE
+        if cursor:
+            sort_value, row_id = self.decode(cursor)
+            key = tuple_(self.sort_column, self.id_column)
+            # Bound as the column's type, in the format the column stores
+            cursor_key = tuple_(literal(sort_value, self.sort_column.type), row_id)
+            statement = statement.where(key < cursor_key if self.descending else key > cursor_key)
+        # One extra row tells whether there is a next page without a COUNT
+        rows = (await db.scalars(statement.limit(limit + 1))).all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, self.encode(rows[-1])
+
+    @staticmethod
+    def respond(request: Request, response: Response, result, next_cursor: Optional[str]):
+        """Add the next-page headers to the endpoint's result (or its injected response)."""
+        if next_cursor:
+            target = result if isinstance(result, Response) else response
+            target.headers["X-Next-Cursor"] = next_cursor
+            target.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+        return result
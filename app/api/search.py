@@ -0,0 +1,124 @@
+import html
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Float, Select, column, func, literal_column, select, table, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import with_expression
+
+from ..models.article import Article, SEARCH_LANGUAGE
+from .pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+
+# Words in a search query (anything else - quotes, operators - is ignored)
+MAX_QUERY_WORDS = 12
+# Snippet size: words around the matches
+SNIPPET_WORDS = 24
+# Matches are wrapped in these by the database, then turned into <mark> once the
+# snippet has been HTML-escaped (article content is plain text, not markup)
+MARK_START, MARK_END = "\x02", "\x03"
+
+# The FTS5 table of the SQLite index (models/article.py ARTICLE_SEARCH_DDL)
+articles_fts = table("articles_fts", column("rowid"))
+# The generated tsvector column of the PostgreSQL index
+SEARCH_VECTOR = literal_column("articles.search_vector")
+
+
+def query_words(q: str) -> List[str]:
+    words = re.findall(r"\w+", q)[:MAX_QUERY_WORDS]
+    if not words:
+        raise HTTPException(status_code=400, detail="Search query must contain a word")
+    return words
+
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """The database's snippet as HTML: escaped, matches in <mark>."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+class ArticleSearch:
+    """
+    Ranked full-text search over article titles and content, every word of the
+    query required (stemmed: "kittens" finds "kitten"). On PostgreSQL it reads
+    the GIN-indexed search_vector, ranked by ts_rank_cd; on SQLite the FTS5
+    table, ranked by bm25. Title matches weigh more than content matches.
+
+    Pages are keyset-paginated on (rank, id) like Keyset, the cursor being the
+    last row's rank and id. Matches are ranked and cut to the page in a
+    subquery on the index alone; only the page's rows are then read from
+    articles, with the columns the caller loads and a snippet of the content
+    around the matches - never the content of rows that aren't shown.
+    """
+
+    async def page(self, db: AsyncSession, q: str, statement: Select, limit: Optional[int],
+                   cursor: Optional[str]) -> Tuple[list, Optional[str]]:
+        """
+        One page of matches for q among the rows of the select(Article) statement
+        (with its filters and loader options), best first, and the next page's cursor.
+        """
+        words = query_words(q)
+        limit = limit or DEFAULT_PAGE_SIZE
+        postgresql = db.bind.dialect.name == "postgresql"
+        hits, snippet = self._postgresql(words) if postgresql else self._sqlite(words)
+        if statement.whereclause is not None:
+            hits = hits.where(statement.whereclause)
+        hit_id, rank = hits.selected_columns.id, hits.selected_columns.search_rank
+        if cursor:
+            cursor_rank, cursor_id = self.decode(cursor)
+            hits = hits.where(tuple_(rank, hit_id) < tuple_(cursor_rank, cursor_id))
+        # One extra row tells whether there is a next page without a COUNT
+        hits = hits.order_by(rank.desc(), hit_id.desc()).limit(limit + 1).subquery()
+
+        statement = (statement.join(hits, hits.c.id == Article.id)
+                     .options(with_expression(Article.search_rank, hits.c.search_rank),
+                              with_expression(Article.snippet, snippet))
+                     .order_by(hits.c.search_rank.desc(), Article.id.desc()))
+        if not postgresql:
+            # snippet() needs the FTS5 match of the row it is called for
+            statement = statement.join(articles_fts, articles_fts.c.rowid == Article.id).where(
+                literal_column("articles_fts").op("MATCH")(self.fts_query(words)))
+        rows = (await db.scalars(statement)).all()
+
+        for row in rows:
+            row.snippet = highlight(row.snippet)
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor([rows[-1].search_rank, rows[-1].id])
+
+    @staticmethod
+    def decode(cursor: str) -> Tuple[float, int]:
+        try:
+            rank, row_id = decode_cursor(cursor)
+            return float(rank), int(row_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    @staticmethod
+    def fts_query(words: List[str]) -> str:
+        # Each word quoted, so FTS5 never reads it as an operator
+        return " ".join(f'"{word}"' for word in words)
+
+    def _postgresql(self, words):
+        query = func.plainto_tsquery(SEARCH_LANGUAGE, " ".join(words))
+        rank = func.ts_rank_cd(SEARCH_VECTOR, query, type_=Float)
+        hits = (select(Article.id.label("id"), rank.label("search_rank"))
+                .where(SEARCH_VECTOR.op("@@")(query)))
+        snippet = func.ts_headline(
+            SEARCH_LANGUAGE, Article.content, query,
+            f'StartSel="{MARK_START}", StopSel="{MARK_END}", MaxWords={SNIPPET_WORDS}, '
+            f'MinWords={SNIPPET_WORDS // 2}, MaxFragments=2, FragmentDelimiter=" … "')
+        return hits, snippet
+
+    def _sqlite(self, words):
+        fts = literal_column("articles_fts")
+        # bm25 is lower for better matches; title (column 0) counts 10x
+        rank = -func.bm25(fts, 10.0, 1.0, type_=Float)
+        # Joined to articles for the caller's filters (published, ...)
+        hits = (select(Article.id.label("id"), rank.label("search_rank"))
+                .select_from(articles_fts).join(Article, Article.id == articles_fts.c.rowid)
+                .where(fts.op("MATCH")(self.fts_query(words))))
+        snippet = func.snippet(fts, 1, MARK_START, MARK_END, " … ", SNIPPET_WORDS)
+        return hits, snippet
@@ -1,7 +1,13 @@
-from sqlalchemy import create_engine
+from sqlalchemy import DateTime, create_engine, event
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -21,16 +27,190 @@ else:
 
 print(f"🎯 Final DATABASE_URL: {DATABASE_URL}")
 
+# Connection pool, per engine and worker process: DB_POOL_SIZE connections are kept
+# open, up to DB_MAX_OVERFLOW more are opened under load, and a request waits at most
+# DB_POOL_TIMEOUT seconds for one. Size it so workers x (size + overflow) (x2: sync and
+# async engine) stays below the server's max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Reopen connections older than this many seconds (-1: never), before a managed
+# database or proxy drops them as idle
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test each connection on checkout and replace it if the server closed it
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side limit per statement in milliseconds (PostgreSQL; 0: no limit)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# SQL logging: 'false', 'true' (statements) or 'debug' (statements and result rows)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower()
+
+
+class PoolTelemetry:
+    """
+    Counters for one engine's connection pool: how long checkouts waited for a
+    connection (a free one, or a new one being opened), how many gave up (pool
+    timeout), and connections opened and invalidated (e.g. dropped by the
+    server and caught by pre-ping).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_checkout(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            # Getting an idle connection takes microseconds; anything longer waited
+            if seconds >= 0.001:
+                self.waited += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        attempts = self.checkouts + self.timeouts
+        return {
+            "checkouts": self.checkouts,
+            "waited": self.waited,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_seconds / attempts * 1000, 3) if attempts else None,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            "wait_seconds": round(self.wait_seconds, 6),
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+        }
+
+
+def timed_pool(pool_class, telemetry: PoolTelemetry):
+    """pool_class, recording how long each checkout waits for a connection."""
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except Exception:
+                telemetry.record_checkout(time.perf_counter() - start, timed_out=True)
+                raise
+            telemetry.record_checkout(time.perf_counter() - start)
+            return connection
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+def engine_options(url, pool_class, telemetry: PoolTelemetry, statement_timeout_args: dict) -> dict:
+    """create_engine() keyword arguments from the DB_* settings."""
+    options = {
+        "echo": "debug" if DB_ECHO == "debug" else DB_ECHO == "true",
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            # In-memory databases live in a single connection: keep SQLite's own pool
+            return options
+    elif DB_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = statement_timeout_args
+    options.update(
+        poolclass=timed_pool(pool_class, telemetry),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def watch_pool(engine, telemetry: PoolTelemetry):
+    event.listen(engine, "connect", lambda dbapi_connection, record: telemetry.record_connect())
+    event.listen(engine, "invalidate", lambda dbapi_connection, record, error: telemetry.record_invalidation())
+
+
+def pool_stats(engine, telemetry: PoolTelemetry) -> dict:
+    """Current pool occupancy plus the telemetry counters."""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            # Connections beyond size (negative: not all of the size opened yet)
+            overflow=pool.overflow(),
+            timeout_seconds=pool.timeout(),
+            recycle_seconds=pool._recycle,
+            pre_ping=pool._pre_ping,
+        )
+    stats.update(telemetry.stats())
+    return stats
+
+
+sync_pool_telemetry = PoolTelemetry()
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith(
-        "sqlite") else {},
-    echo=True  # Debug SQL queries
+    **engine_options(DATABASE_URL, QueuePool, sync_pool_telemetry,
+                     {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"})
 )
+watch_pool(engine, sync_pool_telemetry)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url: str):
+    """The same database through an asyncio driver: asyncpg for PostgreSQL, aiosqlite for SQLite."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if url.get_backend_name() in ("postgresql", "postgres"):
+        url = url.set(drivername="postgresql+asyncpg")
+        # libpq's sslmode is asyncpg's ssl
+        if "sslmode" in url.query:
+            url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(["sslmode"])
+        return url
+    return url
+
+
+# Async engine for request handlers: queries await the driver instead of blocking
+# the event loop. Background threads and the media store pipeline use SessionLocal.
+async_pool_telemetry = PoolTelemetry()
+async_engine = create_async_engine(
+    async_database_url(DATABASE_URL),
+    **engine_options(DATABASE_URL, AsyncAdaptedQueuePool, async_pool_telemetry,
+                     {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}})
+)
+watch_pool(async_engine.sync_engine, async_pool_telemetry)
+# Objects stay loaded after commit: an expired attribute would need a lazy load,
+# which AsyncSession can't do implicitly
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+# Timestamps set by the database (server_default=func.now()) that keyset pagination
+# compares against. SQLite stores CURRENT_TIMESTAMP as 'YYYY-MM-DD HH:MM:SS' but binds
+# datetimes with microseconds, so a cursor taken from a row would never equal it and
+# rows sharing a second would be skipped or repeated; bind in the stored format there.
+ServerTimestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite")
+
 
 def get_db():
     db = SessionLocal()
@@ -38,3 +218,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def database_pool_stats() -> dict:
+    return {
+        "sync": pool_stats(engine, sync_pool_telemetry),
+        "async": pool_stats(async_engine.sync_engine, async_pool_telemetry),
+    }
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+# Configuration
+RESIZE_CACHE_DIR = Path(os.getenv("RESIZE_CACHE_DIR", "static/uploads/resized"))
+RESIZE_CACHE_MAX_BYTES = int(os.getenv("RESIZE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class DiskLRUCache:
+    """
+    Files in one directory, capped at a total byte budget.
+    The least recently used files are deleted when a new file pushes the total
+    over budget. Recency is kept in the file mtimes as well, so a restart picks
+    up the same order. Concurrent misses for one key are coalesced: the first
+    request creates the file and the others wait for it.
+
+    The directory is shared by every worker process: a file another worker
+    wrote is a hit here too (and joins the index), and each new file rescans
+    the directory so the budget holds for all of them together. Hits return the
+    file's bytes rather than its path, so another worker's eviction can't
+    delete a file a response is still being served from; a file deleted before
+    it is read is a miss and created again. File I/O runs in a thread.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # name -> size, least recently used first
+        self._bytes = 0
+        # Guards the index: lookups and writes run in worker threads
+        self._index_lock = threading.Lock()
+        self._locks = {}  # name -> [asyncio.Lock, waiting requests]
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._rescan()
+
+    def _rescan(self, newest: Optional[str] = None):
+        """Rebuild the index from the directory (oldest mtime first) and evict down to budget."""
+        files = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.startswith("."):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        with self._index_lock:
+            # File timestamps are coarse: order ties the way this process used them
+            rank = {name: position for position, name in enumerate(self._entries)}
+            rank[newest] = len(rank)
+            files.sort(key=lambda file: (file[1], rank.get(file[0], -1)))
+            self._entries = OrderedDict((name, size) for name, _, size in files)
+            self._bytes = sum(self._entries.values())
+            self._evict(keep=newest)
+
+    def _lookup(self, name: str) -> Optional[bytes]:
+        path = self.root / name
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # Not created yet, or evicted by another worker process
+            with self._index_lock:
+                self._bytes -= self._entries.pop(name, 0)
+            return None
+        with self._index_lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+            else:
+                # Created by another worker process
+                self._entries[name] = len(data)
+                self._bytes += len(data)
+                self._evict(keep=name)
+        return data
+
+    def _put(self, name: str, data: bytes) -> bytes:
+        path = self.root / name
+        tmp_path = self.root / f".{name}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._rescan(newest=name)
+        return data
+
+    def _evict(self, keep: Optional[str] = None):
+        # Called holding _index_lock; keep (the newest file) is never evicted
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            name = next(iter(self._entries))
+            if name == keep:
+                break
+            size = self._entries.pop(name)
+            (self.root / name).unlink(missing_ok=True)
+            self._bytes -= size
+            self.evictions += 1
+
+    async def get_or_create(self, name: str, create: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Return the cached bytes for name, calling create() to produce them on a miss."""
+        data = await asyncio.to_thread(self._lookup, name)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        lock_entry = self._locks.setdefault(name, [asyncio.Lock(), 0])
+        lock_entry[1] += 1
+        try:
+            async with lock_entry[0]:
+                data = await asyncio.to_thread(self._lookup, name)
+                if data is not None:
+                    # Another request created it while this one waited
+                    self.coalesced += 1
+                    return data
+                self.misses += 1
+                return await asyncio.to_thread(self._put, name, await create())
+        finally:
+            lock_entry[1] -= 1
+            if lock_entry[1] == 0:
+                del self._locks[name]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else None,
+        }
+
+
+resize_cache = DiskLRUCache(RESIZE_CACHE_DIR, RESIZE_CACHE_MAX_BYTES)
@@ -0,0 +1,130 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+
+from .metrics import IMAGE_PROCESSING_SECONDS, IMAGE_QUEUE_WAIT_SECONDS
+
+# Configuration
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+# Jobs allowed to wait for a free worker before new ones are refused with 503
+IMAGE_MAX_QUEUE = int(os.getenv("IMAGE_MAX_QUEUE", "8"))
+
+
+def _timed_call(fn, args):
+    """Runs inside the worker process: call fn and report when it started and finished."""
+    started_at = time.time()
+    result = fn(*args)
+    return started_at, time.time(), result
+
+
+class ImageEngine:
+    """
+    Bounded process pool for Pillow work (decode, resize, encode).
+    Keeps CPU-heavy image processing off the event loop so one large upload
+    doesn't stall every other request on the worker.
+    """
+
+    def __init__(self, workers: int = IMAGE_WORKERS, max_queue: int = IMAGE_MAX_QUEUE):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = None
+        self._in_flight = 0
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.processing_total = 0.0
+        self.processing_max = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so importing the app (scripts, alembic) never spawns processes.
+        # 'spawn' avoids forking a process that already runs an event loop and DB pool.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs submitted but not yet picked up by a worker (upper bound)."""
+        return max(0, self._in_flight - self.workers)
+
+    @property
+    def busy(self) -> bool:
+        """Every worker is taken (background work should wait)."""
+        return self._in_flight >= self.workers
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) in a worker process and return its result.
+        fn must be a module-level function and args must be picklable.
+        Raises HTTPException(503) when the queue is full.
+        """
+        if self._in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Image processing is busy, please retry shortly",
+                headers={"Retry-After": "5"})
+
+        self._in_flight += 1
+        self.submitted += 1
+        submitted_at = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            started_at, finished_at, result = await loop.run_in_executor(
+                self._get_executor(), _timed_call, fn, args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+        queue_wait = max(0.0, started_at - submitted_at)
+        processing = finished_at - started_at
+        self.completed += 1
+        self.queue_wait_total += queue_wait
+        self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+        self.processing_total += processing
+        self.processing_max = max(self.processing_max, processing)
+        IMAGE_QUEUE_WAIT_SECONDS.observe(queue_wait)
+        IMAGE_PROCESSING_SECONDS.labels(fn.__name__).observe(processing)
+        return result
+
+    def stats(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": round(self.queue_wait_total / completed * 1000, 2),
+            "queue_wait_max_ms": round(self.queue_wait_max * 1000, 2),
+            "processing_avg_ms": round(self.processing_total / completed * 1000, 2),
+            "processing_max_ms": round(self.processing_max * 1000, 2),
+        }
+
+    def start(self):
+        """Create the pool (worker processes are spawned as jobs arrive)."""
+        self._get_executor()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+image_engine = ImageEngine()
@@ -0,0 +1,132 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from .database import AsyncSessionLocal
+from .image_engine import image_engine
+from .media_store import media_store
+from .models.media import MediaAsset
+from .photo_utils import reencode_media, store_reencoded_variants
+
+# Configuration
+# Seconds between scans for assets still waiting for their 'max' re-encode
+# (uploads wake the optimizer straight away, this catches everything else)
+IMAGE_OPTIMIZE_INTERVAL = float(os.getenv("IMAGE_OPTIMIZE_INTERVAL", "60"))
+IMAGE_OPTIMIZE_BATCH = 20
+# How long to wait before checking again whether an image worker is free
+IDLE_POLL_SECONDS = 0.5
+
+
+class ImageOptimizer:
+    """
+    Background pass that re-encodes fast-profile uploads with the 'max' profile
+    and swaps in the results that came out smaller.
+    Pending assets are the ones with optimized_at = NULL, so the work list
+    survives restarts. Jobs only start while the image engine has a free worker,
+    so uploads never queue behind them.
+    """
+
+    def __init__(self, interval: float = IMAGE_OPTIMIZE_INTERVAL):
+        self.interval = interval
+        self._task = None
+        self._wake = None
+        # asset hash -> legacy (full, thumbnail) files written with it; in memory only,
+        # so after a restart those files simply keep their fast encode
+        self._legacy_files = {}
+        self.optimized = 0
+        self.failed = 0
+        self.bytes_saved = 0
+
+    def start(self):
+        """Start the background loop (call from a running event loop)."""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, asset_hash: Optional[str] = None, legacy_files: Optional[Tuple[Path, Path]] = None):
+        """Wake the optimizer after an upload, remembering the legacy files written for the asset."""
+        if asset_hash and legacy_files:
+            self._legacy_files[asset_hash] = legacy_files
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.optimize_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Image optimizer pass failed: {e}")
+
+    async def optimize_pending(self):
+        """Re-encode pending assets until there are none left (or the image engine pushes back)."""
+        while True:
+            async with AsyncSessionLocal() as db:
+                assets = (await db.scalars(
+                    select(MediaAsset)
+                    .where(MediaAsset.optimized_at.is_(None), MediaAsset.variants.isnot(None))
+                    .order_by(MediaAsset.created_at)
+                    .limit(IMAGE_OPTIMIZE_BATCH))).all()
+                if not assets:
+                    return
+                for asset in assets:
+                    while image_engine.busy:
+                        await asyncio.sleep(IDLE_POLL_SECONDS)
+                    if not await self.optimize(db, asset):
+                        return
+
+    async def optimize(self, db, asset: MediaAsset) -> bool:
+        """Re-encode one asset. Returns False when the image engine is saturated (retry later)."""
+        legacy_files = self._legacy_files.pop(asset.hash, None)
+        try:
+            if not media_store.exists(asset.hash, asset.ext):
+                raise FileNotFoundError(f"{asset!r} is missing from the media store")
+            rendered = await image_engine.run(
+                reencode_media, media_store.path_for(asset.hash, asset.ext), legacy_files)
+        except HTTPException:
+            # 503 from the image engine - leave the asset pending
+            if legacy_files:
+                self._legacy_files[asset.hash] = legacy_files
+            return False
+        except Exception as e:
+            # Keep the fast encodes rather than retrying a broken asset forever
+            print(f"⚠️  Could not optimize {asset!r}: {e}")
+            store_reencoded_variants(db, asset, [])
+            await db.commit()
+            self.failed += 1
+            return True
+
+        self.bytes_saved += store_reencoded_variants(db, asset, rendered["variants"]) + rendered["legacy_saved"]
+        await db.commit()
+        self.optimized += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "optimized": self.optimized,
+            "failed": self.failed,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+image_optimizer = ImageOptimizer()
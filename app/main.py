@@ -4,23 +4,74 @@ from fastapi import FastAPI, Request, Depends, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
+import asyncio
 import os
-from .database import Base, engine, get_db
+from contextlib import asynccontextmanager
+from .database import Base, engine, async_engine, get_async_db, database_pool_stats
+from .metrics import (
+    CONTENT_TYPE_LATEST, REGISTRY, DatabasePoolCollector, MetricsMiddleware, metrics_authorized, metrics_response_body,
+)
 from .models import Cat, Article, AdoptionQuestion, AdoptionRequest
-from .api.cats import router as cats_router
-from .api.articles import router as articles_router
+from .models.article import ArticleImage
+from .schemas.article import ArticleDetailView, RelatedArticleView
+from .api.cats import router as cats_router, CatFilters
+from .api.articles import router as articles_router, ARTICLE_FIELDS, ARTICLE_PAGES
 from .api.article_images import router as article_images_router
 from .api.adoption import router as adoption_router
+from .api.media import router as media_router
+from .api.images import router as images_router
+from .api.conditional import Conditional
 from .upload_api import router as upload_router
 from .auth import authenticate_user
+from .image_engine import image_engine
+from .image_optimizer import image_optimizer
+from .media_janitor import media_janitor
+from .response_cache import ResponseCacheMiddleware, response_cache
+from .sql_profiler import SqlProfilerMiddleware, instrument
+from .upload_limits import UploadLimitMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the background workers with the server and stop them in reverse order."""
+    # Pillow worker processes
+    image_engine.start()
+    # Re-encode fast-profile uploads in the background
+    image_optimizer.start()
+    # Sweep temp files and orphaned uploads periodically
+    media_janitor.start()
+    # Subscribe to other workers' cache invalidations (redis backend)
+    response_cache.start()
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(response_cache.stop)
+        await media_janitor.stop()
+        await image_optimizer.stop()
+        await asyncio.to_thread(image_engine.shutdown)
+        # Close the async engine's pooled connections
+        await async_engine.dispose()
 
 
 app = FastAPI(title="LavanderCats Cattery",
-              description="Siberian Cat Breeding Cattery")
+              description="Siberian Cat Breeding Cattery",
+              lifespan=lifespan)
+
+# Serve cached public GET responses (added first, so it is the innermost middleware
+# and never caches CORS or session headers)
+app.add_middleware(ResponseCacheMiddleware)
+
+# Count and time each request's SQL (Server-Timing header, slow and repeated query
+# log); outside the response cache, so a cached response never carries a stale timing
+instrument(engine)
+instrument(async_engine.sync_engine)
+app.add_middleware(SqlProfilerMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -35,6 +86,33 @@ app.add_middleware(
 app.add_middleware(SessionMiddleware,
                    secret_key=os.getenv("SECRET_KEY", "dev-secret-key-change-in-production"))
 
+# Abort oversized upload bodies while they stream in
+app.add_middleware(UploadLimitMiddleware)
+
+
+# Admin authentication middleware
+@app.middleware("http")
+async def admin_auth_middleware(request: Request, call_next):
+    """Protect admin routes with authentication."""
+    if request.url.path.startswith("/admin") and not request.url.path.startswith("/admin/login"):
+        # Check for access token in cookies
+        access_token = request.cookies.get("access_token")
+        if not access_token:
+            return RedirectResponse(url="/admin/login", status_code=302)
+
+        # Here you could verify the token if needed
+        # For now, just check if token exists
+
+    response = await call_next(request)
+    return response
+
+
+# Request latency / size / in-flight metrics. Added after every other middleware,
+# @app.middleware functions included, so it is the outermost and times them all
+# (admin login redirects too); register new middleware above this line
+app.add_middleware(MetricsMiddleware)
+REGISTRY.register(DatabasePoolCollector(database_pool_stats))
+
 # Serve static files (CSS, JS, images)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -121,23 +199,45 @@ app.include_router(article_images_router, prefix="/api",
 app.include_router(adoption_router, prefix="/api", tags=["adoption"])
 app.include_router(upload_router, prefix="/api", tags=["uploads"])
 
-# Admin authentication middleware
+# Content-addressed images (served outside /api so URLs stay short and cacheable)
+app.include_router(media_router, tags=["media"])
+# On-demand resized images: /img/{kind}/{id}?w=&h=&fit=&fmt=
+app.include_router(images_router, tags=["media"])
 
 
-@app.middleware("http")
-async def admin_auth_middleware(request: Request, call_next):
-    """Protect admin routes with authentication."""
-    if request.url.path.startswith("/admin") and not request.url.path.startswith("/admin/login"):
-        # Check for access token in cookies
-        access_token = request.cookies.get("access_token")
-        if not access_token:
-            return RedirectResponse(url="/admin/login", status_code=302)
+@app.get("/api/cache-stats", tags=["cache"])
+async def get_response_cache_stats():
+    """
+    Response cache statistics: hit rate, entries and bytes held, evictions, expirations and invalidations.
+    """
+    return JSONResponse(content={
+        "success": True,
+        "data": await asyncio.to_thread(response_cache.stats)
+    })
 
-        # Here you could verify the token if needed
-        # For now, just check if token exists
 
-    response = await call_next(request)
-    return response
+def require_metrics_token(request: Request):
+    """Guard for operational stats: the METRICS_TOKEN Bearer token, when one is set."""
+    if not metrics_authorized(request.headers.get("authorization")):
+        raise HTTPException(status_code=401, detail="Metrics token required")
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    """Prometheus metrics (text exposition format) for this worker process."""
+    return Response(content=metrics_response_body(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/api/db/pool-stats", tags=["database"], dependencies=[Depends(require_metrics_token)])
+async def get_database_pool_stats():
+    """
+    Connection pool statistics for the sync and async engines: size and overflow
+    in use, connections checked out, checkout waits and timeouts.
+    """
+    return JSONResponse(content={
+        "success": True,
+        "data": database_pool_stats()
+    })
 
 # Frontend routes
 
@@ -147,10 +247,23 @@ async def homepage(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+# Server-rendered pages revalidate like the JSON APIs (ETag / Last-Modified, 304)
+# and are served from the response cache until their data changes
+CATS_PAGE_VERSIONS = Conditional("cats", "media_assets", cache=True)
+ARTICLE_PAGE_VERSIONS = Conditional("articles", "article_images", "media_assets", cache=True)
+# Cards below an article: how many, and the fields they show
+RELATED_ARTICLES = 2
+RELATED_ARTICLE_FIELDS = tuple(RelatedArticleView.model_fields)
+
+
 @app.get("/cats")
-async def cats_page(request: Request, db: Session = Depends(get_db)):
-    # Fetch all cats from the database
-    cats = db.query(Cat).all()
+async def cats_page(request: Request, filters: CatFilters = Depends(), db: AsyncSession = Depends(get_async_db)):
+    validators = await CATS_PAGE_VERSIONS.validators(request, db)
+    if CATS_PAGE_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    # Only the cats matching the page's filters (?available=true, ?gender=, ?q=, ?sort=, ...)
+    cats = (await db.scalars(filters.pages.order(filters.apply(select(Cat), db)))).all()
 
     # Convert Cat objects to dictionaries for JSON serialization
     cats_data = []
@@ -171,6 +284,14 @@ async def cats_page(request: Request, db: Session = Depends(get_db)):
             "is_available": cat.is_available,
             "photo_url": photo_url,
             "photo_base64": cat.photo_base64,
+            "photo_media_url": cat.photo_media_url,
+            "photo_srcset": cat.photo_srcset,
+            "photo_placeholder": cat.photo_placeholder,
+            "photo_width": cat.photo_width,
+            "photo_height": cat.photo_height,
+            "photo_format": cat.photo_format,
+            "photo_bytes": cat.photo_bytes,
+            "photo_color": cat.photo_color,
             "created_at": cat.created_at.isoformat() if cat.created_at else None,
             "updated_at": cat.updated_at.isoformat() if cat.updated_at else None
         }
@@ -178,8 +299,9 @@ async def cats_page(request: Request, db: Session = Depends(get_db)):
 
     return templates.TemplateResponse("cats.html", {
         "request": request,
-        "cats": cats_data
-    })
+        "cats": cats_data,
+        "filters": filters
+    }, headers=validators)
 
 
 @app.get("/our-cats")
@@ -194,37 +316,34 @@ async def news_page(request: Request):
 
 
 @app.get("/article/{article_id}")
-async def article_detail_page(article_id: int, request: Request, db: Session = Depends(get_db)):
+async def article_detail_page(article_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Serve individual article detail page."""
-    article = db.query(Article).filter(
-        Article.id == article_id, Article.published == True).first()
+    validators = await ARTICLE_PAGE_VERSIONS.validators(request, db)
+    if ARTICLE_PAGE_VERSIONS.not_modified(request, validators):
+        return Response(status_code=304, headers=validators)
+
+    # One SELECT for the article and its featured image's asset, one for the
+    # gallery and its assets - however many images there are
+    article = await db.scalar(select(Article).options(
+        joinedload(Article.featured_image_asset),
+        selectinload(Article.images).joinedload(ArticleImage.image_asset),
+    ).where(Article.id == article_id, Article.published == True))
 
     if not article:
         # Return 404 page or redirect to news
         return templates.TemplateResponse("news.html", {"request": request, "error": "Article not found"})
 
-    # Format featured image URL
-    if article.featured_image and not article.featured_image.startswith(('http://', 'https://', '/static/')):
-        article.featured_image = f"/static/{article.featured_image}"
-
-    # Get article images
-    from .models.article import ArticleImage
-    images = db.query(ArticleImage).filter(
-        ArticleImage.article_id == article_id).order_by(ArticleImage.display_order).all()
-
-    # Format image URLs and base64 data for template display
-    for image in images:
-        if image.image_path and not image.image_path.startswith(('http://', 'https://', '/static/')):
-            image.image_path = f"/static/{image.image_path}"
-        # Ensure base64 images have the proper data URI prefix
-        if image.image_base64 and not image.image_base64.startswith('data:'):
-            image.image_base64 = f"data:image/jpeg;base64,{image.image_base64}"
+    # Newest other published articles, as excerpt cards
+    related_query = select(Article).options(*ARTICLE_FIELDS.options(RELATED_ARTICLE_FIELDS)).where(
+        Article.published == True, Article.id != article_id)
+    related = (await db.scalars(ARTICLE_PAGES.order(related_query).limit(RELATED_ARTICLES))).all()
 
+    # Read-only views: the display URLs are computed without touching the ORM objects
     return templates.TemplateResponse("article_detail.html", {
         "request": request,
-        "article": article,
-        "images": images
-    })
+        "article": ArticleDetailView.model_validate(article),
+        "related_articles": [RelatedArticleView.model_validate(item) for item in related],
+    }, headers=validators)
 
 
 @app.get("/admin/login")
@@ -302,6 +421,22 @@ async def adoption_questions_admin(request: Request):
     return templates.TemplateResponse("adoption_questions_admin.html", {"request": request})
 
 
+@app.post("/admin/media-janitor/sweep")
+async def run_media_janitor():
+    """
+    Run a media janitor sweep now (it also runs every MEDIA_JANITOR_INTERVAL seconds):
+    temp files, orphaned media assets, uploads and blobs, expired quarantine.
+    Admin only (admin_auth_middleware): the sweep deletes rows and moves files.
+    """
+    report = await media_janitor.run_once()
+    return JSONResponse(content={
+        "success": True,
+        "message": f"Reclaimed {report['reclaimed_bytes']} bytes, deleted {report['orphan_assets']} orphaned assets, "
+                   f"quarantined {report['quarantined_files']} orphaned files",
+        "data": report
+    })
+
+
 @app.get("/adoption-form")
 async def adoption_form(request: Request):
     """Serve adoption request form for customers."""
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .database import SessionLocal
+from .media_store import media_store
+from .models.cat import Cat
+from .models.article import Article, ArticleImage
+from .models.media import MediaAsset, ImageFingerprint
+from .photo_utils import UPLOAD_DIR, CATS_DIR, ARTICLES_DIR, THUMBNAILS_DIR, cleanup_old_temp_files, static_path
+
+# Configuration
+MEDIA_JANITOR_INTERVAL = float(os.getenv("MEDIA_JANITOR_INTERVAL", str(6 * 3600)))
+# Unreferenced files and media assets younger than this are left alone: photos
+# are uploaded before the cat/article form that references them is saved
+ORPHAN_MIN_AGE = float(os.getenv("ORPHAN_MIN_AGE", str(24 * 3600)))
+# Orphans are moved here (outside static/, so no longer served) and deleted after QUARANTINE_DAYS
+QUARANTINE_DIR = Path(os.getenv("MEDIA_QUARANTINE_DIR", "quarantine"))
+QUARANTINE_DAYS = int(os.getenv("QUARANTINE_DAYS", "30"))
+# Interrupted atomic writes leave '.name.xxxx.tmp' files next to their target
+STALE_TMP_AGE = 3600
+
+LEGACY_UPLOAD_DIRS = (CATS_DIR, ARTICLES_DIR, THUMBNAILS_DIR)
+# Columns holding the media asset a row shows
+ASSET_HASH_COLUMNS = (Cat.photo_hash, Article.featured_image_hash, ArticleImage.image_hash)
+
+
+def referenced_upload_files(db) -> tuple:
+    """
+    Legacy upload files rows still point at, as (paths, base names).
+    A thumbnail counts as referenced when its full-size file is.
+    """
+    paths = set()
+    bases = set()
+    for column in (Cat.photo_url, Article.featured_image, ArticleImage.image_path):
+        for (value,) in db.query(column).filter(column.isnot(None)).yield_per(500):
+            path = static_path(value)
+            if path is None:
+                continue
+            paths.add(path)
+            base, sep, _ = path.stem.rpartition("_full")
+            if sep:
+                bases.add(base)
+    return paths, bases
+
+
+def referenced_asset_hashes(db) -> set:
+    """Hashes of the media assets a Cat/Article/ArticleImage row still shows."""
+    hashes = set()
+    for column in ASSET_HASH_COLUMNS:
+        hashes.update(value for (value,) in db.query(column).filter(column.isnot(None)).distinct())
+    return hashes
+
+
+def delete_orphan_assets(db, min_age: float, now: float) -> int:
+    """
+    Delete the media asset rows no row shows any more (deleted cats and articles, replaced
+    photos) once they are older than min_age, with the fingerprints that would let a new
+    upload reuse them. Their blobs are then unused and quarantined by the sweep.
+    Returns the number of assets deleted.
+    """
+    referenced = referenced_asset_hashes(db)
+    cutoff = datetime.fromtimestamp(now - min_age, timezone.utc)
+    orphans = []
+    for content_hash, created_at in db.query(MediaAsset.hash, MediaAsset.created_at).yield_per(500):
+        if content_hash in referenced:
+            continue
+        if created_at is not None and created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)  # SQLite keeps UTC without an offset
+        if created_at is None or created_at < cutoff:
+            orphans.append(content_hash)
+
+    for start in range(0, len(orphans), 500):
+        batch = orphans[start:start + 500]
+        db.query(ImageFingerprint).filter(ImageFingerprint.asset_hash.in_(batch)).delete(synchronize_session=False)
+        db.query(MediaAsset).filter(MediaAsset.hash.in_(batch)).delete(synchronize_session=False)
+    db.commit()
+    return len(orphans)
+
+
+def referenced_media_blobs(db) -> set:
+    """(hash, ext) of every blob a media asset uses: its display image and its variants."""
+    blobs = set()
+    for content_hash, ext, variants in db.query(
+            MediaAsset.hash, MediaAsset.ext, MediaAsset.variants).yield_per(500):
+        blobs.add((content_hash, ext))
+        for variant in json.loads(variants) if variants else []:
+            blobs.add((variant["hash"], variant["format"]))
+    return blobs
+
+
+def is_old(path: Path, min_age: float, now: float) -> bool:
+    try:
+        return now - path.stat().st_mtime > min_age
+    except FileNotFoundError:
+        return False
+
+
+class MediaJanitor:
+    """
+    Periodic clean-up of upload storage, run off the event loop:
+    - deletes stale temp files (spooled uploads, interrupted media store writes)
+    - deletes media assets no Cat/Article/ArticleImage row shows, then quarantines
+      legacy upload files no row references and media store blobs no asset uses
+    - deletes quarantined files after QUARANTINE_DAYS
+    To restore a quarantined file, move it back to the same relative path.
+    """
+
+    def __init__(self, interval: float = MEDIA_JANITOR_INTERVAL):
+        self.interval = interval
+        self._task = None
+        self._lock = asyncio.Lock()
+        self.runs = 0
+        self.last_report = None
+        self.reclaimed_bytes = 0
+        self.quarantined_bytes = 0
+
+    def start(self):
+        """Start the periodic sweeps (call from a running event loop)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"⚠️  Media janitor sweep failed: {e}")
+
+    async def run_once(self) -> dict:
+        """Sweep now (in a thread) and return the report. Concurrent calls run one after another."""
+        async with self._lock:
+            report = await asyncio.to_thread(self.sweep)
+        self.runs += 1
+        self.last_report = report
+        self.reclaimed_bytes += report["reclaimed_bytes"]
+        self.quarantined_bytes += report["quarantined_bytes"]
+        print(f"🧹 Media janitor: {report['reclaimed_bytes'] / 1024:.0f} KB reclaimed, "
+              f"{report['orphan_assets']} orphaned assets deleted, "
+              f"{report['quarantined_files']} orphans ({report['quarantined_bytes'] / 1024:.0f} KB) quarantined")
+        return report
+
+    def sweep(self) -> dict:
+        started_at = time.time()
+        report = {
+            "temp_bytes": self.clean_temp_files(),
+            "quarantined_files": 0,
+            "quarantined_bytes": 0,
+        }
+
+        db = SessionLocal()
+        try:
+            report["orphan_assets"] = delete_orphan_assets(db, ORPHAN_MIN_AGE, started_at)
+            paths, bases = referenced_upload_files(db)
+            blobs = referenced_media_blobs(db)
+        finally:
+            db.close()
+
+        batch_dir = QUARANTINE_DIR / datetime.now().strftime("%Y%m%d")
+        for directory in LEGACY_UPLOAD_DIRS:
+            for path in directory.iterdir():
+                if not path.is_file() or path.name.startswith(".") or path in paths:
+                    continue
+                base, sep, _ = path.stem.rpartition("_thumb")
+                if sep and base in bases:
+                    continue
+                if is_old(path, ORPHAN_MIN_AGE, started_at):
+                    self.quarantine(path, batch_dir / path.relative_to(UPLOAD_DIR), report)
+
+        for content_hash, ext, path in media_store.iter_blobs():
+            if (content_hash, ext) not in blobs and is_old(path, ORPHAN_MIN_AGE, started_at):
+                self.quarantine(path, batch_dir / "media" / path.relative_to(media_store.root), report)
+
+        report["purged_files"], report["purged_bytes"] = self.purge_quarantine()
+        report["reclaimed_bytes"] = report["temp_bytes"] + report["purged_bytes"]
+        report["duration_ms"] = round((time.time() - started_at) * 1000, 2)
+        report["finished_at"] = datetime.now().isoformat()
+        return report
+
+    def clean_temp_files(self) -> int:
+        """Delete stale temp files only (spooled uploads, interrupted writes). Returns the bytes reclaimed."""
+        return cleanup_old_temp_files() + self.remove_stale_tmp_files(time.time())
+
+    @staticmethod
+    def remove_stale_tmp_files(now: float) -> int:
+        reclaimed = 0
+        for path in media_store.root.glob("*/.*.tmp"):
+            if is_old(path, STALE_TMP_AGE, now):
+                size = path.stat().st_size
+                path.unlink(missing_ok=True)
+                reclaimed += size
+        return reclaimed
+
+    @staticmethod
+    def quarantine(path: Path, target: Path, report: dict):
+        try:
+            size = path.stat().st_size
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(path, target)
+        except FileNotFoundError:
+            # Removed meanwhile (another worker process's janitor)
+            return
+        report["quarantined_files"] += 1
+        report["quarantined_bytes"] += size
+
+    @staticmethod
+    def purge_quarantine() -> tuple:
+        """Delete quarantine batches older than QUARANTINE_DAYS. Returns (files, bytes)."""
+        if not QUARANTINE_DIR.is_dir():
+            return 0, 0
+        cutoff = (datetime.now() - timedelta(days=QUARANTINE_DAYS)).strftime("%Y%m%d")
+        files = 0
+        purged = 0
+        for batch_dir in QUARANTINE_DIR.iterdir():
+            if batch_dir.is_dir() and batch_dir.name.isdigit() and batch_dir.name < cutoff:
+                for path in batch_dir.rglob("*"):
+                    if path.is_file():
+                        files += 1
+                        purged += path.stat().st_size
+                shutil.rmtree(batch_dir, ignore_errors=True)
+        return files, purged
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "quarantined_bytes": self.quarantined_bytes,
+            "last_report": self.last_report,
+        }
+
+
+media_janitor = MediaJanitor()
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+# Configuration
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", "static/uploads/media"))
+MEDIA_URL_PREFIX = "/media"
+
+# Extensions the store will accept, mapped to the Content-Type they are served with
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+
+class LocalMediaStore:
+    """
+    Content-addressed image store backed by a local directory.
+    Every blob is written once under the SHA-256 of its bytes, so identical
+    uploads share a single file and a stored file never changes.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Return the content hash used as the storage key."""
+        return hashlib.sha256(data).hexdigest()
+
+    def path_for(self, content_hash: str, ext: str) -> Path:
+        """Location of a blob on disk (sharded by the first two hex digits)."""
+        return self.root / content_hash[:2] / f"{content_hash}.{ext}"
+
+    def exists(self, content_hash: str, ext: str) -> bool:
+        return self.path_for(content_hash, ext).is_file()
+
+    def put(self, data: bytes, ext: str) -> str:
+        """
+        Store bytes under their content hash.
+        Returns: content_hash
+        """
+        if ext not in CONTENT_TYPES:
+            raise ValueError(f"Unsupported media extension: {ext}")
+
+        content_hash = self.hash_bytes(data)
+        target = self.path_for(content_hash, ext)
+        if target.is_file():
+            # Already stored - content addressing makes this a no-op
+            return content_hash
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a sibling temp file and rename so readers never see partial files
+        tmp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+        return content_hash
+
+    def read(self, content_hash: str, ext: str) -> bytes:
+        return self.path_for(content_hash, ext).read_bytes()
+
+    def delete(self, content_hash: str, ext: str) -> None:
+        self.path_for(content_hash, ext).unlink(missing_ok=True)
+
+    def iter_blobs(self) -> Iterator[Tuple[str, str, Path]]:
+        """Yield (content_hash, ext, path) for every stored blob."""
+        for path in self.root.glob("*/*.*"):
+            if path.name.startswith("."):
+                continue
+            content_hash, _, ext = path.name.partition(".")
+            yield content_hash, ext, path
+
+
+def media_url(content_hash: Optional[str], ext: str) -> Optional[str]:
+    """Public URL of a stored blob, or None when there is no hash."""
+    if not content_hash:
+        return None
+    return f"{MEDIA_URL_PREFIX}/{content_hash}.{ext}"
+
+
+media_store = LocalMediaStore(MEDIA_ROOT)
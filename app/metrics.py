@@ -0,0 +1,147 @@
+import os
+import secrets
+import time
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Match
+
+# Configuration
+# When set, GET /metrics and GET /api/db/pool-stats require
+# "Authorization: Bearer <METRICS_TOKEN>". Unset, they are public: set it in production
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Route label for requests no route matched (keeps arbitrary 404 paths out of the labels)
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time from request to the end of the response body",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+HTTP_RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes", "Response body size", ["method", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled")
+
+# Pillow work in the image engine's worker processes, by photo_utils function
+IMAGE_PROCESSING_SECONDS = Histogram(
+    "image_processing_duration_seconds", "Image job run time in a worker process", ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+IMAGE_QUEUE_WAIT_SECONDS = Histogram(
+    "image_queue_wait_seconds", "Time an image job waited for a free worker",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+PDF_BUILD_SECONDS = Histogram(
+    "pdf_build_duration_seconds", "Time to build a PDF document", ["document"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+
+class DatabasePoolCollector:
+    """Connection pool gauges and counters per engine, read when /metrics is scraped."""
+
+    def __init__(self, pool_stats):
+        # Callable returning {engine name: stats dict} (database.database_pool_stats)
+        self.pool_stats = pool_stats
+
+    def collect(self):
+        gauges = {
+            "size": GaugeMetricFamily("db_pool_size", "Connections kept open", labels=["engine"]),
+            "checked_out": GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["engine"]),
+            "overflow": GaugeMetricFamily(
+                "db_pool_overflow", "Connections beyond the pool size (negative: size not reached)",
+                labels=["engine"]),
+        }
+        counters = {
+            "checkouts": CounterMetricFamily("db_pool_checkouts", "Connection checkouts", labels=["engine"]),
+            "timeouts": CounterMetricFamily(
+                "db_pool_timeouts", "Checkouts that gave up waiting for a connection", labels=["engine"]),
+            "wait_seconds": CounterMetricFamily(
+                "db_pool_wait_seconds", "Time spent waiting for connections", labels=["engine"]),
+        }
+        for engine, stats in self.pool_stats().items():
+            for key, metric in gauges.items():
+                if key in stats:
+                    metric.add_metric([engine], stats[key])
+            for key, metric in counters.items():
+                if key in stats:
+                    metric.add_metric([engine], stats[key])
+        yield from gauges.values()
+        yield from counters.values()
+
+
+def route_template(scope) -> str:
+    """
+    The matched route's path template. Responses answered before routing (response
+    cache hits, 404s) have no route in the scope; those are matched against the
+    app's routes here.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    for candidate in getattr(scope.get("app"), "routes", ()):
+        if candidate.matches(scope)[0] == Match.FULL and hasattr(candidate, "path"):
+            return candidate.path
+    return UNMATCHED_ROUTE
+
+
+def metrics_authorized(authorization: Optional[str]) -> bool:
+    """Whether an Authorization header may read the metrics (always, when METRICS_TOKEN is unset)."""
+    if not METRICS_TOKEN:
+        return True
+    return secrets.compare_digest((authorization or "").encode(), f"Bearer {METRICS_TOKEN}".encode())
+
+
+def metrics_response_body() -> bytes:
+    """Every registered metric, in the Prometheus text format."""
+    return generate_latest(REGISTRY)
+
+
+class MetricsMiddleware:
+    """
+    Request latency, response size and in-flight requests, labelled by route
+    template (/api/cats/{cat_id}, not each id). app/main.py adds it after every
+    other middleware (admin_auth_middleware included), so it is the outermost
+    and the latency covers all of them. Costs ~15 µs per request
+    (benchmark_metrics.py).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # (method, route, status) -> (latency, size) histogram children; labels() takes a lock
+        # and validates its arguments on every call, a dict lookup doesn't
+        self._children = {}
+
+    def _series(self, method, route, status):
+        key = (method, route, status)
+        series = self._children.get(key)
+        if series is None:
+            series = (HTTP_REQUEST_SECONDS.labels(method, route, str(status)),
+                      HTTP_RESPONSE_BYTES.labels(method, route))
+            self._children[key] = series
+        return series
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def measured_send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, measured_send)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            latency, size_bytes = self._series(scope["method"], route_template(scope), status)
+            latency.observe(time.perf_counter() - start)
+            size_bytes.observe(size)
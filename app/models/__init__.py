@@ -1,5 +1,7 @@
+from .media import MediaAsset, ImageFingerprint, ImageEncode
 from .cat import Cat
 from .article import Article
 from .adoption import AdoptionQuestion, AdoptionRequest
+from .resource_version import ResourceVersion
 
-__all__ = ["Cat", "Article", "AdoptionQuestion", "AdoptionRequest"]  # Export only selected models
+__all__ = ["MediaAsset", "ImageFingerprint", "ImageEncode", "Cat", "Article", "AdoptionQuestion", "AdoptionRequest", "ResourceVersion"]  # Export only selected models
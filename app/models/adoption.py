@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
-from ..database import Base
+from ..database import Base, ServerTimestamp
 
 
 class AdoptionQuestion(Base):
@@ -21,6 +21,8 @@ class AdoptionQuestion(Base):
 
 class AdoptionRequest(Base):
     __tablename__ = "adoption_requests"
+    # Keyset pagination key (api/pagination.py): newest first, id breaks ties
+    __table_args__ = (Index("ix_adoption_requests_submitted_at_id", "submitted_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     customer_email = Column(String(255), nullable=False)
@@ -31,7 +33,7 @@ class AdoptionRequest(Base):
     terms_agreed = Column(Boolean, default=False)
     privacy_consent = Column(Boolean, default=False)
     subscription = Column(Boolean, default=False)
-    submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+    submitted_at = Column(ServerTimestamp, server_default=func.now())
     # 'pending', 'approved', 'rejected'
     status = Column(String(50), default="pending")
     rejection_reason = Column(Text, nullable=True)  # Reason for rejection
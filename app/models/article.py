@@ -1,11 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index, event
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
-from ..database import Base
+from sqlalchemy.orm import relationship, query_expression
+from ..database import Base, ServerTimestamp
 
 
 class Article(Base):
     __tablename__ = "articles"
+    # Keyset pagination key (api/pagination.py): newest first, id breaks ties
+    __table_args__ = (Index("ix_articles_created_at_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
@@ -13,20 +15,108 @@ class Article(Base):
     author = Column(String(50), default="Admin")
     # DEPRECATED - use featured_image_base64
     featured_image = Column(String(500), nullable=True)
-    # Base64 encoded featured image
+    # Base64 encoded featured image - DEPRECATED, use featured_image_hash
     featured_image_base64 = Column(Text, nullable=True)
+    # Content hash of the featured image in the media store
+    featured_image_hash = Column(String(64), nullable=True, index=True)
     published = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(ServerTimestamp, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationship to ArticleImage
     images = relationship(
         "ArticleImage", back_populates="article", cascade="all, delete-orphan")
+    featured_image_asset = relationship(
+        "MediaAsset", primaryjoin="foreign(Article.featured_image_hash) == MediaAsset.hash",
+        lazy="selectin", viewonly=True)
+    # Loaded only by summary queries (see api/fieldsets.py): the start of the
+    # content, and whether the featured image is still inline base64
+    excerpt = query_expression()
+    featured_image_inline = query_expression()
+    # Loaded only by full-text search (see api/search.py)
+    snippet = query_expression()
+    search_rank = query_expression()
+
+    @property
+    def featured_image_media_url(self):
+        return self.featured_image_asset.url if self.featured_image_asset else None
+
+    @property
+    def featured_image_srcset(self):
+        return self.featured_image_asset.srcsets if self.featured_image_asset else None
+
+    @property
+    def featured_image_placeholder(self):
+        return self.featured_image_asset.placeholder if self.featured_image_asset else None
+
+    @property
+    def featured_image_width(self):
+        return self.featured_image_asset.width if self.featured_image_asset else None
+
+    @property
+    def featured_image_height(self):
+        return self.featured_image_asset.height if self.featured_image_asset else None
+
+    @property
+    def featured_image_format(self):
+        return self.featured_image_asset.ext if self.featured_image_asset else None
+
+    @property
+    def featured_image_bytes(self):
+        return self.featured_image_asset.byte_size if self.featured_image_asset else None
+
+    @property
+    def featured_image_color(self):
+        return self.featured_image_asset.dominant_color if self.featured_image_asset else None
 
     def __repr__(self):  # Transforms the object into a string (for debugging)
         return f'Article(id={self.id}, title={self.title}, published={self.published})'
 
 
+# Text search configuration (stemming, stop words) of the search index and its queries
+SEARCH_LANGUAGE = "english"
+
+# Full-text index over title and content, kept current by the database on every write
+# (api/search.py queries it): on PostgreSQL a generated tsvector column, title weighted
+# above content, with a GIN index; on SQLite an FTS5 table over the articles rows,
+# synced by triggers. Existing databases get it from the Alembic migration.
+ARTICLE_SEARCH_DDL = {
+    "postgresql": [
+        f"""ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(content, '')), 'B')
+            ) STORED""",
+        "CREATE INDEX IF NOT EXISTS ix_articles_search_vector ON articles USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, content, content='articles', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2')""",
+        """CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF title, content ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO articles_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END""",
+        # Index the rows already there
+        "INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')",
+    ],
+}
+
+
+@event.listens_for(Article.__table__, "after_create")
+def create_search_index(target, connection, **kw):
+    for statement in ARTICLE_SEARCH_DDL.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
+
+
 class ArticleImage(Base):
     __tablename__ = "article_images"
 
@@ -34,13 +124,53 @@ class ArticleImage(Base):
     article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
     # DEPRECATED - use image_base64
     image_path = Column(String(500), nullable=False)
-    image_base64 = Column(Text, nullable=True)  # Base64 encoded image data
+    # Base64 encoded image data - DEPRECATED, use image_hash
+    image_base64 = Column(Text, nullable=True)
+    # Content hash of the image in the media store
+    image_hash = Column(String(64), nullable=True, index=True)
     caption = Column(String(200), nullable=True)
     display_order = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship back to Article
     article = relationship("Article", back_populates="images")
+    image_asset = relationship(
+        "MediaAsset", primaryjoin="foreign(ArticleImage.image_hash) == MediaAsset.hash",
+        lazy="selectin", viewonly=True)
+    # Whether the image is still inline base64 - loaded only by summary queries
+    image_inline = query_expression()
+
+    @property
+    def image_media_url(self):
+        return self.image_asset.url if self.image_asset else None
+
+    @property
+    def image_srcset(self):
+        return self.image_asset.srcsets if self.image_asset else None
+
+    @property
+    def image_placeholder(self):
+        return self.image_asset.placeholder if self.image_asset else None
+
+    @property
+    def image_width(self):
+        return self.image_asset.width if self.image_asset else None
+
+    @property
+    def image_height(self):
+        return self.image_asset.height if self.image_asset else None
+
+    @property
+    def image_format(self):
+        return self.image_asset.ext if self.image_asset else None
+
+    @property
+    def image_bytes(self):
+        return self.image_asset.byte_size if self.image_asset else None
+
+    @property
+    def image_color(self):
+        return self.image_asset.dominant_color if self.image_asset else None
 
     def __repr__(self):
         return f'ArticleImage(id={self.id}, article_id={self.article_id}, image_path={self.image_path})'
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Date
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Date, Index, event
 from sqlalchemy.sql import func
-from ..database import Base
+from sqlalchemy.orm import relationship, query_expression
+from ..database import Base, ServerTimestamp
 
 
 class Cat(Base):
     __tablename__ = "cats"
+    __table_args__ = (
+        # Keyset pagination key (api/pagination.py): newest first, id breaks ties
+        Index("ix_cats_created_at_id", "created_at", "id"),
+        # Filters and sort orders of GET /api/cats/ and the /cats page (api/cats.py CatFilters)
+        Index("ix_cats_is_available_created_at_id", "is_available", "created_at", "id"),
+        Index("ix_cats_date_of_birth_id", "date_of_birth", "id"),
+        Index("ix_cats_name_id", "name", "id"),
+    )
 
     # Set up indexing for faster searches in db
     id = Column(Integer, primary_key=True, index=True)
@@ -20,14 +29,77 @@ class Cat(Base):
     description = Column(Text)
     # URL for cat's photo (optional) - DEPRECATED
     photo_url = Column(String(500))
-    # Base64 encoded image data for persistent storage
+    # Base64 encoded image data - DEPRECATED, use photo_hash
     photo_base64 = Column(Text)
+    # Content hash of the photo in the media store
+    photo_hash = Column(String(64), index=True)
     # Availability status
     is_available = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True),
+    created_at = Column(ServerTimestamp,
                         server_default=func.now())  # When cat was added
     # When cat info was changed
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Stored photo metadata (looked up in one extra query for a whole list)
+    photo_asset = relationship(
+        "MediaAsset", primaryjoin="foreign(Cat.photo_hash) == MediaAsset.hash",
+        lazy="selectin", viewonly=True)
+    # Whether the photo is still inline base64 - loaded only by summary queries (see api/fieldsets.py)
+    photo_inline = query_expression()
+
+    @property
+    def photo_media_url(self):
+        return self.photo_asset.url if self.photo_asset else None
+
+    @property
+    def photo_srcset(self):
+        return self.photo_asset.srcsets if self.photo_asset else None
+
+    @property
+    def photo_placeholder(self):
+        return self.photo_asset.placeholder if self.photo_asset else None
+
+    @property
+    def photo_width(self):
+        return self.photo_asset.width if self.photo_asset else None
+
+    @property
+    def photo_height(self):
+        return self.photo_asset.height if self.photo_asset else None
+
+    @property
+    def photo_format(self):
+        return self.photo_asset.ext if self.photo_asset else None
+
+    @property
+    def photo_bytes(self):
+        return self.photo_asset.byte_size if self.photo_asset else None
+
+    @property
+    def photo_color(self):
+        return self.photo_asset.dominant_color if self.photo_asset else None
+
     def __repr__(self):  # Transforms the object into a string (for debugging)
         return f'Cat(id={self.id}, name={self.name}, litter_code={self.litter_code}, gender={self.gender})'
+
+
+# Case-insensitive prefix search on name and litter code (api/cats.py prefix_match):
+# PostgreSQL serves lower(column) LIKE 'abc%' from a text_pattern_ops index, SQLite
+# serves column LIKE 'abc%' (case-insensitive there) from a NOCASE index.
+# Existing databases get them from the Alembic migration.
+CAT_PREFIX_INDEX_DDL = {
+    "postgresql": [
+        "CREATE INDEX IF NOT EXISTS ix_cats_name_prefix ON cats (lower(name) text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_cats_litter_code_prefix ON cats (lower(litter_code) text_pattern_ops)",
+    ],
+    "sqlite": [
+        "CREATE INDEX IF NOT EXISTS ix_cats_name_prefix ON cats (name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS ix_cats_litter_code_prefix ON cats (litter_code COLLATE NOCASE)",
+    ],
+}
+
+
+@event.listens_for(Cat.__table__, "after_create")
+def create_prefix_indexes(target, connection, **kw):
+    for statement in CAT_PREFIX_INDEX_DDL.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
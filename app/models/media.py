@@ -0,0 +1,112 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean
+from sqlalchemy.sql import func
+from ..database import Base
+from ..media_store import media_url
+import json
+
+
+class MediaAsset(Base):
+    __tablename__ = "media_assets"
+
+    # SHA-256 of the stored bytes - also the key in the media store
+    hash = Column(String(64), primary_key=True)
+    # File extension the blob is stored and served with ('jpg', 'webp', ...)
+    ext = Column(String(10), nullable=False)
+    content_type = Column(String(50), nullable=False)
+    byte_size = Column(Integer, nullable=False)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    # JSON list of responsive variants: [{"width", "height", "format", "hash", "bytes"}]
+    variants = Column(Text, nullable=True)
+    # ~20px WebP data URL painted (blurred) while the real image loads
+    placeholder = Column(Text, nullable=True)
+    # Most common colour as '#rrggbb', painted before anything else has loaded
+    dominant_color = Column(String(7), nullable=True)
+    # When the variants were (re-)encoded with the 'max' profile; NULL while the
+    # fast upload encodes still wait for the background optimizer
+    optimized_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def url(self):
+        return media_url(self.hash, self.ext)
+
+    @property
+    def info(self):
+        """Stored image metadata - describes the image without opening it."""
+        return {
+            "width": self.width,
+            "height": self.height,
+            "format": self.ext,
+            "bytes": self.byte_size,
+            "dominant_color": self.dominant_color,
+        }
+
+    @property
+    def variant_list(self):
+        return json.loads(self.variants) if self.variants else []
+
+    @property
+    def srcsets(self):
+        """srcset strings keyed by format ('avif', 'webp', 'jpg'), or None without variants."""
+        entries = {}
+        for variant in sorted(self.variant_list, key=lambda v: v["width"]):
+            entries.setdefault(variant["format"], []).append(
+                f"{media_url(variant['hash'], variant['format'])} {variant['width']}w")
+        return {fmt: ", ".join(items) for fmt, items in entries.items()} or None
+
+    def __repr__(self):
+        return f'MediaAsset(hash={self.hash[:12]}, ext={self.ext}, byte_size={self.byte_size})'
+
+
+class ImageFingerprint(Base):
+    """
+    Exact and perceptual hash of an uploaded image, pointing at the asset it is stored as.
+    Several uploads (the same photo re-saved, re-sized, ...) can share one asset.
+    """
+    __tablename__ = "image_fingerprints"
+
+    # SHA-256 of the uploaded bytes (before any processing)
+    source_hash = Column(String(64), primary_key=True)
+    asset_hash = Column(String(64), nullable=False, index=True)
+    # 64-bit difference hash as 16 hex digits
+    phash = Column(String(16), nullable=False)
+    # The phash split into four 16-bit bands; images within a few bits of each
+    # other always share at least one band, so near-duplicates are found by index
+    phash_band_0 = Column(Integer, nullable=False, index=True)
+    phash_band_1 = Column(Integer, nullable=False, index=True)
+    phash_band_2 = Column(Integer, nullable=False, index=True)
+    phash_band_3 = Column(Integer, nullable=False, index=True)
+    # What a near match must agree on besides the phash (photo_utils.near_duplicate).
+    # NULL on fingerprints recorded before they were kept: those only match exactly
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    dominant_color = Column(String(7), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f'ImageFingerprint(source_hash={self.source_hash[:12]}, asset_hash={self.asset_hash[:12]}, phash={self.phash})'
+
+
+class ImageEncode(Base):
+    """
+    One variant encode: which profile produced how many bytes in how long.
+    Re-encodes also record the size they were compared against and whether they were kept.
+    Used to tune ENCODE_PROFILES.
+    """
+    __tablename__ = "image_encodes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    asset_hash = Column(String(64), nullable=False, index=True)
+    profile = Column(String(10), nullable=False)  # 'fast' or 'max'
+    format = Column(String(10), nullable=False)
+    width = Column(Integer, nullable=False)
+    bytes = Column(Integer, nullable=False)
+    encode_ms = Column(Float, nullable=False)
+    # Re-encodes only: size of the variant it would replace, and whether it did
+    previous_bytes = Column(Integer, nullable=True)
+    swapped = Column(Boolean, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f'ImageEncode(asset_hash={self.asset_hash[:12]}, profile={self.profile}, format={self.format}, width={self.width}, bytes={self.bytes})'
@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+from itertools import chain
+
+from sqlalchemy import Column, Integer, String, DateTime, event, insert, select, update
+from sqlalchemy.orm import Session
+from ..database import Base
+
+# Tables whose writes bump their version (the resource name is the table name)
+VERSIONED_TABLES = {"cats", "articles", "article_images", "adoption_questions", "adoption_requests", "media_assets"}
+# Called with the set of versioned tables a transaction wrote, once it has committed
+commit_listeners = []
+
+
+class ResourceVersion(Base):
+    """
+    Change counter per table, bumped in the same transaction as every ORM write
+    to it (inserts, updates, deletes and bulk query.update()/delete()).
+    Conditional GETs (api/conditional.py) compare against it instead of loading rows.
+    """
+    __tablename__ = "resource_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    changed_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'ResourceVersion(name={self.name}, version={self.version})'
+
+
+def bump_versions(connection, names):
+    now = datetime.now(timezone.utc)
+    table = ResourceVersion.__table__
+    # Sorted, so concurrent writers lock the rows in the same order
+    for name in sorted(names):
+        updated = connection.execute(
+            update(table).where(table.c.name == name)
+            .values(version=table.c.version + 1, changed_at=now))
+        if updated.rowcount == 0:
+            connection.execute(insert(table).values(name=name, version=1, changed_at=now))
+
+
+async def current_versions(db, names) -> dict:
+    """{name: (version, changed_at)} for the given resources; never-written ones are (0, None)."""
+    rows = (await db.execute(select(ResourceVersion.name, ResourceVersion.version, ResourceVersion.changed_at)
+                       .where(ResourceVersion.name.in_(names)))).all()
+    versions = {name: (0, None) for name in names}
+    versions.update({name: (version, changed_at) for name, version, changed_at in rows})
+    return versions
+
+
+def changed_resources(session) -> set:
+    """Versioned tables written in the session's current transaction (cleared when it ends)."""
+    return session.info.setdefault("changed_resources", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_tables(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state here
+    names = {obj.__table__.name for obj in chain(session.new, session.deleted)}
+    names.update(obj.__table__.name for obj in session.dirty if session.is_modified(obj))
+    names &= VERSIONED_TABLES
+    if names:
+        bump_versions(session.connection(), names)
+        changed_resources(session).update(names)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        name = orm_execute_state.statement.table.name
+        if name in VERSIONED_TABLES:
+            bump_versions(orm_execute_state.session.connection(), {name})
+            changed_resources(orm_execute_state.session).add(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed_writes(session):
+    names = session.info.pop("changed_resources", None)
+    if names:
+        for listener in commit_listeners:
+            listener(names)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_writes(session):
+    session.info.pop("changed_resources", None)
@@ -6,7 +6,10 @@ from reportlab.lib.colors import pink, black
 from io import BytesIO
 import os
 
+from .metrics import PDF_BUILD_SECONDS
 
+
+@PDF_BUILD_SECONDS.labels("contract").time()
 def create_contract_pdf():
     """Generate PDF version of the sales contract."""
     buffer = BytesIO()
@@ -114,6 +117,7 @@ def create_contract_pdf():
     return buffer
 
 
+@PDF_BUILD_SECONDS.labels("departure_instructions").time()
 def create_departure_instructions_pdf():
     """Generate PDF version of departure instructions."""
     buffer = BytesIO()
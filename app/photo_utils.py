@@ -1,13 +1,24 @@
+import asyncio
 import os
 import uuid
 import aiofiles
 import base64
-from datetime import datetime
+import hashlib
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from PIL import Image, ImageOps
+from PIL import Image, ImageOps, features
 from fastapi import UploadFile, HTTPException
-from typing import Tuple
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple, Union
 from io import BytesIO
+import json
+
+from .media_store import media_store, CONTENT_TYPES
+from .image_engine import image_engine
+from .models.media import MediaAsset, ImageFingerprint, ImageEncode
 
 # Configuration
 UPLOAD_DIR = Path("static/uploads")
@@ -24,98 +35,258 @@ TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
 # Image settings
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Uploads are read in chunks of this size
+SPOOL_MAX_MEMORY = 1024 * 1024  # Larger uploads are spooled to TEMP_DIR instead of memory
+
+# Magic bytes of the image types we accept (the filename extension is not trusted)
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
 THUMBNAIL_SIZE = (400, 400)  # Larger thumbnails for better quality
 FULL_SIZE = (1920, 1920)  # Full HD width for modern displays
 WEBP_QUALITY = 85  # WebP quality (smaller file size than JPEG at same quality)
+THUMBNAIL_QUALITY = 80
+MEDIA_JPEG_QUALITY = 85  # Quality of the display image kept in the media store
+AVIF_QUALITY = 60  # AVIF holds up at lower quality settings than WebP/JPEG
+
+PLACEHOLDER_SIZE = (20, 20)  # Low-quality placeholder, inlined as a data URL
+PLACEHOLDER_QUALITY = 40
+DOMINANT_COLOR_PALETTE = 5  # Colours the image is reduced to before picking the most common
+
+# Encoder settings per profile. Uploads encode with 'fast' so the request returns quickly;
+# image_optimizer.py later re-encodes them with 'max' (same quality, highest effort) and
+# swaps in whatever came out smaller. Scripts and /img resizes use 'max' directly.
+ENCODE_PROFILES = {
+    'fast': {
+        'webp': {'format': 'WEBP', 'quality': WEBP_QUALITY, 'method': 1},
+        'jpg': {'format': 'JPEG', 'quality': MEDIA_JPEG_QUALITY, 'progressive': True},
+    },
+    'max': {
+        'webp': {'format': 'WEBP', 'quality': WEBP_QUALITY, 'method': 6},
+        'jpg': {'format': 'JPEG', 'quality': MEDIA_JPEG_QUALITY, 'optimize': True, 'progressive': True},
+    },
+}
+# AVIF only when this Pillow build can encode it
+if features.check('avif'):
+    ENCODE_PROFILES['fast']['avif'] = {'format': 'AVIF', 'quality': AVIF_QUALITY, 'speed': 9}
+    ENCODE_PROFILES['max']['avif'] = {'format': 'AVIF', 'quality': AVIF_QUALITY, 'speed': 6}
+
+# Responsive variants - browsers pick the smallest adequate width from srcset
+VARIANT_WIDTHS = (320, 640, 1024, 1920)
+VARIANT_ENCODERS = ENCODE_PROFILES['max']
+
+# Uploads whose perceptual hashes differ in at most this many bits reuse the stored asset.
+# Must stay below the number of phash bands (4) so a match always shares a band.
+PHASH_MAX_DISTANCE = 3
+# A dHash only compares brightness gradients, so a near match must also agree on:
+PHASH_MIN_BITS = 8  # detail - flat images hash to (almost) all 0 or all 1 bits and never near-match
+PHASH_MAX_ASPECT_DIFFERENCE = 0.02  # aspect ratio (relative)
+PHASH_MAX_SIZE_DIFFERENCE = 0.1  # width and height (relative)
+PHASH_MAX_COLOR_DISTANCE = 32  # dominant colour (largest difference of an RGB channel)
+
+
+def upload_base_name(cat_name: str = None, article_image: bool = False) -> Tuple[str, Path]:
+    """Generate a unique file name and target directory for the legacy full/thumbnail files."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    unique_id = str(uuid.uuid4())[:8]
 
+    if article_image:
+        return f"article_{timestamp}_{unique_id}", ARTICLES_DIR
+    base_name = f"{cat_name}_{timestamp}_{unique_id}" if cat_name else f"cat_{timestamp}_{unique_id}"
+    return base_name, CATS_DIR
 
-async def save_uploaded_photo(file: UploadFile, cat_name: str = None, article_image: bool = False) -> Tuple[str, str]:
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Detect the image type from the first bytes of a file. Returns the extension or None."""
+    for signature, ext in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return ext
+    # WebP is a RIFF container: "RIFF" <size> "WEBP"
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+class SpooledUpload:
     """
-    Save uploaded photo with compression and create thumbnail.
-    Returns: (full_image_path, thumbnail_path)
+    An upload read in chunks: kept in memory while small, spilled to a file in
+    TEMP_DIR once it grows past SPOOL_MAX_MEMORY.
+    `source` (bytes or file path) is what the image pipeline workers take,
+    so large uploads reach the worker process as a file rather than a copy.
     """
-    # Validate file type
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400, detail=f"File type {file_ext} not allowed")
 
-    # Validate file size
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
+    def __init__(self, file_ext: str):
+        self.file_ext = file_ext
+        self.size = 0
+        self.path = None
+        self._sha256 = hashlib.sha256()
+        self._buffer = BytesIO()
+        self._file = None
+
+    async def write(self, chunk: bytes):
+        self._sha256.update(chunk)
+        if self._file is None and self.size + len(chunk) > SPOOL_MAX_MEMORY:
+            self.path = TEMP_DIR / f"upload_{uuid.uuid4().hex}{self.file_ext}"
+            self._file = await aiofiles.open(self.path, 'wb')
+            await self._file.write(self._buffer.getvalue())
+            self._buffer = None
+        if self._file is not None:
+            await self._file.write(chunk)
+        else:
+            self._buffer.write(chunk)
+        self.size += len(chunk)
+
+    async def finish(self):
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+
+    @property
+    def source(self) -> Union[bytes, Path]:
+        return self.path if self.path is not None else self._buffer.getvalue()
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the uploaded bytes (computed while streaming)."""
+        return self._sha256.hexdigest()
+
+    async def close(self):
+        """Release the buffer and remove the spooled file (if any)."""
+        await self.finish()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+        self._buffer = None
+
+
+async def ingest_upload(file: UploadFile, max_size: int = MAX_FILE_SIZE) -> SpooledUpload:
+    """
+    Stream an uploaded image into a SpooledUpload.
+    The type comes from the file's magic bytes, and reading stops as soon as
+    the upload crosses max_size instead of buffering the whole file first.
+    """
+    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+    file_ext = sniff_image_type(chunk)
+    if file_ext is None:
         raise HTTPException(
-            status_code=400, detail="File too large (max 10MB)")
+            status_code=400, detail="File is not a supported image (JPEG, PNG, GIF or WebP)")
 
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
+    upload = SpooledUpload(file_ext)
+    try:
+        while chunk:
+            if upload.size + len(chunk) > max_size:
+                raise HTTPException(
+                    status_code=413, detail="File too large (max 10MB)")
+            await upload.write(chunk)
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        await upload.finish()
+    except BaseException:
+        await upload.close()
+        raise
+    return upload
 
-    if article_image:
-        base_name = f"article_{timestamp}_{unique_id}"
-        target_dir = ARTICLES_DIR
-    else:
-        base_name = f"{cat_name}_{timestamp}_{unique_id}" if cat_name else f"cat_{timestamp}_{unique_id}"
-        target_dir = CATS_DIR
 
-    # Save original file temporarily
-    temp_path = TEMP_DIR / f"{base_name}_original{file_ext}"
-    async with aiofiles.open(temp_path, 'wb') as f:
-        await f.write(file_content)
+async def save_uploaded_photo(file: UploadFile, cat_name: str = None, article_image: bool = False) -> Tuple[str, str]:
+    """
+    Save uploaded photo with compression and create thumbnail.
+    Returns: (full_image_path, thumbnail_path)
+    """
+    upload = await ingest_upload(file)
+    base_name, target_dir = upload_base_name(cat_name, article_image)
 
     try:
         # Process and optimize image
-        full_path, thumb_path = await process_image(temp_path, base_name, file_ext, target_dir)
-
-        # Clean up temp file
-        temp_path.unlink(missing_ok=True)
+        full_path, thumb_path = await image_engine.run(
+            render_full_and_thumbnail, upload.source, base_name, target_dir, 'fast')
 
         # Return relative paths for database storage
         return str(full_path.relative_to("static")), str(thumb_path.relative_to("static"))
 
+    except HTTPException:
+        # Image engine saturated - pass the 503 through
+        raise
     except Exception as e:
-        # Clean up on error
-        temp_path.unlink(missing_ok=True)
         raise HTTPException(
             status_code=500, detail=f"Error processing image: {str(e)}")
+    finally:
+        await upload.close()
 
 
 async def process_image(temp_path: Path, base_name: str, file_ext: str, target_dir: Path = CATS_DIR) -> Tuple[Path, Path]:
-    """Process image: compress, resize, and create thumbnail."""
-    try:
-        # Open image
-        with Image.open(temp_path) as img:
-            # Auto-rotate based on EXIF orientation data
-            img = ImageOps.exif_transpose(img)
-
-            # Convert to RGB if necessary (for PNG with transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create white background
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()
-                                 [-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            # Create full-size optimized image in WebP format (better compression)
-            full_path = target_dir / f"{base_name}_full.webp"
-            img_resized = resize_image(img, FULL_SIZE)
-            img_resized.save(full_path, 'WEBP', quality=WEBP_QUALITY, method=6)
-
-            # Create thumbnail in WebP format
-            thumb_path = THUMBNAILS_DIR / f"{base_name}_thumb.webp"
-            img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-            img.save(thumb_path, 'WEBP', quality=80, method=6)
-
-            return full_path, thumb_path
+    """Process an image file on disk: compress, resize, and create thumbnail (in the image engine)."""
+    return await image_engine.run(render_full_and_thumbnail, Path(temp_path), base_name, target_dir, 'fast')
+
+
+def decode_upload(source: Union[bytes, Path]) -> Image.Image:
+    """
+    Decode image bytes (or an image file) into the one in-memory image every output is rendered from:
+    EXIF orientation applied, flattened to RGB and capped at FULL_SIZE.
+    """
+    with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as img:
+        # Auto-rotate based on EXIF orientation data
+        img = ImageOps.exif_transpose(img)
+
+        # Convert to RGB if necessary (for PNG with transparency)
+        img = flatten_to_rgb(img)
+
+        img = resize_image(img, FULL_SIZE)
+        img.load()
+        return img
+
+
+def encode_full_and_thumbnail(img: Image.Image, profile: str = 'max') -> Tuple[bytes, bytes]:
+    """Full-size and thumbnail WebP bytes for a decoded image."""
+    settings = ENCODE_PROFILES[profile]['webp']
+    # Full-size optimized image in WebP format (better compression)
+    full = BytesIO()
+    img.save(full, **settings)
+
+    # Thumbnail in WebP format
+    thumb = img.copy()
+    thumb.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    thumb_buffer = BytesIO()
+    thumb.save(thumb_buffer, **{**settings, 'quality': THUMBNAIL_QUALITY})
+
+    return full.getvalue(), thumb_buffer.getvalue()
+
+
+def write_full_and_thumbnail(img: Image.Image, base_name: str, target_dir: Path = CATS_DIR,
+                             profile: str = 'max') -> Tuple[Path, Path]:
+    """Write the full-size WebP and thumbnail for a decoded image."""
+    full_path = target_dir / f"{base_name}_full.webp"
+    thumb_path = THUMBNAILS_DIR / f"{base_name}_thumb.webp"
+    full_data, thumb_data = encode_full_and_thumbnail(img, profile)
+    full_path.write_bytes(full_data)
+    thumb_path.write_bytes(thumb_data)
+    return full_path, thumb_path
+
 
+def render_full_and_thumbnail(source: Union[bytes, Path], base_name: str, target_dir: Path = CATS_DIR,
+                              profile: str = 'max') -> Tuple[Path, Path]:
+    """Write the full-size WebP and thumbnail for image bytes or a file. Runs in a worker process."""
+    try:
+        return write_full_and_thumbnail(decode_upload(source), base_name, target_dir, profile)
     except Exception as e:
         raise Exception(f"Image processing failed: {str(e)}")
 
 
+def flatten_to_rgb(img: Image.Image) -> Image.Image:
+    """Convert any image mode to RGB, compositing transparency onto white."""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        # Create white background
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()
+                         [-1] if img.mode in ('RGBA', 'LA') else None)
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
 def resize_image(img: Image.Image, max_size: Tuple[int, int]) -> Image.Image:
     """Resize image maintaining aspect ratio."""
     img_ratio = img.width / img.height
@@ -138,7 +309,7 @@ def resize_image(img: Image.Image, max_size: Tuple[int, int]) -> Image.Image:
 
 
 def get_image_info(image_path: str) -> dict:
-    """Get image metadata."""
+    """Get image metadata by opening a legacy file (media assets store it: MediaAsset.info)."""
     try:
         full_path = Path("static") / image_path
         with Image.open(full_path) as img:
@@ -152,16 +323,18 @@ def get_image_info(image_path: str) -> dict:
         return {}
 
 
-def cleanup_old_temp_files():
-    """Clean up temporary files older than 1 hour."""
-    import time
+def cleanup_old_temp_files() -> int:
+    """Clean up temporary files older than 1 hour. Returns the bytes reclaimed."""
     current_time = time.time()
+    reclaimed = 0
 
     for temp_file in TEMP_DIR.glob("*"):
         if temp_file.is_file():
-            file_age = current_time - temp_file.stat().st_mtime
-            if file_age > 3600:  # 1 hour
-                temp_file.unlink()
+            stat = temp_file.stat()
+            if current_time - stat.st_mtime > 3600:  # 1 hour
+                temp_file.unlink(missing_ok=True)
+                reclaimed += stat.st_size
+    return reclaimed
 
 
 async def convert_image_to_base64(file: UploadFile, max_width: int = 800, max_height: int = 600) -> str:
@@ -169,47 +342,38 @@ async def convert_image_to_base64(file: UploadFile, max_width: int = 800, max_he
     Convert uploaded image to base64 with compression for database storage.
     Returns base64 encoded string with data URL prefix.
     """
-    # Validate file type
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400, detail=f"File type {file_ext} not allowed")
-
-    # Validate file size
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400, detail="File too large (max 10MB)")
+    upload = await ingest_upload(file)
 
     try:
-        # Open and process the image
-        with Image.open(BytesIO(file_content)) as img:
-            # Apply EXIF orientation correction
-            img = ImageOps.exif_transpose(img)
+        return await image_engine.run(encode_base64_jpeg, upload.source, max_width, max_height)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Error processing image: {str(e)}")
+    finally:
+        await upload.close()
 
-            # Convert to RGB if necessary (for JPEG compatibility)
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
 
-            # Resize if too large (to keep database storage reasonable)
-            if img.width > max_width or img.height > max_height:
-                img.thumbnail((max_width, max_height),
-                              Image.Resampling.LANCZOS)
+def encode_base64_jpeg(source: Union[bytes, Path], max_width: int, max_height: int) -> str:
+    """Compress image bytes or a file to a JPEG data URL. Runs in a worker process."""
+    return encode_data_url(decode_upload(source), max_width, max_height)
 
-            # Save as JPEG with compression
-            buffer = BytesIO()
-            img.save(buffer, format='JPEG', quality=85, optimize=True)
-            buffer.seek(0)
 
-            # Convert to base64
-            img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+def encode_data_url(img: Image.Image, max_width: int = 800, max_height: int = 600) -> str:
+    """Compress a decoded image to a JPEG data URL (legacy base64 storage)."""
+    # Resize if too large (to keep database storage reasonable)
+    if img.width > max_width or img.height > max_height:
+        img = img.copy()
+        img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
 
-            # Return with data URL prefix
-            return f"data:image/jpeg;base64,{img_base64}"
+    # Save as JPEG with compression
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=85, optimize=True)
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=400, detail=f"Error processing image: {str(e)}")
+    # Convert to base64 and return with data URL prefix
+    img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    return f"data:image/jpeg;base64,{img_base64}"
 
 
 def base64_to_data_url(base64_string: str) -> str:
@@ -219,3 +383,591 @@ def base64_to_data_url(base64_string: str) -> str:
     if base64_string and not base64_string.startswith('data:'):
         return f"data:image/jpeg;base64,{base64_string}"
     return base64_string or ""
+
+
+def encode_image(img: Image.Image, fmt: str, profile: str = 'max') -> dict:
+    """Encode an RGB image with the profile's settings for fmt ('jpg', 'webp', 'avif')."""
+    buffer = BytesIO()
+    started_at = time.perf_counter()
+    img.save(buffer, **ENCODE_PROFILES[profile][fmt])
+    encode_ms = (time.perf_counter() - started_at) * 1000
+    return {"format": fmt, "width": img.width, "height": img.height, "data": buffer.getvalue(),
+            "encode_ms": round(encode_ms, 2)}
+
+
+def variant_widths(source_width: int) -> List[int]:
+    """Widths to render for an image: the standard steps below its own width, plus its own width (capped)."""
+    widths = {width for width in VARIANT_WIDTHS if width < source_width}
+    widths.add(min(source_width, VARIANT_WIDTHS[-1]))
+    return sorted(widths)
+
+
+def render_variants(img: Image.Image, profile: str = 'max') -> List[dict]:
+    """Render every responsive width in every enabled format."""
+    variants = []
+    for width in variant_widths(img.width):
+        if width == img.width:
+            resized = img
+        else:
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in VARIANT_ENCODERS:
+            variants.append(encode_image(resized, fmt, profile))
+    return variants
+
+
+def encode_placeholder(img: Image.Image) -> str:
+    """Tiny WebP data URL of an image; pages stretch and blur it until the real image loads."""
+    small = img.copy()
+    small.thumbnail(PLACEHOLDER_SIZE, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    small.save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY)
+    return f"data:image/webp;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+
+
+def dominant_color(img: Image.Image) -> str:
+    """Most common colour of an image as '#rrggbb' (after reducing it to a small palette)."""
+    small = img.copy()
+    small.thumbnail((64, 64))
+    quantized = small.quantize(colors=DOMINANT_COLOR_PALETTE, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def describe_image(img: Image.Image) -> dict:
+    """What pages need to lay out and paint an image before it loads."""
+    return {"placeholder": encode_placeholder(img), "dominant_color": dominant_color(img)}
+
+
+def describe_media_image(source: Union[bytes, Path]) -> dict:
+    """describe_image for image bytes or a file (backfill of older assets). Runs in a worker process."""
+    return describe_image(decode_upload(source))
+
+
+def render_media(img: Image.Image, profile: str = 'max') -> dict:
+    """
+    Render what the media store keeps for a decoded image: the display JPEG, responsive
+    variants (encoded with profile), placeholder and dominant colour. The display JPEG is
+    always encoded with 'max': its hash is the asset's identity, so it can't be swapped later.
+    """
+    return {
+        "display": encode_image(img, 'jpg'),
+        "variants": render_variants(img, profile),
+        **describe_image(img),
+        "profile": profile,
+    }
+
+
+def render_media_images(source: Union[bytes, Path], profile: str = 'max') -> dict:
+    """Decode image bytes (or a file) once and render the media store images."""
+    return render_media(decode_upload(source), profile)
+
+
+def render_resized(source: Union[bytes, Path], width: Optional[int], height: Optional[int],
+                   fit: str = 'contain', fmt: str = 'webp') -> bytes:
+    """
+    Resize an image for /img requests. Runs in a worker process.
+    'contain' fits inside width x height keeping the aspect ratio (never upscales);
+    'cover' fills the box exactly, cropping the overflow from the centre.
+    """
+    img = decode_upload(source)
+    if fit == 'cover' and width and height:
+        img = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS)
+    else:
+        img = resize_image(img, (width or FULL_SIZE[0], height or FULL_SIZE[1]))
+    return encode_image(img, fmt)["data"]
+
+
+def render_upload(source: Union[bytes, Path], base_name: str, target_dir: Path = CATS_DIR,
+                  legacy_base64: bool = False, profile: str = 'max') -> dict:
+    """
+    Single pipeline stage for an upload: decode once, then produce every output
+    from the same in-memory image - media store images, the legacy full/thumbnail
+    files and (optionally) the legacy base64 data URL. Runs in a worker process.
+    """
+    img = decode_upload(source)
+    rendered = render_media(img, profile)
+    rendered["full_path"], rendered["thumb_path"] = write_full_and_thumbnail(img, base_name, target_dir, profile)
+    rendered["base64_image"] = encode_data_url(img) if legacy_base64 else None
+    return rendered
+
+
+def media_asset_row(asset: Optional[MediaAsset], content_hash: str, ext: str, byte_size: int,
+                    width: Optional[int] = None, height: Optional[int] = None,
+                    variants: Optional[List[dict]] = None, placeholder: Optional[str] = None,
+                    dominant_color: Optional[str] = None, optimized: bool = True) -> MediaAsset:
+    """
+    The media_assets row for a stored blob: the existing one (asset) with any missing
+    details filled in, or a new one. Shared by the sync and async register_media_asset.
+    optimized=False marks fast-profile variants for the background re-encode.
+    """
+    if asset is None:
+        asset = MediaAsset(
+            hash=content_hash,
+            ext=ext,
+            content_type=CONTENT_TYPES[ext],
+            byte_size=byte_size,
+            width=width,
+            height=height
+        )
+    if variants and not asset.variants:
+        asset.variants = json.dumps(variants)
+        asset.optimized_at = datetime.now(timezone.utc) if optimized else None
+    if placeholder and not asset.placeholder:
+        asset.placeholder = placeholder
+    if dominant_color and not asset.dominant_color:
+        asset.dominant_color = dominant_color
+    return asset
+
+
+def register_media_asset(db: Session, content_hash: str, **details) -> MediaAsset:
+    """Record a stored blob in media_assets (idempotent, see media_asset_row). The caller commits."""
+    asset = media_asset_row(db.get(MediaAsset, content_hash), content_hash, **details)
+    db.add(asset)
+    db.flush()
+    return asset
+
+
+async def register_media_asset_async(db: AsyncSession, content_hash: str, **details) -> MediaAsset:
+    """register_media_asset on an AsyncSession. The caller commits."""
+    asset = media_asset_row(await db.get(MediaAsset, content_hash), content_hash, **details)
+    db.add(asset)
+    await db.flush()
+    return asset
+
+
+def store_variants(rendered_variants: List[dict]) -> List[dict]:
+    """Write rendered variants to the media store. Returns the records kept on the asset."""
+    records = []
+    for variant in rendered_variants:
+        content_hash = media_store.put(variant["data"], variant["format"])
+        records.append({
+            "width": variant["width"],
+            "height": variant["height"],
+            "format": variant["format"],
+            "hash": content_hash,
+            "bytes": len(variant["data"])
+        })
+    return records
+
+
+def record_encodes(db: Union[Session, AsyncSession], asset_hash: str, profile: str, rendered_variants: List[dict],
+                   previous: Optional[dict] = None, swapped: Optional[set] = None):
+    """
+    Record how long each variant took to encode and how big it came out (see /upload/encode-stats).
+    For re-encodes, previous maps (format, width) to the byte size being replaced and
+    swapped holds the (format, width) keys whose new encode was kept.
+    """
+    for variant in rendered_variants:
+        key = (variant["format"], variant["width"])
+        db.add(ImageEncode(
+            asset_hash=asset_hash,
+            profile=profile,
+            format=variant["format"],
+            width=variant["width"],
+            bytes=len(variant["data"]),
+            encode_ms=variant["encode_ms"],
+            previous_bytes=previous.get(key) if previous is not None else None,
+            swapped=key in swapped if swapped is not None else None
+        ))
+
+
+def store_rendered_blobs(rendered: dict) -> dict:
+    """
+    Write the output of render_media_images to the media store.
+    Returns the media_asset_row details for the stored display image.
+    """
+    display = rendered["display"]
+    return {
+        "content_hash": media_store.put(display["data"], display["format"]),
+        "ext": display["format"],
+        "byte_size": len(display["data"]),
+        "width": display["width"],
+        "height": display["height"],
+        "variants": store_variants(rendered["variants"]),
+        "placeholder": rendered["placeholder"],
+        "dominant_color": rendered["dominant_color"],
+        "optimized": rendered["profile"] == 'max',
+    }
+
+
+def store_rendered_images(rendered: dict, db: Session) -> MediaAsset:
+    """Write the output of render_media_images to the media store and record it (for scripts)."""
+    asset = register_media_asset(db, **store_rendered_blobs(rendered))
+    record_encodes(db, asset.hash, rendered["profile"], rendered["variants"])
+    return asset
+
+
+async def store_rendered_images_async(rendered: dict, db: AsyncSession) -> MediaAsset:
+    """store_rendered_images on an AsyncSession; the blobs are written in a thread."""
+    asset = await register_media_asset_async(db, **await asyncio.to_thread(store_rendered_blobs, rendered))
+    record_encodes(db, asset.hash, rendered["profile"], rendered["variants"])
+    return asset
+
+
+def reencode_media(display_path: Path, legacy_files: Optional[Tuple[Path, Path]] = None) -> dict:
+    """
+    Background 'max' pass for an asset: re-render its variants from the stored display
+    image. Legacy full/thumbnail files, when given, are re-encoded too and replaced in
+    place if that makes them smaller. Runs in a worker process.
+    """
+    img = decode_upload(display_path)
+    legacy_saved = 0
+    if legacy_files:
+        for path, data in zip(legacy_files, encode_full_and_thumbnail(img, 'max')):
+            legacy_saved += replace_if_smaller(Path(path), data)
+    return {"variants": render_variants(img, 'max'), "legacy_saved": legacy_saved}
+
+
+def replace_if_smaller(path: Path, data: bytes) -> int:
+    """Atomically replace a file with data when that makes it smaller. Returns the bytes saved."""
+    if not path.is_file():
+        return 0
+    saved = path.stat().st_size - len(data)
+    if saved <= 0:
+        return 0
+    # Write to a sibling temp file and rename so readers never see partial files
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return saved
+
+
+def store_reencoded_variants(db: Union[Session, AsyncSession], asset: MediaAsset, rendered_variants: List[dict]) -> int:
+    """
+    Swap in re-encoded variants that came out smaller than the ones the asset has.
+    The new blobs are written to the store first and the asset's variant list is
+    replaced in one update, so readers see either the old set or the new one.
+    Replaced blobs stay on disk (pages and caches may still reference them).
+    Returns the bytes saved. The caller commits.
+    """
+    records = asset.variant_list
+    by_key = {(record["format"], record["width"]): record for record in records}
+    previous = {key: record["bytes"] for key, record in by_key.items()}
+    swapped = set()
+    for variant in rendered_variants:
+        key = (variant["format"], variant["width"])
+        record = by_key.get(key)
+        if record is None or len(variant["data"]) >= record["bytes"]:
+            continue
+        record["hash"] = media_store.put(variant["data"], variant["format"])
+        record["bytes"] = len(variant["data"])
+        swapped.add(key)
+
+    asset.variants = json.dumps(records)
+    asset.optimized_at = datetime.now(timezone.utc)
+    record_encodes(db, asset.hash, 'max', rendered_variants, previous, swapped)
+    return sum(previous[key] - by_key[key]["bytes"] for key in swapped)
+
+
+def store_image_bytes(file_content: bytes, db: Session) -> MediaAsset:
+    """Process raw image bytes in this process and store the result (for scripts)."""
+    return store_rendered_images(render_media_images(file_content), db)
+
+
+async def process_and_store_image(source: Union[bytes, Path], db: AsyncSession, source_hash: str = None) -> MediaAsset:
+    """
+    Render the media images in the image engine, then store them.
+    Exact and near-duplicate uploads reuse the asset already stored for them.
+    """
+    source_hash = source_hash or source_content_hash(source)
+    try:
+        asset, signature = await find_duplicate_asset(db, source, source_hash)
+        if asset is None:
+            rendered = await image_engine.run(render_media_images, source, 'fast')
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Error processing image: {str(e)}")
+
+    if asset is None:
+        asset = await store_rendered_images_async(rendered, db)
+    await record_fingerprint_async(db, source_hash, asset.hash, signature)
+    return asset
+
+
+async def save_image_to_media_store(file: UploadFile, db: AsyncSession) -> MediaAsset:
+    """
+    Validate an uploaded image and write it to the content-addressed media store.
+    Returns the MediaAsset describing the stored image.
+    """
+    upload = await ingest_upload(file)
+    try:
+        return await process_and_store_image(upload.source, db, upload.content_hash)
+    finally:
+        await upload.close()
+
+
+async def process_upload(file: UploadFile, db: AsyncSession, cat_name: str = None,
+                         article_image: bool = False, legacy_base64: bool = False) -> dict:
+    """
+    Read an upload once and run the whole pipeline on it (see render_upload).
+    Returns the stored MediaAsset plus the legacy full/thumbnail paths and base64 data URL.
+    """
+    upload = await ingest_upload(file)
+    try:
+        return await process_ingested_upload(upload, db, cat_name, article_image, legacy_base64)
+    finally:
+        await upload.close()
+
+
+async def process_ingested_upload(upload: SpooledUpload, db: AsyncSession, cat_name: str = None,
+                                  article_image: bool = False, legacy_base64: bool = False) -> dict:
+    """
+    Run the upload pipeline on an already ingested upload. The caller closes the upload.
+    Duplicates of a stored image reuse its asset: nothing is rendered or written, so
+    `full_image` / `thumbnail` are empty and `reused` is True.
+    """
+    try:
+        asset, signature = await find_duplicate_asset(db, upload.source, upload.content_hash)
+        if asset is not None:
+            base64_image = None
+            if legacy_base64:
+                base64_image = await image_engine.run(
+                    encode_base64_jpeg, media_store.path_for(asset.hash, asset.ext), 800, 600)
+            await record_fingerprint_async(db, upload.content_hash, asset.hash, signature)
+            return {"asset": asset, "full_image": "", "thumbnail": "",
+                    "base64_image": base64_image, "reused": True}
+
+        base_name, target_dir = upload_base_name(cat_name, article_image)
+        rendered = await image_engine.run(
+            render_upload, upload.source, base_name, target_dir, legacy_base64, 'fast')
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Error processing image: {str(e)}")
+
+    asset = await store_rendered_images_async(rendered, db)
+    await record_fingerprint_async(db, upload.content_hash, asset.hash, signature)
+    return {
+        "asset": asset,
+        "full_image": str(rendered["full_path"].relative_to("static")),
+        "thumbnail": str(rendered["thumb_path"].relative_to("static")),
+        "base64_image": rendered["base64_image"],
+        "reused": False,
+    }
+
+
+def source_content_hash(source: Union[bytes, Path]) -> str:
+    """SHA-256 of image bytes or an image file."""
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    sha256 = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def perceptual_hash(source: Union[bytes, Path]) -> str:
+    """
+    64-bit difference hash (dHash) of an image as 16 hex digits.
+    Survives re-encoding, resizing and small edits; runs in a worker process.
+    """
+    return image_signature(source)["phash"]
+
+
+def image_signature(source: Union[bytes, Path]) -> dict:
+    """
+    What near-duplicate detection compares: the dHash plus the image's size and dominant
+    colour (EXIF orientation applied). Decodes a small draft only; runs in a worker process.
+    """
+    with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as img:
+        width, height = img.size
+        if img.getexif().get(0x0112) in (5, 6, 7, 8):  # EXIF orientations that swap the sides
+            width, height = height, width
+        # JPEGs can be decoded at a fraction of their size - plenty for a 9x8 hash
+        img.draft('RGB', (64, 64))
+        img = flatten_to_rgb(ImageOps.exif_transpose(img))
+        small = img.convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+        color = dominant_color(img)
+
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return {"phash": f"{bits:016x}", "width": width, "height": height, "dominant_color": color}
+
+
+def phash_bands(phash: str) -> List[int]:
+    """Split a phash into its four 16-bit bands."""
+    return [int(phash[i:i + 4], 16) for i in range(0, 16, 4)]
+
+
+def hamming_distance(phash_a: str, phash_b: str) -> int:
+    return bin(int(phash_a, 16) ^ int(phash_b, 16)).count('1')
+
+
+def distinctive_phash(phash: str) -> bool:
+    """Whether a phash has enough detail to be matched perceptually (flat images don't)."""
+    set_bits = bin(int(phash, 16)).count('1')
+    return PHASH_MIN_BITS <= set_bits <= 64 - PHASH_MIN_BITS
+
+
+def color_distance(color_a: str, color_b: str) -> int:
+    """Largest per-channel difference of two '#rrggbb' colours."""
+    return max(abs(int(color_a[i:i + 2], 16) - int(color_b[i:i + 2], 16)) for i in (1, 3, 5))
+
+
+def near_duplicate(signature: dict, other: dict) -> bool:
+    """
+    Whether two image_signatures look like the same photo: phashes within
+    PHASH_MAX_DISTANCE bits and both with detail, the same shape, the same size within
+    tolerance and a close dominant colour. A signature missing any of these never matches.
+    """
+    for image in (signature, other):
+        if not (image.get("width") and image.get("height") and image.get("dominant_color")
+                and distinctive_phash(image["phash"])):
+            return False
+    if hamming_distance(signature["phash"], other["phash"]) > PHASH_MAX_DISTANCE:
+        return False
+    aspect, other_aspect = signature["width"] / signature["height"], other["width"] / other["height"]
+    if abs(aspect - other_aspect) > PHASH_MAX_ASPECT_DIFFERENCE * other_aspect:
+        return False
+    for side in ("width", "height"):
+        if abs(signature[side] - other[side]) > PHASH_MAX_SIZE_DIFFERENCE * other[side]:
+            return False
+    return color_distance(signature["dominant_color"], other["dominant_color"]) <= PHASH_MAX_COLOR_DISTANCE
+
+
+def fingerprint_signature(fingerprint: ImageFingerprint) -> dict:
+    """The image_signature recorded with a fingerprint (size and colour are None on older ones)."""
+    return {"phash": fingerprint.phash, "width": fingerprint.width, "height": fingerprint.height,
+            "dominant_color": fingerprint.dominant_color}
+
+
+async def find_similar_fingerprint(db: AsyncSession, signature: dict) -> Optional[ImageFingerprint]:
+    """Closest near_duplicate fingerprint, looked up through the phash band indexes."""
+    if not distinctive_phash(signature["phash"]):
+        return None
+    bands = phash_bands(signature["phash"])
+    candidates = (await db.scalars(select(ImageFingerprint).where(or_(
+        ImageFingerprint.phash_band_0 == bands[0],
+        ImageFingerprint.phash_band_1 == bands[1],
+        ImageFingerprint.phash_band_2 == bands[2],
+        ImageFingerprint.phash_band_3 == bands[3],
+    )))).all()
+
+    best, best_distance = None, PHASH_MAX_DISTANCE + 1
+    for candidate in candidates:
+        if not near_duplicate(signature, fingerprint_signature(candidate)):
+            continue
+        distance = hamming_distance(signature["phash"], candidate.phash)
+        if distance < best_distance:
+            best, best_distance = candidate, distance
+    return best
+
+
+async def find_duplicate_asset(db: AsyncSession, source: Union[bytes, Path], source_hash: str) -> Tuple[Optional[MediaAsset], dict]:
+    """
+    Look for an already stored copy of an upload.
+    Returns (asset or None, image_signature). Exact re-uploads are found by content hash
+    without touching the image; otherwise the signature is computed in the image engine
+    and only a near_duplicate of an earlier upload is reused.
+    """
+    fingerprint = await db.get(ImageFingerprint, source_hash)
+    if fingerprint is None:
+        signature = await image_engine.run(image_signature, source)
+        fingerprint = await find_similar_fingerprint(db, signature)
+    else:
+        signature = fingerprint_signature(fingerprint)
+
+    asset = await db.get(MediaAsset, fingerprint.asset_hash) if fingerprint else None
+    if asset is not None and not media_store.exists(asset.hash, asset.ext):
+        # Blob removed behind the database's back - store the upload again
+        asset = None
+    return asset, signature
+
+
+def fingerprint_row(fingerprint: Optional[ImageFingerprint], source_hash: str, asset_hash: str,
+                    signature: dict) -> ImageFingerprint:
+    """The image_fingerprints row for an upload: the existing one (fingerprint) pointed at asset_hash, or a new one."""
+    if fingerprint is None:
+        bands = phash_bands(signature["phash"])
+        return ImageFingerprint(
+            source_hash=source_hash,
+            asset_hash=asset_hash,
+            phash=signature["phash"],
+            phash_band_0=bands[0],
+            phash_band_1=bands[1],
+            phash_band_2=bands[2],
+            phash_band_3=bands[3],
+            width=signature.get("width"),
+            height=signature.get("height"),
+            dominant_color=signature.get("dominant_color")
+        )
+    fingerprint.asset_hash = asset_hash
+    return fingerprint
+
+
+def record_fingerprint(db: Session, source_hash: str, asset_hash: str, signature: dict) -> ImageFingerprint:
+    """Remember which asset an upload (and its image_signature) was stored as (idempotent). The caller commits."""
+    fingerprint = fingerprint_row(db.get(ImageFingerprint, source_hash), source_hash, asset_hash, signature)
+    db.add(fingerprint)
+    db.flush()
+    return fingerprint
+
+
+async def record_fingerprint_async(db: AsyncSession, source_hash: str, asset_hash: str,
+                                   signature: dict) -> ImageFingerprint:
+    """record_fingerprint on an AsyncSession. The caller commits."""
+    fingerprint = fingerprint_row(await db.get(ImageFingerprint, source_hash), source_hash, asset_hash, signature)
+    db.add(fingerprint)
+    await db.flush()
+    return fingerprint
+
+
+def static_path(path_value: Optional[str]) -> Optional[Path]:
+    """Where a legacy image path/URL (photo_url, featured_image, image_path) points under static/, or None."""
+    if not path_value or path_value.startswith(("http://", "https://", "data:")):
+        return None
+    relative = path_value.lstrip("/")
+    if relative.startswith("static/"):
+        relative = relative[len("static/"):]
+    return Path("static") / relative
+
+
+def local_image_path(path_value: Optional[str]) -> Optional[Path]:
+    """Resolve a legacy image path/URL to an existing file under static/, or None."""
+    path = static_path(path_value)
+    return path if path is not None and path.is_file() else None
+
+
+def decode_base64_image(base64_string: str) -> bytes:
+    """Decode a (data URL or bare) base64 image and check its size."""
+    if base64_string.startswith('data:'):
+        base64_string = base64_string.split(',', 1)[-1]
+
+    try:
+        file_content = base64.b64decode(base64_string)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid base64 image data")
+
+    if len(file_content) > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400, detail="File too large (max 10MB)")
+    return file_content
+
+
+async def store_base64_image(base64_string: str, db: AsyncSession) -> MediaAsset:
+    """Decode a (data URL or bare) base64 image and write it to the media store."""
+    return await process_and_store_image(decode_base64_image(base64_string), db)
+
+
+async def move_base64_to_media_store(db: AsyncSession, values: dict, base64_field: str, hash_field: str) -> dict:
+    """
+    Replace an inline base64 image in request values with a media store hash.
+    Legacy clients still post base64 data; it is stored once and never persisted as text.
+    """
+    base64_data = values.get(base64_field)
+    if base64_data:
+        asset = await store_base64_image(base64_data, db)
+        values[hash_field] = asset.hash
+    if base64_field in values:
+        values[base64_field] = None
+    return values
@@ -0,0 +1,548 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.routing import Match
+
+from .api.conditional import CACHE_RESOURCES_STATE, Conditional
+from .models.resource_version import commit_listeners
+
+# Configuration
+# 'memory' (per worker process) or 'redis' (shared by all workers, see RedisResponseCache)
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# How long a cached response is kept; with the memory backend also the longest
+# another worker's write can go unnoticed
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+# Memory budget of the memory backend, and of each worker's near cache with the redis one
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Namespace of the redis backend's keys and invalidation channel
+RESPONSE_CACHE_REDIS_PREFIX = os.getenv("RESPONSE_CACHE_REDIS_PREFIX", "response-cache")
+# Seconds between attempts to reach Redis again while it is unreachable
+RESPONSE_CACHE_REDIS_RETRY = float(os.getenv("RESPONSE_CACHE_REDIS_RETRY", "5"))
+# Headers a 304 repeats from the cached response
+NOT_MODIFIED_HEADERS = {b"etag", b"last-modified", b"cache-control", b"x-next-cursor", b"link"}
+
+
+class CachedResponse:
+    __slots__ = ("status", "headers", "body", "resources", "expires_at", "size")
+
+    def __init__(self, status: int, headers: list, body: bytes, resources: tuple, expires_at: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.resources = tuple(resources)
+        self.expires_at = expires_at
+        self.size = len(body) + sum(len(name) + len(value) for name, value in headers)
+
+    def dumps(self) -> bytes:
+        """Serialized for a shared backend: a JSON line (status, headers, resources), then the body."""
+        meta = {
+            "status": self.status,
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in self.headers],
+            "resources": list(self.resources),
+        }
+        return json.dumps(meta).encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, data: bytes, expires_at: float) -> "CachedResponse":
+        meta, _, body = data.partition(b"\n")
+        meta = json.loads(meta)
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in meta["headers"]]
+        return cls(meta["status"], headers, body, meta["resources"], expires_at)
+
+
+class ResponseCache:
+    """
+    Response cache backend interface. Entries are rendered GET responses keyed by
+    path and query string; each records the tables it was built from, and
+    invalidate() drops every entry built from any of the given tables.
+
+    generation changes with every invalidation: the middleware notes it before
+    rendering a response and put() refuses the response if it changed meanwhile
+    (it may have been rendered from data a concurrent write just replaced).
+    """
+
+    ttl: float
+    generation: int = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    async def lookup(self, key: str) -> Optional[CachedResponse]:
+        """get() from the event loop (backends doing network I/O do it in a thread)."""
+        return self.get(key)
+
+    def put(self, key: str, entry: CachedResponse, generation: int):
+        raise NotImplementedError
+
+    def invalidate(self, resources):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def start(self):
+        """Start background work (call from a running event loop)."""
+
+    def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    Responses in this process's memory, capped at a total byte budget (least
+    recently used entries are evicted first) and expired after a TTL.
+    Thread-safe: writes commit from worker threads too (image optimizer).
+    """
+
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> CachedResponse, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedResponse, generation: int):
+        """Store a rendered response (a miss: lookups of uncacheable routes don't count)."""
+        with self._lock:
+            self.misses += 1
+            if generation == self.generation:
+                self._store(key, entry)
+
+    def _store(self, key: str, entry: CachedResponse):
+        if entry.size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def add(self, key: str, entry: CachedResponse):
+        """Store an entry fetched from elsewhere (not a miss, no generation check)."""
+        with self._lock:
+            self._store(key, entry)
+
+    def invalidate(self, resources):
+        """Drop every entry built from any of these tables."""
+        resources = set(resources)
+        with self._lock:
+            self.generation += 1
+            stale = [key for key, entry in self._entries.items() if resources.intersection(entry.resources)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class RedisResponseCache(ResponseCache):
+    """
+    Responses shared by all worker processes through Redis (or anything speaking
+    its protocol), so a response rendered by one worker is a hit on all of them.
+
+    - <prefix>:entry:<key> holds a serialized response, expiring after the TTL;
+      its size bound is Redis's own (maxmemory with an allkeys-lru policy)
+    - <prefix>:tag:<table> is the set of entry keys built from that table
+    - each worker keeps a near cache (MemoryResponseCache) of the entries it
+      served, so hot responses cost no round trip at all
+    - invalidate() deletes the tagged entries and publishes the tables on
+      <prefix>:invalidate; every other worker's subscriber thread drops them from
+      its near cache. A worker that loses the subscription clears its near cache.
+
+    Nothing here waits for Redis on the event loop: lookups run in a thread, and
+    writes and invalidations are queued to one writer thread (so they reach Redis
+    in the order they were made). While an invalidation is queued, lookups skip
+    Redis, which may still hold the entries it is about to delete.
+
+    When Redis is unreachable (at startup too) the cache passes through: only the
+    near cache is used, invalidations are remembered, and the subscriber thread
+    retries every RESPONSE_CACHE_REDIS_RETRY seconds. Once it is back the
+    remembered tables are invalidated before Redis is used again.
+    """
+
+    def __init__(self, client, ttl: float, near_cache: MemoryResponseCache,
+                 prefix: str = RESPONSE_CACHE_REDIS_PREFIX, retry_seconds: float = RESPONSE_CACHE_REDIS_RETRY):
+        self.client = client
+        self.ttl = ttl
+        self.near_cache = near_cache
+        self.prefix = prefix
+        self.channel = f"{prefix}:invalidate"
+        self.retry_seconds = retry_seconds
+        # Tells this worker's own invalidation messages apart from the others'
+        self.origin = uuid.uuid4().hex
+        self._subscriber = None
+        self._stopping = threading.Event()
+        self._writer = None
+        # Orders put() and invalidate() with their queued Redis writes
+        self._lock = threading.Lock()
+        self._pending_invalidations = 0
+        self._missed_resources = set()  # invalidated while Redis was unreachable
+        self.available = True
+        self.subscribed = False
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.remote_invalidations = 0
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float, max_bytes: int) -> "RedisResponseCache":
+        import redis
+
+        return cls(redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1),
+                   ttl, MemoryResponseCache(ttl, max_bytes))
+
+    @property
+    def generation(self) -> int:
+        return self.near_cache.generation
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.prefix}:entry:{key}"
+
+    def _tag_key(self, resource: str) -> str:
+        return f"{self.prefix}:tag:{resource}"
+
+    def _redis_failed(self, error: Exception):
+        self.errors += 1
+        with self._lock:
+            was_available, self.available = self.available, False
+        if was_available:
+            print(f"⚠️  Response cache: Redis unavailable, serving uncached: {error}")
+
+    def _recover(self):
+        """Use Redis again, after invalidating what changed while it was unreachable."""
+        with self._lock:
+            if self.available:
+                return
+            self.available = True
+            missed, self._missed_resources = self._missed_resources, set()
+            if missed:
+                self._queue_invalidation(sorted(missed))
+        print("✅ Response cache: Redis reachable again")
+
+    def _submit(self, fn, *args):
+        # One writer thread: the Redis writes apply in the order they were queued
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+        self._writer.submit(fn, *args)
+
+    def _use_redis(self) -> bool:
+        return self.available and not self._pending_invalidations
+
+    def _near_get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.near_cache.get(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def _shared_get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            data, ttl_ms = self.client.pipeline(transaction=False).get(
+                self._entry_key(key)).pttl(self._entry_key(key)).execute()
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if data is None:
+            return None
+
+        # Kept locally only as long as the shared copy lives
+        entry = CachedResponse.loads(data, time.monotonic() + max(ttl_ms, 0) / 1000)
+        self.near_cache.add(key, entry)
+        self.hits += 1
+        return entry
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._near_get(key)
+        if entry is None and self._use_redis():
+            entry = self._shared_get(key)
+        return entry
+
+    async def lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self._near_get(key)
+        if entry is None and self._use_redis():
+            entry = await asyncio.to_thread(self._shared_get, key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse, generation: int):
+        self.misses += 1
+        with self._lock:
+            if generation != self.generation:
+                return
+            self.near_cache.add(key, entry)
+            if self.available:
+                self._submit(self._shared_put, key, entry)
+
+    def _shared_put(self, key: str, entry: CachedResponse):
+        if not self.available:
+            return
+        ttl_ms = int(self.ttl * 1000)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(self._entry_key(key), entry.dumps(), px=ttl_ms)
+        for resource in entry.resources:
+            # A tag set lives as long as the newest entry in it
+            pipe.sadd(self._tag_key(resource), key)
+            pipe.pexpire(self._tag_key(resource), ttl_ms)
+        try:
+            pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    def invalidate(self, resources):
+        resources = sorted(set(resources))
+        with self._lock:
+            self.near_cache.invalidate(resources)
+            if self.available:
+                self._queue_invalidation(resources)
+            else:
+                self._missed_resources.update(resources)
+
+    def _queue_invalidation(self, resources: list):
+        # Called holding _lock
+        self._pending_invalidations += 1
+        self._submit(self._shared_invalidate, resources)
+
+    def _shared_invalidate(self, resources: list):
+        try:
+            if self.available:
+                try:
+                    tag_keys = [self._tag_key(resource) for resource in resources]
+                    pipe = self.client.pipeline(transaction=False)
+                    for tag_key in tag_keys:
+                        pipe.smembers(tag_key)
+                    keys = {self._entry_key(member.decode()) for members in pipe.execute() for member in members}
+
+                    pipe = self.client.pipeline(transaction=False)
+                    pipe.delete(*keys, *tag_keys)
+                    pipe.publish(self.channel, json.dumps({"origin": self.origin, "resources": resources}))
+                    pipe.execute()
+                    return
+                except Exception as e:
+                    self._redis_failed(e)
+            # Retried once Redis is reachable again
+            with self._lock:
+                self._missed_resources.update(resources)
+        finally:
+            with self._lock:
+                self._pending_invalidations -= 1
+
+    def _on_message(self, message):
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        if payload.get("origin") != self.origin:
+            self.remote_invalidations += 1
+            self.near_cache.invalidate(payload.get("resources", []))
+
+    def _subscribe(self):
+        """Subscriber thread: listen for invalidations, reconnecting until stopped."""
+        while not self._stopping.is_set():
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(**{self.channel: self._on_message})
+                self.subscribed = True
+                self._recover()
+                while not self._stopping.is_set():
+                    pubsub.get_message(timeout=1)
+                    if not self.available:
+                        # A lookup or write failed while the subscription stayed up
+                        self.client.ping()
+                        self._recover()
+            except Exception as e:
+                self._redis_failed(e)
+            finally:
+                pubsub.close()
+            if self.subscribed:
+                # Invalidations may have been missed while disconnected
+                self.subscribed = False
+                self.near_cache.clear()
+            self._stopping.wait(self.retry_seconds)
+
+    def clear(self):
+        self.near_cache.clear()
+        try:
+            for key in self.client.scan_iter(f"{self.prefix}:*"):
+                self.client.delete(key)
+        except Exception as e:
+            self._redis_failed(e)
+
+    def start(self):
+        """Subscribe in a background thread (never fails: Redis may be down, it retries)."""
+        if self._subscriber is None:
+            self._stopping.clear()
+            self._subscriber = threading.Thread(target=self._subscribe, name="response-cache-subscriber",
+                                                daemon=True)
+            self._subscriber.start()
+
+    def stop(self):
+        """Stop the subscriber and finish the queued writes (blocks: call from a thread)."""
+        if self._subscriber is not None:
+            self._stopping.set()
+            self._subscriber.join()
+            self._subscriber = None
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": "redis",
+            "hits": self.hits,
+            "near_cache_hits": self.near_cache.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "ttl_seconds": self.ttl,
+            "available": self.available,
+            "errors": self.errors,
+            "remote_invalidations": self.remote_invalidations,
+            "subscribed": self.subscribed,
+            "near_cache": {key: value for key, value in self.near_cache.stats().items()
+                           if key in ("entries", "bytes", "max_bytes", "evictions", "invalidations")},
+        }
+        try:
+            stats["redis_keys"] = self.client.dbsize()
+            stats["redis_used_memory"] = self.client.info("memory").get("used_memory")
+        except Exception:
+            # Not every server speaking the protocol implements INFO
+            stats.setdefault("redis_keys", None)
+            stats["redis_used_memory"] = None
+        return stats
+
+
+def create_response_cache() -> ResponseCache:
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisResponseCache.from_url(REDIS_URL, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES)
+    return MemoryResponseCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES)
+
+
+response_cache = create_response_cache()
+commit_listeners.append(response_cache.invalidate)
+
+
+class ResponseCacheMiddleware:
+    """
+    Serve GET requests from response_cache, and store the responses endpoints tag
+    as cacheable (200s without cookies). A hit skips the endpoint entirely: no
+    queries, no serialization, no template rendering. A hit whose ETag or
+    Last-Modified the client already has is answered with a 304.
+    Installed innermost, so CORS and session headers are never cached.
+
+    Only requests for routes that have tagged a response as cacheable are looked
+    up, so other pages never wait for a cache round trip.
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+        self.cacheable_routes = []
+
+    def cacheable(self, scope) -> bool:
+        return any(route.matches(scope)[0] == Match.FULL for route in self.cacheable_routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{scope['path']}?{scope['query_string'].decode('latin-1')}"
+        if self.cacheable(scope):
+            entry = await self.cache.lookup(key)
+            if entry is not None:
+                await self.send_cached(scope, entry, send)
+                return
+
+        generation = self.cache.generation
+        state = scope.setdefault("state", {})
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                resources = state.get(CACHE_RESOURCES_STATE)
+                if (not message.get("more_body") and resources and start.get("status") == 200
+                        and not any(name == b"set-cookie" for name, _ in start.get("headers", []))):
+                    entry = CachedResponse(start["status"], list(start.get("headers", [])), b"".join(chunks),
+                                           resources, time.monotonic() + self.cache.ttl)
+                    self.cache.put(key, entry, generation)
+                    # Set on the scope by the router
+                    if "route" in scope and scope["route"] not in self.cacheable_routes:
+                        self.cacheable_routes.append(scope["route"])
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    @staticmethod
+    async def send_cached(scope, entry: CachedResponse, send):
+        cached_headers = dict(entry.headers)
+        validators = {name: cached_headers[header].decode("latin-1")
+                      for name, header in (("ETag", b"etag"), ("Last-Modified", b"last-modified"))
+                      if header in cached_headers}
+        if "ETag" in validators and Conditional.not_modified(Request(scope), validators):
+            headers = [(name, value) for name, value in entry.headers if name in NOT_MODIFIED_HEADERS]
+            await send({"type": "http.response.start", "status": 304, "headers": headers + [(b"x-cache", b"HIT")]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({"type": "http.response.start", "status": entry.status,
+                    "headers": entry.headers + [(b"x-cache", b"HIT")]})
+        await send({"type": "http.response.body", "body": entry.body})
@@ -1,11 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 
 class ArticleImageSerializer(BaseModel):
     image_path: str  # DEPRECATED - kept for compatibility
-    image_base64: Optional[str] = None  # Base64 encoded image data
+    image_base64: Optional[str] = None  # DEPRECATED - stored in the media store on save
+    image_hash: Optional[str] = None  # Media store hash of the image
     caption: Optional[str] = None
     display_order: int = 0
 
@@ -16,6 +17,14 @@ class CreateArticleImageRequest(ArticleImageSerializer):
 
 class ArticleImageResponse(ArticleImageSerializer):
     id: int
+    image_media_url: Optional[str] = None
+    image_srcset: Optional[Dict[str, str]] = None  # srcset per format: avif/webp/jpg
+    image_placeholder: Optional[str] = None  # Tiny WebP data URL shown until the image loads
+    image_width: Optional[int] = None  # Stored image metadata, so clients can reserve its space
+    image_height: Optional[int] = None
+    image_format: Optional[str] = None
+    image_bytes: Optional[int] = None
+    image_color: Optional[str] = None  # Dominant colour '#rrggbb'
     article_id: int
     created_at: datetime
 
@@ -23,14 +32,36 @@ class ArticleImageResponse(ArticleImageSerializer):
         from_attributes = True
 
 
+class ArticleImageSummaryResponse(BaseModel):
+    """GET /articles/{id}/images/?view=summary - gallery fields without base64."""
+    id: int
+    article_id: int
+    caption: Optional[str] = None
+    display_order: int = 0
+    image_path: str
+    image_media_url: Optional[str] = None
+    image_srcset: Optional[Dict[str, str]] = None
+    image_placeholder: Optional[str] = None
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    image_color: Optional[str] = None
+    image_inline: Optional[bool] = None  # Image still inline base64 (served by /img/article-image/{id})
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class ArticleSerializer(BaseModel):
     title: str
     content: str
     author: str = "Admin"
     published: bool = False
     featured_image: Optional[str] = None  # DEPRECATED - kept for compatibility
-    # Base64 encoded featured image
+    # DEPRECATED - stored in the media store on save
     featured_image_base64: Optional[str] = None
+    # Media store hash of the featured image
+    featured_image_hash: Optional[str] = None
 
 
 class CreateArticleRequest(ArticleSerializer):
@@ -39,9 +70,140 @@ class CreateArticleRequest(ArticleSerializer):
 
 class ArticleApiResponse(ArticleSerializer):
     id: int
+    featured_image_media_url: Optional[str] = None
+    featured_image_srcset: Optional[Dict[str, str]] = None  # srcset per format: avif/webp/jpg
+    featured_image_placeholder: Optional[str] = None  # Tiny WebP data URL shown until the image loads
+    featured_image_width: Optional[int] = None  # Stored image metadata, so clients can reserve its space
+    featured_image_height: Optional[int] = None
+    featured_image_format: Optional[str] = None
+    featured_image_bytes: Optional[int] = None
+    featured_image_color: Optional[str] = None  # Dominant colour '#rrggbb'
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
         # Allows using SQLAlchemy ORM objects directly
+
+
+class ArticleSummaryResponse(BaseModel):
+    """GET /articles/?view=summary - card fields: an excerpt instead of the content, no base64."""
+    id: int
+    title: str
+    author: str = "Admin"
+    published: bool = False
+    excerpt: Optional[str] = None  # First ARTICLE_EXCERPT_LENGTH characters of the content
+    featured_image: Optional[str] = None
+    featured_image_media_url: Optional[str] = None
+    featured_image_srcset: Optional[Dict[str, str]] = None
+    featured_image_placeholder: Optional[str] = None
+    featured_image_width: Optional[int] = None
+    featured_image_height: Optional[int] = None
+    featured_image_color: Optional[str] = None
+    featured_image_inline: Optional[bool] = None  # Image still inline base64 (served by /img/article/{id})
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ArticleSearchResponse(BaseModel):
+    """GET /articles/search - card fields and where the query matched; no content, no base64."""
+    id: int
+    title: str
+    author: str = "Admin"
+    published: bool = False
+    snippet: Optional[str] = None  # Content around the matches, HTML-escaped, matches in <mark>
+    search_rank: float  # Higher is a better match
+    featured_image: Optional[str] = None
+    featured_image_media_url: Optional[str] = None
+    featured_image_srcset: Optional[Dict[str, str]] = None
+    featured_image_placeholder: Optional[str] = None
+    featured_image_width: Optional[int] = None
+    featured_image_height: Optional[int] = None
+    featured_image_color: Optional[str] = None
+    featured_image_inline: Optional[bool] = None  # Image still inline base64 (served by /img/article/{id})
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+def _static_path(path: Optional[str]) -> Optional[str]:
+    """Legacy image paths are relative to /static."""
+    if path and not path.startswith(('http://', 'https://', '/static/')):
+        return f"/static/{path}"
+    return path
+
+
+def _data_url(data: Optional[str]) -> Optional[str]:
+    """Legacy base64 images are stored without the data URL prefix."""
+    if data and not data.startswith('data:'):
+        return f"data:image/jpeg;base64,{data}"
+    return data
+
+
+class ArticleImageView(BaseModel):
+    """Gallery image on the article page, with display-ready URLs (read-only)."""
+    id: int
+    caption: Optional[str] = None
+    display_order: int = 0
+    image_path: str
+    image_base64: Optional[str] = None
+    image_hash: Optional[str] = None
+    image_media_url: Optional[str] = None
+    image_srcset: Optional[Dict[str, str]] = None
+    image_placeholder: Optional[str] = None
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+
+    _static_image_path = field_validator("image_path")(_static_path)
+    _image_data_url = field_validator("image_base64")(_data_url)
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
+class ArticleDetailView(BaseModel):
+    """The article page: the article and its gallery, with display-ready URLs (read-only)."""
+    id: int
+    title: str
+    content: str
+    author: str = "Admin"
+    featured_image: Optional[str] = None
+    featured_image_base64: Optional[str] = None
+    featured_image_hash: Optional[str] = None
+    featured_image_media_url: Optional[str] = None
+    featured_image_srcset: Optional[Dict[str, str]] = None
+    featured_image_placeholder: Optional[str] = None
+    featured_image_width: Optional[int] = None
+    featured_image_height: Optional[int] = None
+    created_at: datetime
+    images: List[ArticleImageView] = []
+
+    _static_featured_image = field_validator("featured_image")(_static_path)
+    _featured_image_data_url = field_validator("featured_image_base64")(_data_url)
+
+    @field_validator("images")
+    @classmethod
+    def _in_display_order(cls, images: List[ArticleImageView]) -> List[ArticleImageView]:
+        return sorted(images, key=lambda image: (image.display_order, image.id))
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+
+class RelatedArticleView(BaseModel):
+    """Card linking another article from the article page (read-only)."""
+    id: int
+    title: str
+    excerpt: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+        frozen = True
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, field_validator
 from datetime import datetime, date, timezone
-from typing import Optional
+from typing import Dict, Optional
 
 
 class CatSerializer(BaseModel):
@@ -10,7 +10,8 @@ class CatSerializer(BaseModel):
     date_of_birth: date
     description: Optional[str] = None
     photo_url: Optional[str] = None  # DEPRECATED - kept for compatibility
-    photo_base64: Optional[str] = None  # Base64 encoded image data
+    photo_base64: Optional[str] = None  # DEPRECATED - stored in the media store on save
+    photo_hash: Optional[str] = None  # Media store hash of the photo
     is_available: bool = True
 
 
@@ -18,12 +19,10 @@ class CreateCatRequest(CatSerializer):
     pass
 
 
-class CatApiResponse(CatSerializer):
-    id: int
-    created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
+class AwareTimestamps(BaseModel):
+    """Serializes naive created_at/updated_at (SQLite) as UTC."""
 
-    @field_validator('created_at', 'updated_at', mode='before')
+    @field_validator('created_at', 'updated_at', mode='before', check_fields=False)
     @classmethod
     def make_datetime_aware(cls, v):
         if v is None or v == "":
@@ -34,3 +33,36 @@ class CatApiResponse(CatSerializer):
 
     class Config:
         from_attributes = True  # Allows using ORM objects directly
+
+
+class CatApiResponse(CatSerializer, AwareTimestamps):
+    id: int
+    photo_media_url: Optional[str] = None
+    photo_srcset: Optional[Dict[str, str]] = None  # srcset per format: avif/webp/jpg
+    photo_placeholder: Optional[str] = None  # Tiny WebP data URL shown until the photo loads
+    photo_width: Optional[int] = None  # Stored photo metadata, so clients can reserve its space
+    photo_height: Optional[int] = None
+    photo_format: Optional[str] = None
+    photo_bytes: Optional[int] = None
+    photo_color: Optional[str] = None  # Dominant colour '#rrggbb'
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class CatSummaryResponse(AwareTimestamps):
+    """GET /cats/?view=summary - what a card or a dropdown needs, no description or base64."""
+    id: int
+    name: str
+    gender: str
+    litter_code: str
+    date_of_birth: date
+    is_available: bool
+    photo_url: Optional[str] = None
+    photo_media_url: Optional[str] = None
+    photo_srcset: Optional[Dict[str, str]] = None
+    photo_placeholder: Optional[str] = None
+    photo_width: Optional[int] = None
+    photo_height: Optional[int] = None
+    photo_color: Optional[str] = None
+    photo_inline: Optional[bool] = None  # Photo still inline base64 (served by /img/cat/{id})
+    created_at: Optional[datetime] = None
@@ -0,0 +1,126 @@
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+# Configuration
+SQL_PROFILER = os.getenv("SQL_PROFILER", "true").lower() == "true"
+# Statements slower than this are logged with their route
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+# The same statement this many times in one request is reported as a likely N+1
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+# Characters of a statement shown in log lines
+LOGGED_STATEMENT_LENGTH = 300
+
+
+def compact(statement: str) -> str:
+    """A statement on one line, shortened for the log."""
+    statement = re.sub(r"\s+", " ", statement).strip()
+    if len(statement) > LOGGED_STATEMENT_LENGTH:
+        return statement[:LOGGED_STATEMENT_LENGTH] + "..."
+    return statement
+
+
+class RequestProfile:
+    """
+    The statements one request ran: how many, the time spent in the database,
+    and how often each distinct statement ran (parameters aside - the same
+    SELECT for every row of a list is one statement run N times).
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = Counter()
+        self.count = 0
+        self.seconds = 0.0
+        # Queries from worker threads (run_in_threadpool) land here too
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        """METHOD /route/{template} once the router has matched, else the raw path."""
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', self.scope['path'])}"
+
+    def record(self, statement: str, seconds: float) -> int:
+        """Count a statement; returns how many times it has run in this request."""
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.statements[statement] += 1
+            return self.statements[statement]
+
+    def server_timing(self) -> str:
+        queries = "query" if self.count == 1 else "queries"
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} {queries}"'
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+
+# The start time lives on the statement's execution context, which is discarded
+# with it: a statement that raises leaves nothing behind on the connection
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.profiler_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "profiler_start", None)
+    if start is None:
+        # Dialect-internal statements run without a context
+        return
+    seconds = time.perf_counter() - start
+    profile = current_profile.get()
+    route = profile.route if profile is not None else "background"
+
+    if seconds * 1000 >= SQL_SLOW_QUERY_MS:
+        print(f"🐢 Slow query ({seconds * 1000:.0f} ms) on {route}: {compact(statement)}")
+
+    if profile is not None:
+        # Reported once, when the statement reaches the threshold
+        if profile.record(statement, seconds) == SQL_REPEAT_THRESHOLD:
+            print(f"🔁 Repeated query (N+1?) on {route}: ran {SQL_REPEAT_THRESHOLD}+ times - {compact(statement)}")
+
+
+def instrument(engine):
+    """Time every statement on the engine (for the async engine, pass engine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SqlProfilerMiddleware:
+    """
+    Profile each request's SQL: the statement count and database time are sent
+    in a Server-Timing header (shown in the browser's network panel), slow
+    statements are logged with their route, and statements repeated within one
+    request - the N+1 pattern - are reported once per request.
+    Only statements run before the response starts are in the header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_PROFILER:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = current_profile.set(profile)
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start" and profile.count:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", profile.server_timing().encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            current_profile.reset(token)
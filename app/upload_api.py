@@ -1,53 +1,84 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from pathlib import Path
+from collections import defaultdict
+from typing import List, Optional
+import asyncio
 import json
+import os
 
-from .photo_utils import save_uploaded_photo, get_image_info, convert_image_to_base64
+from .database import get_async_db, AsyncSessionLocal
+from .image_engine import image_engine, IMAGE_WORKERS
+from .image_optimizer import image_optimizer
+from .media_janitor import media_janitor
+from .models.media import MediaAsset, ImageEncode
+from .photo_utils import save_uploaded_photo, get_image_info, process_upload, ingest_upload, process_ingested_upload
+
+# Files of one batch processed at the same time (defaults to one per image worker)
+UPLOAD_BATCH_PARALLELISM = int(os.getenv("UPLOAD_BATCH_PARALLELISM", str(IMAGE_WORKERS)))
 
 router = APIRouter()
 
 
+def schedule_optimization(processed: dict):
+    """Queue a freshly rendered upload (fast encodes) for the background 'max' re-encode."""
+    if not processed["reused"]:
+        image_optimizer.schedule(processed["asset"].hash, (
+            Path("static") / processed["full_image"], Path("static") / processed["thumbnail"]))
+
+
 @router.post("/upload/photo")
 async def upload_photo(
     file: UploadFile = File(...),
     cat_name: Optional[str] = Form(None),
-    article_image: Optional[str] = Form(None)
+    article_image: Optional[str] = Form(None),
+    legacy_base64: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload and process a photo (cat or article).
-    Returns base64 encoded image for database storage.
+    The upload is read and decoded once; the media store image, the filesystem
+    full/thumbnail files and (with legacy_base64=true) a base64 data URL all
+    come from that single decode.
+    Returns the media store hash and URL to save on the cat/article.
     """
     try:
-        # Convert image to base64 for database storage
-        base64_data = await convert_image_to_base64(file)
-
-        # Also save to filesystem for backward compatibility (if needed)
         name_prefix = f"article_{cat_name}" if article_image == "true" else cat_name
-        try:
-            full_path, thumb_path = await save_uploaded_photo(file, name_prefix, article_image == "true")
-        except:
-            # If file save fails, still return base64 (this is for Render compatibility)
-            full_path = ""
-            thumb_path = ""
+        result = await process_upload(
+            file, db, name_prefix, article_image == "true", legacy_base64 == "true")
+        await db.commit()
+        schedule_optimization(result)
+
+        asset = result["asset"]
+        data = {
+            "media_hash": asset.hash,               # Primary storage method
+            "media_url": asset.url,
+            "full_image": result["full_image"],     # Fallback for compatibility
+            "thumbnail": result["thumbnail"],       # Fallback for compatibility
+            "original_filename": file.filename,
+            "reused": result["reused"]              # Duplicate of an already stored image
+        }
+        if result["base64_image"]:
+            data["base64_image"] = result["base64_image"]
 
         return JSONResponse(content={
             "success": True,
-            "message": "Photo uploaded successfully",
-            "data": {
-                "base64_image": base64_data,  # Primary storage method
-                "full_image": full_path,      # Fallback for compatibility
-                "thumbnail": thumb_path,      # Fallback for compatibility
-                "original_filename": file.filename
-            }
+            "message": "Photo already stored - reusing it" if result["reused"] else "Photo uploaded successfully",
+            "data": data
         })
 
     except HTTPException as e:
+        await db.rollback()
         return JSONResponse(
             content={"success": False, "message": e.detail},
-            status_code=e.status_code
+            status_code=e.status_code,
+            headers=e.headers
         )
     except Exception as e:
+        await db.rollback()
         return JSONResponse(
             content={"success": False, "message": f"Upload failed: {str(e)}"},
             status_code=500
@@ -57,25 +88,32 @@ async def upload_photo(
 @router.post("/upload/multiple")
 async def upload_multiple_photos(files: list[UploadFile] = File(...)):
     """
-    Upload multiple photos at once.
+    Upload multiple photos at once (processed concurrently, see UPLOAD_BATCH_PARALLELISM).
     """
+    semaphore = asyncio.Semaphore(UPLOAD_BATCH_PARALLELISM)
+
+    async def save(file: UploadFile):
+        async with semaphore:
+            return await save_uploaded_photo(file)
+
+    outcomes = await asyncio.gather(*[save(file) for file in files], return_exceptions=True)
+
     results = []
     errors = []
-
-    for i, file in enumerate(files):
-        try:
-            full_path, thumb_path = await save_uploaded_photo(file)
-            results.append({
+    for i, (file, outcome) in enumerate(zip(files, outcomes)):
+        if isinstance(outcome, Exception):
+            errors.append({
                 "index": i,
                 "filename": file.filename,
-                "full_image": full_path,
-                "thumbnail": thumb_path
+                "error": str(outcome)
             })
-        except Exception as e:
-            errors.append({
+        else:
+            full_path, thumb_path = outcome
+            results.append({
                 "index": i,
                 "filename": file.filename,
-                "error": str(e)
+                "full_image": full_path,
+                "thumbnail": thumb_path
             })
 
     return JSONResponse(content={
@@ -88,17 +126,185 @@ async def upload_multiple_photos(files: list[UploadFile] = File(...)):
     })
 
 
+@router.post("/upload/batch")
+async def upload_photo_batch(
+    files: List[UploadFile] = File(...),
+    cat_name: Optional[str] = Form(None),
+    article_image: Optional[str] = Form(None),
+    parallelism: Optional[int] = Form(None)
+):
+    """
+    Upload a batch of photos to the media store, processing several at once.
+    Streams one NDJSON line per file as it finishes, then a summary line:
+        {"index": 0, "filename": "a.jpg", "success": true, "data": {"media_hash": ..., "media_url": ...}}
+        {"index": 1, "filename": "b.txt", "success": false, "message": "..."}
+        {"done": true, "total": 2, "successful": 1, "failed": 1}
+    """
+    limit = max(1, min(parallelism or UPLOAD_BATCH_PARALLELISM, UPLOAD_BATCH_PARALLELISM))
+    name_prefix = f"article_{cat_name}" if article_image == "true" else cat_name
+
+    # Ingest every file up front: FastAPI closes the request's files once this
+    # handler returns, before the response body is streamed
+    uploads = []
+    for file in files:
+        try:
+            uploads.append(await ingest_upload(file))
+        except HTTPException as e:
+            uploads.append(e)
+
+    return StreamingResponse(
+        stream_batch_results(files, uploads, name_prefix, article_image == "true", limit),
+        media_type="application/x-ndjson")
+
+
+async def stream_batch_results(files, uploads, name_prefix, article_image, limit):
+    """Process ingested uploads concurrently and yield an NDJSON line per finished file."""
+    semaphore = asyncio.Semaphore(limit)
+    # Identical files of the batch go one after another, so the copies reuse the first one's asset
+    same_content = defaultdict(asyncio.Lock)
+
+    async def store(upload, db):
+        try:
+            processed = await process_ingested_upload(upload, db, name_prefix, article_image)
+            await db.commit()
+        except IntegrityError:
+            # An identical file (same batch, other request) inserted the same asset first:
+            # start over, and the pipeline finds the stored copy and reuses it
+            await db.rollback()
+            processed = await process_ingested_upload(upload, db, name_prefix, article_image)
+            await db.commit()
+        return processed
+
+    async def process(index, filename, upload):
+        result = {"index": index, "filename": filename}
+        if isinstance(upload, HTTPException):
+            return {**result, "success": False, "message": upload.detail}
+        # One session per file: a file's rollback must not undo another file's rows
+        # (the request's session is closed anyway once the handler returns)
+        async with AsyncSessionLocal() as db:
+            try:
+                async with same_content[upload.content_hash], semaphore:
+                    processed = await store(upload, db)
+                schedule_optimization(processed)
+                asset = processed["asset"]
+                return {**result, "success": True, "data": {
+                    "media_hash": asset.hash,
+                    "media_url": asset.url,
+                    "full_image": processed["full_image"],
+                    "thumbnail": processed["thumbnail"],
+                    "reused": processed["reused"]
+                }}
+            except HTTPException as e:
+                await db.rollback()
+                return {**result, "success": False, "message": e.detail}
+            except Exception as e:
+                await db.rollback()
+                return {**result, "success": False, "message": f"Upload failed: {str(e)}"}
+            finally:
+                await upload.close()
+
+    tasks = [asyncio.create_task(process(i, file.filename, upload))
+             for i, (file, upload) in enumerate(zip(files, uploads))]
+    successful = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            successful += result["success"]
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"done": True, "total": len(tasks),
+                          "successful": successful, "failed": len(tasks) - successful}) + "\n"
+    finally:
+        # Client went away mid-batch: stop the remaining work
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@router.get("/upload/engine-stats")
+async def get_image_engine_stats():
+    """
+    Image engine statistics: queue depth, rejections, queue wait and processing times.
+    """
+    return JSONResponse(content={
+        "success": True,
+        "data": image_engine.stats()
+    })
+
+
+@router.get("/upload/encode-stats")
+async def get_encode_stats(db: AsyncSession = Depends(get_async_db)):
+    """
+    Encode profile statistics for tuning ENCODE_PROFILES: per profile and format,
+    how many variants were encoded, their average size and encode time, and for
+    the background re-encodes how many bytes they saved.
+    """
+    rows = (await db.execute(
+        select(ImageEncode.profile,
+               ImageEncode.format,
+               func.count(ImageEncode.id),
+               func.avg(ImageEncode.bytes),
+               func.avg(ImageEncode.encode_ms),
+               func.max(ImageEncode.encode_ms),
+               func.sum(ImageEncode.previous_bytes),
+               func.sum(ImageEncode.bytes))
+        .group_by(ImageEncode.profile, ImageEncode.format)
+        .order_by(ImageEncode.profile, ImageEncode.format))).all()
+    swapped = {fmt: (count, saved) for fmt, count, saved in (await db.execute(
+        select(ImageEncode.format, func.count(ImageEncode.id),
+               func.sum(ImageEncode.previous_bytes - ImageEncode.bytes))
+        .where(ImageEncode.swapped.is_(True))
+        .group_by(ImageEncode.format))).all()}
+
+    profiles = []
+    for profile, fmt, count, avg_bytes, avg_ms, max_ms, previous_bytes, total_bytes in rows:
+        entry = {
+            "profile": profile,
+            "format": fmt,
+            "encodes": count,
+            "avg_bytes": round(avg_bytes),
+            "avg_encode_ms": round(avg_ms, 2),
+            "max_encode_ms": round(max_ms, 2),
+        }
+        if profile == "max" and previous_bytes:
+            # Size change had every re-encode been kept (only the smaller ones are)
+            entry["size_vs_fast_pct"] = round((total_bytes / previous_bytes - 1) * 100, 1)
+            entry["swapped"], entry["bytes_saved"] = swapped.get(fmt, (0, 0))
+        profiles.append(entry)
+
+    pending = await db.scalar(select(func.count(MediaAsset.hash)).where(
+        MediaAsset.optimized_at.is_(None), MediaAsset.variants.isnot(None)))
+    return JSONResponse(content={
+        "success": True,
+        "data": {
+            "profiles": profiles,
+            "optimizer": {**image_optimizer.stats(), "pending": pending},
+        }
+    })
+
+
+@router.get("/upload/janitor-stats")
+async def get_janitor_stats():
+    """
+    Media janitor statistics: sweeps run, bytes reclaimed and quarantined, last sweep report.
+    """
+    return JSONResponse(content={
+        "success": True,
+        "data": media_janitor.stats()
+    })
+
+
 @router.delete("/upload/cleanup")
 async def cleanup_temp_files():
     """
-    Clean up temporary files (for maintenance).
+    Clean up temporary files (for maintenance). Orphaned uploads are only handled by
+    the media janitor's sweeps (scheduled, or POST /admin/media-janitor/sweep).
     """
     try:
-        from .photo_utils import cleanup_old_temp_files
-        cleanup_old_temp_files()
+        reclaimed = await asyncio.to_thread(media_janitor.clean_temp_files)
         return JSONResponse(content={
             "success": True,
-            "message": "Temporary files cleaned up"
+            "message": f"Temporary files cleaned up ({reclaimed} bytes reclaimed)",
+            "data": {"temp_bytes": reclaimed}
         })
     except Exception as e:
         return JSONResponse(
@@ -0,0 +1,66 @@
+import os
+import re
+from fastapi import HTTPException
+
+from .photo_utils import MAX_FILE_SIZE
+
+# Configuration
+UPLOAD_BODY_OVERHEAD = 64 * 1024  # Multipart boundaries and form fields around the file
+# Whole-request limit for multi-file uploads (matches client_max_body_size in nginx.conf)
+MAX_BATCH_UPLOAD_SIZE = int(os.getenv("MAX_BATCH_UPLOAD_SIZE", str(50 * 1024 * 1024)))
+
+# Request body limits for upload routes: (path pattern, max bytes)
+UPLOAD_BODY_LIMITS = [
+    (re.compile(r"^/api/upload/photo$"), MAX_FILE_SIZE + UPLOAD_BODY_OVERHEAD),
+    (re.compile(r"^/api/upload/(multiple|batch)$"), MAX_BATCH_UPLOAD_SIZE),
+    # Gallery images may arrive as base64 JSON, which is 4/3 the size of the file
+    (re.compile(r"^/api/articles/\d+/images/?$"), MAX_FILE_SIZE * 4 // 3 + UPLOAD_BODY_OVERHEAD),
+]
+
+
+def body_limit_for(path: str):
+    """Max request body size for an upload route, or None for other routes."""
+    for pattern, limit in UPLOAD_BODY_LIMITS:
+        if pattern.match(path):
+            return limit
+    return None
+
+
+class UploadLimitMiddleware:
+    """
+    Reject oversized upload bodies while they stream in.
+    A declared Content-Length over the limit is refused before any body is read;
+    otherwise bytes are counted as they arrive and the request is aborted with
+    413 as soon as the limit is crossed, so a worker never buffers the whole body.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = body_limit_for(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        declared_length = headers.get(b"content-length")
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            if declared_length is not None and declared_length.isdigit() and int(declared_length) > limit:
+                raise HTTPException(status_code=413, detail="Upload too large")
+
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail="Upload too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
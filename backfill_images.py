@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Backfill derived images and metadata (media store display image, responsive
+variants, placeholder, dominant colour) for existing cats, articles and article
+gallery images.
+
+Rows are walked in keyset-paginated batches (id > last id), images are rendered
+in parallel worker processes, and progress is checkpointed after every batch so
+an interrupted run picks up where it stopped.
+
+Handles:
+- rows with inline base64 images (moved into the media store, base64 cleared)
+- rows that only have a local file under static/ (photo_url / featured_image / image_path)
+- media assets stored before variants/placeholders/colours existed (rendered from the stored image)
+
+Usage:
+    python backfill_images.py [--batch-size 100] [--workers 4] [--reset]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.database import SessionLocal, engine
+from app.media_store import media_store
+from app.models.cat import Cat
+from app.models.article import Article, ArticleImage
+from app.models.media import MediaAsset
+from app.photo_utils import (
+    decode_base64_image, describe_media_image, local_image_path, render_media_images, store_rendered_images,
+    store_variants,
+)
+
+CHECKPOINT_FILE = Path(os.getenv("BACKFILL_CHECKPOINT", "backfill_images.checkpoint.json"))
+# Rows fetched from the cursor at a time within a batch (keeps base64 blobs out of memory)
+YIELD_PER = 20
+
+# (model, hash column, base64 column, legacy path column)
+IMAGE_COLUMNS = [
+    (Cat, "photo_hash", "photo_base64", "photo_url"),
+    (Article, "featured_image_hash", "featured_image_base64", "featured_image"),
+    (ArticleImage, "image_hash", "image_base64", "image_path"),
+]
+
+
+def find_work(db, row, hash_field, base64_field, path_field):
+    """
+    Work needed for one row: (kind, source, source_bytes) or None.
+    kind is 'variants' (asset exists without variants), 'describe' (asset exists,
+    placeholder or dominant colour missing) or 'store' (no asset yet).
+    """
+    content_hash = getattr(row, hash_field)
+    if content_hash:
+        asset = db.get(MediaAsset, content_hash)
+        if asset is None or not media_store.exists(asset.hash, asset.ext):
+            return None
+        if not asset.variants:
+            return "variants", media_store.path_for(asset.hash, asset.ext), 0
+        if not (asset.placeholder and asset.dominant_color):
+            return "describe", media_store.path_for(asset.hash, asset.ext), 0
+        return None
+
+    base64_data = getattr(row, base64_field)
+    if base64_data:
+        return "store", decode_base64_image(base64_data), len(base64_data)
+
+    path = local_image_path(getattr(row, path_field))
+    if path is not None:
+        return "store", path, path.stat().st_size
+    return None
+
+
+class Backfill:
+    def __init__(self, batch_size, workers, reset=False):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.checkpoint = {} if reset else self.load_checkpoint()
+        self.images = 0
+        self.failed = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.started_at = time.time()
+
+    @staticmethod
+    def load_checkpoint():
+        if CHECKPOINT_FILE.is_file():
+            checkpoint = json.loads(CHECKPOINT_FILE.read_text())
+            print(f"↩️  Resuming from checkpoint: {checkpoint}")
+            return checkpoint
+        return {}
+
+    def save_checkpoint(self):
+        tmp_path = CHECKPOINT_FILE.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.checkpoint))
+        os.replace(tmp_path, CHECKPOINT_FILE)
+
+    def run(self):
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        db = SessionLocal()
+        try:
+            for model, hash_field, base64_field, path_field in IMAGE_COLUMNS:
+                self.backfill_model(db, executor, model, hash_field, base64_field, path_field)
+        except KeyboardInterrupt:
+            print("\n⏸️  Interrupted - progress up to the last finished batch is saved")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            db.close()
+            self.report()
+        executor.shutdown()
+
+    def backfill_model(self, db, executor, model, hash_field, base64_field, path_field):
+        last_id = self.checkpoint.get(model.__name__, 0)
+        while True:
+            # Keyset pagination: each batch starts after the last id of the previous one,
+            # so pages stay cheap however far into the table the run gets
+            rows = (db.query(model)
+                    .filter(model.id > last_id)
+                    .order_by(model.id)
+                    .limit(self.batch_size)
+                    .yield_per(YIELD_PER))
+
+            jobs = []
+            batch_rows = 0
+            for row in rows:
+                batch_rows += 1
+                last_id = row.id
+                try:
+                    work = find_work(db, row, hash_field, base64_field, path_field)
+                except Exception as e:
+                    print(f"⚠️  Skipped {row!r}: {e}")
+                    self.failed += 1
+                    continue
+                if work is not None:
+                    kind, source, source_bytes = work
+                    render = describe_media_image if kind == "describe" else render_media_images
+                    jobs.append((row, kind, source_bytes, executor.submit(render, source)))
+
+            if batch_rows == 0:
+                break
+
+            for row, kind, source_bytes, future in jobs:
+                self.apply(db, row, kind, source_bytes, future, hash_field, base64_field)
+            db.commit()
+
+            self.checkpoint[model.__name__] = last_id
+            self.save_checkpoint()
+            print(f"📦 {model.__name__} up to id {last_id}: {len(jobs)} images in batch, "
+                  f"{self.images} total, {self.throughput():.1f} images/s")
+
+    def apply(self, db, row, kind, source_bytes, future, hash_field, base64_field):
+        try:
+            rendered = future.result()
+        except Exception as e:
+            print(f"⚠️  Failed {row!r}: {e}")
+            self.failed += 1
+            return
+
+        if kind in ("variants", "describe"):
+            asset = db.get(MediaAsset, getattr(row, hash_field))
+            if kind == "variants":
+                asset.variants = json.dumps(store_variants(rendered["variants"]))
+                asset.optimized_at = datetime.now(timezone.utc)
+            asset.placeholder = asset.placeholder or rendered["placeholder"]
+            asset.dominant_color = asset.dominant_color or rendered["dominant_color"]
+        else:
+            asset = store_rendered_images(rendered, db)
+            setattr(row, hash_field, asset.hash)
+            setattr(row, base64_field, None)
+            self.bytes_before += source_bytes
+            self.bytes_after += asset.byte_size
+        self.images += 1
+
+    def throughput(self):
+        return self.images / max(time.time() - self.started_at, 1e-6)
+
+    def report(self):
+        elapsed = time.time() - self.started_at
+        saved = self.bytes_before - self.bytes_after
+        print(f"✅ Backfilled {self.images} images in {elapsed:.1f}s "
+              f"({self.throughput():.1f} images/s), {self.failed} failed")
+        print(f"💾 Source images {self.bytes_before / 1024:.0f} KB -> display images "
+              f"{self.bytes_after / 1024:.0f} KB (saved {saved / 1024:.0f} KB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch-size", type=int, default=100, help="rows per keyset page (default 100)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="image worker processes (default: CPU count)")
+    parser.add_argument("--reset", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    engine.echo = False  # SQL logging would drown the progress output
+    Backfill(args.batch_size, args.workers, args.reset).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent request throughput with the synchronous session used from
+async routes (every query blocks the event loop) against AsyncSession (queries
+await the driver, other requests run meanwhile).
+
+One pair of routes lists the cats the way GET /api/cats/ does, the other creates
+one the way POST /api/cats/ does, against a throwaway SQLite database. A slow
+database is simulated by a SQL function that sleeps inside the driver for the
+given latency, so the run measures how the server copes with query latency
+rather than how fast SQLite is.
+
+Usage: python benchmark_async_db.py [requests] [concurrency] [latency_ms]
+"""
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+workdir = tempfile.mkdtemp(prefix="async_db_benchmark_")
+os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/benchmark.db"
+os.environ["MEDIA_ROOT"] = f"{workdir}/media"
+
+from datetime import date
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import Base, SessionLocal, async_engine, engine, get_async_db, get_db
+from app.models import Cat
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+    return ms
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def register_latency_function(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep_ms", 1, sleep_ms)
+
+
+app = FastAPI()
+litter_codes = (f"W{i:06}" for i in itertools.count())
+
+
+@app.get("/sync/cats")
+async def list_cats_sync(latency_ms: int, db: Session = Depends(get_db)):
+    """Before: the sync session inside an async route."""
+    db.execute(text("SELECT sleep_ms(:ms)"), {"ms": latency_ms})
+    return len(db.query(Cat).all())
+
+
+@app.get("/async/cats")
+async def list_cats_async(latency_ms: int, db: AsyncSession = Depends(get_async_db)):
+    """After: AsyncSession."""
+    await db.execute(text("SELECT sleep_ms(:ms)"), {"ms": latency_ms})
+    return len((await db.scalars(select(Cat))).all())
+
+
+@app.post("/sync/cats")
+async def create_cat_sync(latency_ms: int, db: Session = Depends(get_db)):
+    """Before: the sync session inside an async route."""
+    db.execute(text("SELECT sleep_ms(:ms)"), {"ms": latency_ms})
+    cat = Cat(name="New cat", gender="Male", litter_code=next(litter_codes), date_of_birth=date(2024, 1, 1))
+    db.add(cat)
+    db.commit()
+    db.refresh(cat)
+    return cat.id
+
+
+@app.post("/async/cats")
+async def create_cat_async(latency_ms: int, db: AsyncSession = Depends(get_async_db)):
+    """After: AsyncSession."""
+    await db.execute(text("SELECT sleep_ms(:ms)"), {"ms": latency_ms})
+    cat = Cat(name="New cat", gender="Male", litter_code=next(litter_codes), date_of_birth=date(2024, 1, 1))
+    db.add(cat)
+    await db.commit()
+    await db.refresh(cat)
+    return cat.id
+
+
+def seed(count=50):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add_all(Cat(name=f"Cat {i}", gender="Female", litter_code=f"B{i:04}",
+                       date_of_birth=date(2024, 1, 1)) for i in range(count))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def measure(method, path, requests, concurrency, latency_ms):
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+    latencies = []
+
+    async def client_loop(client):
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.request(method, path, params={"latency_ms": latency_ms})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    latencies.sort()
+    return requests / wall, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+async def run(requests, concurrency, latency_ms):
+    seed()
+    print(f"{requests} requests, {concurrency} concurrent clients, {latency_ms} ms simulated query latency")
+    for method in ("GET", "POST"):
+        print(f"{method} /cats")
+        results = {}
+        for label, path in (("sync session", "/sync/cats"), ("AsyncSession", "/async/cats")):
+            await measure(method, path, concurrency, concurrency, latency_ms)  # warm up the pools
+            throughput, p50, p95 = await measure(method, path, requests, concurrency, latency_ms)
+            results[label] = throughput
+            print(f"  {label:13} {throughput:8.1f} req/s   p50 {p50 * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+        print(f"  speedup: {results['AsyncSession'] / results['sync session']:.1f}x")
+    await async_engine.dispose()
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    latency_ms = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    engine.echo = async_engine.echo = False
+    asyncio.run(run(requests, concurrency, latency_ms))
+
+
+if __name__ == "__main__":
+    main()
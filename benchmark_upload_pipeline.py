@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the upload pipeline: the old path that decoded each upload once per
+output (media store images, base64 data URL, temp file + full/thumbnail) against
+the decode-once render_upload stage.
+
+Usage: python benchmark_upload_pipeline.py [runs] [width] [height]
+"""
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageOps
+
+from app.photo_utils import (
+    FULL_SIZE, flatten_to_rgb, resize_image, render_media, encode_data_url,
+    write_full_and_thumbnail, render_upload,
+)
+
+
+def make_sample_jpeg(width, height):
+    """A photo-sized JPEG with enough detail that encoders do real work."""
+    img = Image.new("RGB", (width, height))
+    draw = ImageDraw.Draw(img)
+    for i in range(0, width, 16):
+        draw.line([(i, 0), (width - i, height)], fill=(i % 256, (i * 3) % 256, (i * 7) % 256), width=9)
+    buffer = BytesIO()
+    img.save(buffer, "JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def decode(file_content):
+    with Image.open(BytesIO(file_content)) as img:
+        img = ImageOps.exif_transpose(img)
+        return flatten_to_rgb(img)
+
+
+def old_pipeline(file_content, base_name, target_dir):
+    """One decode per output, plus a temp file round-trip for the full/thumbnail files."""
+    render_media(resize_image(decode(file_content), FULL_SIZE))
+    encode_data_url(decode(file_content))
+    temp_path = target_dir / f"{base_name}_original.jpg"
+    temp_path.write_bytes(file_content)
+    with open(temp_path, "rb") as f:
+        paths = write_full_and_thumbnail(resize_image(decode(f.read()), FULL_SIZE), base_name, target_dir)
+    temp_path.unlink()
+    return paths
+
+
+def new_pipeline(file_content, base_name, target_dir):
+    rendered = render_upload(file_content, base_name, target_dir, legacy_base64=True)
+    return rendered["full_path"], rendered["thumb_path"]
+
+
+def measure(pipeline, file_content, runs, target_dir):
+    wall = cpu = 0.0
+    for i in range(runs):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        paths = pipeline(file_content, f"bench_{pipeline.__name__}_{i}", target_dir)
+        wall += time.perf_counter() - wall_start
+        cpu += time.process_time() - cpu_start
+        for path in paths:
+            Path(path).unlink(missing_ok=True)
+    return wall / runs * 1000, cpu / runs * 1000
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    height = int(sys.argv[3]) if len(sys.argv) > 3 else 3000
+
+    file_content = make_sample_jpeg(width, height)
+    print(f"📷 Sample upload: {width}x{height} JPEG, {len(file_content) // 1024} KB, {runs} runs each")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target_dir = Path(tmp)
+        old_wall, old_cpu = measure(old_pipeline, file_content, runs, target_dir)
+        new_wall, new_cpu = measure(new_pipeline, file_content, runs, target_dir)
+
+    print(f"{'pipeline':<12}{'wall ms':>12}{'cpu ms':>12}")
+    print(f"{'old':<12}{old_wall:>12.1f}{old_cpu:>12.1f}")
+    print(f"{'decode-once':<12}{new_wall:>12.1f}{new_cpu:>12.1f}")
+    print(f"✅ Saved per upload: {old_wall - new_wall:.1f} ms wall, {old_cpu - new_cpu:.1f} ms CPU "
+          f"({(1 - new_cpu / old_cpu) * 100:.0f}% less CPU)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Move base64 images stored in the database into the content-addressed media store.
+Each row keeps only the media hash afterwards, so list queries stop pulling image blobs.
+Safe to run more than once: rows that already have a hash are skipped.
+"""
+from app.database import SessionLocal
+from app.models.cat import Cat
+from app.models.article import Article, ArticleImage
+from app.photo_utils import decode_base64_image, store_image_bytes
+
+# (model, base64 column, hash column)
+IMAGE_COLUMNS = [
+    (Cat, "photo_base64", "photo_hash"),
+    (Article, "featured_image_base64", "featured_image_hash"),
+    (ArticleImage, "image_base64", "image_hash"),
+]
+
+
+def migrate_model(db, model, base64_field, hash_field):
+    base64_column = getattr(model, base64_field)
+    hash_column = getattr(model, hash_field)
+    rows = db.query(model).filter(
+        base64_column.isnot(None), base64_column != "", hash_column.is_(None)).all()
+
+    migrated = 0
+    for row in rows:
+        try:
+            asset = store_image_bytes(decode_base64_image(getattr(row, base64_field)), db)
+        except Exception as e:
+            print(f"⚠️  Skipped {row!r}: {e}")
+            continue
+        setattr(row, hash_field, asset.hash)
+        setattr(row, base64_field, None)
+        db.commit()
+        migrated += 1
+
+    print(f"✅ {model.__name__}: moved {migrated} of {len(rows)} images to the media store")
+
+
+def migrate_all():
+    db = SessionLocal()
+    try:
+        for model, base64_field, hash_field in IMAGE_COLUMNS:
+            migrate_model(db, model, base64_field, hash_field)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate_all()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Report clusters of duplicate images across cats, article featured images and
+article gallery images.
+
+Images are grouped when they share a stored media asset or when they are near
+duplicates (photo_utils.near_duplicate: perceptual hashes within PHASH_MAX_DISTANCE
+bits, the same size and dominant colour - the same photo re-saved).
+Stored assets that predate fingerprinting are fingerprinted on the way, so later
+uploads of the same photo are deduplicated too.
+"""
+from app.database import SessionLocal, engine
+from app.media_store import media_store
+from app.models.cat import Cat
+from app.models.article import Article, ArticleImage
+from app.models.media import MediaAsset, ImageFingerprint
+from app.photo_utils import (
+    decode_base64_image, fingerprint_signature, image_signature, near_duplicate,
+    phash_bands, record_fingerprint,
+)
+
+# (model, hash column, base64 column, label)
+IMAGE_COLUMNS = [
+    (Cat, "photo_hash", "photo_base64", lambda cat: f"cat #{cat.id} {cat.name}"),
+    (Article, "featured_image_hash", "featured_image_base64",
+     lambda article: f"article #{article.id} \"{article.title}\" (featured)"),
+    (ArticleImage, "image_hash", "image_base64",
+     lambda image: f"article #{image.article_id} gallery image #{image.id}"),
+]
+
+
+def asset_signature(db, asset_hash, cache):
+    """image_signature of a stored asset, fingerprinting it first if it has no fingerprint yet."""
+    if asset_hash in cache:
+        return cache[asset_hash]
+
+    fingerprint = db.query(ImageFingerprint).filter(
+        ImageFingerprint.asset_hash == asset_hash).first()
+    signature = None
+    if fingerprint is not None and fingerprint.width is not None:
+        signature = fingerprint_signature(fingerprint)
+    else:
+        asset = db.get(MediaAsset, asset_hash)
+        if asset is not None and media_store.exists(asset.hash, asset.ext):
+            signature = image_signature(media_store.path_for(asset.hash, asset.ext))
+            if fingerprint is None:
+                # The stored bytes stand in for the (unknown) original upload
+                record_fingerprint(db, asset.hash, asset.hash, signature)
+    cache[asset_hash] = signature
+    return signature
+
+
+def collect_images(db):
+    """One entry per image-bearing row: label, asset hash (or None), signature, bytes."""
+    images = []
+    signature_cache = {}
+    for model, hash_field, base64_field, label in IMAGE_COLUMNS:
+        for row in db.query(model).order_by(model.id).yield_per(50):
+            asset_hash = getattr(row, hash_field)
+            base64_data = getattr(row, base64_field)
+            if asset_hash:
+                asset = db.get(MediaAsset, asset_hash)
+                signature = asset_signature(db, asset_hash, signature_cache)
+                size = asset.byte_size if asset else 0
+            elif base64_data:
+                try:
+                    signature = image_signature(decode_base64_image(base64_data))
+                except Exception as e:
+                    print(f"⚠️  Skipped {label(row)}: {e}")
+                    continue
+                size = len(base64_data)
+            else:
+                continue
+            images.append({"label": label(row), "asset_hash": asset_hash, "signature": signature, "bytes": size})
+    db.commit()
+    return images
+
+
+def find_clusters(images):
+    """Group images sharing an asset or near duplicates of each other (union-find)."""
+    parent = list(range(len(images)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a, b):
+        parent[find(a)] = find(b)
+
+    by_asset = {}
+    by_band = {}
+    for i, image in enumerate(images):
+        if image["asset_hash"]:
+            if image["asset_hash"] in by_asset:
+                union(i, by_asset[image["asset_hash"]])
+            by_asset[image["asset_hash"]] = i
+        signature = image["signature"]
+        if signature:
+            # Near-duplicates always share a band, so only compare within buckets
+            for band_index, band in enumerate(phash_bands(signature["phash"])):
+                for j in by_band.get((band_index, band), []):
+                    if near_duplicate(signature, images[j]["signature"]):
+                        union(i, j)
+                by_band.setdefault((band_index, band), []).append(i)
+
+    clusters = {}
+    for i in range(len(images)):
+        clusters.setdefault(find(i), []).append(images[i])
+    return sorted((c for c in clusters.values() if len(c) > 1), key=len, reverse=True)
+
+
+def report():
+    db = SessionLocal()
+    try:
+        images = collect_images(db)
+    finally:
+        db.close()
+
+    clusters = find_clusters(images)
+    total_reclaimable = 0
+    for number, cluster in enumerate(clusters, 1):
+        # Distinct stored copies: one per asset, one per inline base64 image
+        copies = {}
+        for image in cluster:
+            key = image["asset_hash"] or id(image)
+            copies[key] = image["bytes"]
+        reclaimable = sum(copies.values()) - max(copies.values())
+        total_reclaimable += reclaimable
+
+        print(f"🔁 Cluster {number}: {len(cluster)} images, {len(copies)} stored copies, "
+              f"{reclaimable / 1024:.0f} KB reclaimable")
+        for image in cluster:
+            stored = f"asset {image['asset_hash'][:12]}" if image["asset_hash"] else "inline base64"
+            print(f"   - {image['label']} ({stored}, {image['bytes'] / 1024:.0f} KB, phash {(image['signature'] or {}).get('phash')})")
+
+    print(f"✅ {len(images)} images checked, {len(clusters)} duplicate clusters, "
+          f"{total_reclaimable / 1024:.0f} KB reclaimable")
+
+
+if __name__ == "__main__":
+    engine.echo = False  # SQL logging would drown the report
+    report()
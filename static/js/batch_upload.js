@@ -0,0 +1,100 @@
+// Batch photo upload for the admin pages.
+// Posts files to /api/upload/batch and hands each result to onResult as the
+// server streams it back (one JSON object per line), so progress shows while
+// the rest of the batch is still processing.
+
+const BATCH_UPLOAD_MAX_BYTES = 45 * 1024 * 1024; // Stay under the server's 50MB request limit
+
+function splitIntoBatches(files) {
+    const batches = [];
+    let current = { offset: 0, files: [], bytes: 0 };
+    files.forEach((file, index) => {
+        if (current.files.length > 0 && current.bytes + file.size > BATCH_UPLOAD_MAX_BYTES) {
+            batches.push(current);
+            current = { offset: index, files: [], bytes: 0 };
+        }
+        current.files.push(file);
+        current.bytes += file.size;
+    });
+    if (current.files.length > 0) {
+        batches.push(current);
+    }
+    return batches;
+}
+
+async function uploadPhotoBatch(files, fields, onResult) {
+    files = Array.from(files);
+
+    for (const batch of splitIntoBatches(files)) {
+        const formData = new FormData();
+        batch.files.forEach(file => formData.append('files', file));
+        Object.entries(fields || {}).forEach(([name, value]) => formData.append(name, value));
+
+        let response;
+        try {
+            response = await fetch('/api/upload/batch', { method: 'POST', body: formData });
+        } catch (error) {
+            response = { ok: false, status: error.message };
+        }
+        if (!response.ok) {
+            for (let i = 0; i < batch.files.length; i++) {
+                await onResult({
+                    index: batch.offset + i,
+                    filename: batch.files[i].name,
+                    success: false,
+                    message: `Upload failed (${response.status})`
+                });
+            }
+            continue;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffered += decoder.decode(value, { stream: true });
+
+            let newline;
+            while ((newline = buffered.indexOf('\n')) >= 0) {
+                const line = buffered.slice(0, newline).trim();
+                buffered = buffered.slice(newline + 1);
+                if (!line) continue;
+
+                const result = JSON.parse(line);
+                if (result.done) continue; // Summary line
+                result.index += batch.offset;
+                await onResult(result);
+            }
+        }
+    }
+}
+
+// Render a progress bar into containerId; returns a function to call with each result
+function showBatchProgress(containerId, total) {
+    const container = document.getElementById(containerId);
+    container.innerHTML = `
+        <div class="progress mb-1">
+            <div class="progress-bar progress-bar-striped progress-bar-animated" role="progressbar" style="width: 0%"></div>
+        </div>
+        <small class="text-muted">Processing ${total} photos...</small>
+    `;
+    container.style.display = 'block';
+
+    const bar = container.querySelector('.progress-bar');
+    const label = container.querySelector('small');
+    let processed = 0;
+    let failed = 0;
+
+    return function(result) {
+        processed++;
+        if (!result.success) failed++;
+        bar.style.width = `${Math.round(processed / total * 100)}%`;
+        label.textContent = `${processed} of ${total} processed` + (failed ? `, ${failed} failed` : '');
+        if (processed === total) {
+            bar.classList.remove('progress-bar-animated', 'progress-bar-striped');
+            bar.classList.add(failed ? 'bg-warning' : 'bg-success');
+        }
+    };
+}
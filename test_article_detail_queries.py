@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+The article page (/article/{id}) must cost a fixed number of SQL statements,
+however many gallery images the article has, and must only read.
+
+Runs in-process against a throwaway SQLite database:
+    python test_article_detail_queries.py
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from test_support import check, finish, setup_env
+
+app = setup_env("article_queries_")
+
+from app.database import SessionLocal, async_engine
+from app.models import Article, MediaAsset
+from app.models.article import ArticleImage
+
+# Resource versions, article + featured image asset, gallery + image assets, related articles
+EXPECTED_STATEMENTS = 4
+
+
+def create_article(title, image_count):
+    db = SessionLocal()
+    try:
+        asset = MediaAsset(hash=f"{title:0<64}"[:64], ext="jpg", content_type="image/jpeg",
+                           byte_size=1000, width=800, height=600)
+        db.merge(asset)
+        article = Article(title=title, content="Lorem ipsum " * 50, published=True,
+                          featured_image_hash=asset.hash)
+        article.images = [ArticleImage(image_path=f"{title}_{i}.jpg", image_hash=asset.hash if i % 2 else None,
+                                       image_base64="aGVsbG8=" if i % 2 == 0 else None, display_order=i)
+                          for i in range(image_count)]
+        db.add(article)
+        db.commit()
+        return article.id
+    finally:
+        db.close()
+
+
+def main():
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    with TestClient(app) as client:
+        for image_count in (0, 1, 5, 20):
+            article_id = create_article(f"gallery{image_count}", image_count)
+            statements.clear()
+            response = client.get(f"/article/{article_id}")
+            writes = [s for s in statements if not s.lstrip().upper().startswith("SELECT")]
+
+            ok = (response.status_code == 200 and len(statements) == EXPECTED_STATEMENTS and not writes
+                  and response.text.count("/img/article-image/") == image_count)
+            if not check(f"{image_count:2} images: status {response.status_code}, "
+                         f"{len(statements)} statements (expected {EXPECTED_STATEMENTS}), {len(writes)} writes", ok):
+                for statement in statements:
+                    print(f"  {' '.join(statement.split())[:150]}")
+
+    finish(f"Article page costs {EXPECTED_STATEMENTS} statements at any gallery size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+/api/articles/search must find articles by title and content (stemmed), page
+through every match exactly once, return escaped snippets, follow edits and
+deletes, and never read the content of rows it doesn't return.
+
+Runs in-process against a throwaway SQLite database (FTS5):
+    python test_article_search.py
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from test_support import check, finish, setup_env
+
+app = setup_env("article_search_")
+
+from app.database import async_engine
+
+LITTERS = 23
+
+
+def search(client, **params):
+    response = client.get("/api/articles/search", params=params)
+    return response, (response.json() if response.status_code == 200 else None)
+
+
+def main():
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    with TestClient(app) as client:
+        def create(title, content, published=True):
+            return client.post("/api/articles/", json={"title": title, "content": content,
+                                                        "published": published}).json()["id"]
+
+        arrivals = create("Kittens have arrived", "Five healthy babies <b>& their mother</b>.")
+        create("Vet visit", "Everyone got their shots, the kitten too.")
+        draft = create("Draft: kitten diet", "Not published yet.", published=False)
+        create("Show results", "Our queen won best in show.")
+        for i in range(LITTERS):
+            create(f"Litter {i}", f"Litter {i} has a kitten with blue eyes. " + "More news. " * 50)
+
+        response, results = search(client, q="kitten", limit=5)
+        check("title matches rank first, snippets are HTML", response.status_code == 200
+              and results[0]["id"] in (arrivals, draft) and "<mark>" in "".join(r["snippet"] or "" for r in results))
+        response, results = search(client, q="babies mother")
+        check("snippet is escaped", results and "&lt;b&gt;" in results[0]["snippet"]
+              and "<mark>babies</mark>" in results[0]["snippet"])
+
+        seen, cursor, pages = [], None, 0
+        statements.clear()
+        while True:
+            params = {"q": "kittens", "published": "true", "limit": 4}
+            if cursor:
+                params["cursor"] = cursor
+            response, results = search(client, **params)
+            seen += [r["id"] for r in results]
+            pages += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        check(f"{len(seen)} published matches over {pages} pages, none repeated, draft left out",
+              len(seen) == LITTERS + 2 and len(set(seen)) == len(seen) and draft not in seen)
+        content_reads = [s for s in statements if "articles.content" in s]
+        check("content never selected (only the snippet)", not content_reads)
+
+        client.put(f"/api/articles/{arrivals}", json={"title": "Kittens have arrived",
+                                                      "content": "Zebra-striped tabbies.", "published": True})
+        _, results = search(client, q="zebra")
+        check("edits are searchable", [r["id"] for r in results] == [arrivals])
+        client.delete(f"/api/articles/{arrivals}")
+        _, results = search(client, q="zebra")
+        check("deleted articles are gone", results == [])
+
+        check("query without words is rejected", search(client, q="?!")[0].status_code == 400)
+        check("operators are plain words", search(client, q='kitten" OR "x')[0].status_code == 200)
+        check("bad cursor is rejected", search(client, q="kitten", cursor="nope")[0].status_code == 400)
+
+    finish("Article search works")
+
+
+if __name__ == "__main__":
+    main()
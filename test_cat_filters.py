@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+/api/cats/ must filter (availability, gender, birth date range, name / litter
+code prefix) and sort in SQL, page through every sort exactly once with
+cursors - including rows created within the same second - and reject
+unknown values. The /cats page must render only the matching cats.
+
+Runs in-process against a throwaway SQLite database:
+    python test_cat_filters.py
+"""
+from fastapi.testclient import TestClient
+
+from test_support import check, finish, setup_env
+
+app = setup_env("cat_filters_")
+
+NAMES = ["Luna", "Leo", "Lily", "Max", "Mia", "Oscar", "Olive", "Bella", "bear", "Ziggy_"]
+CATS = 30
+
+
+def cats(client, **params):
+    response = client.get("/api/cats/", params=params)
+    return response, (response.json() if response.status_code == 200 else None)
+
+
+def all_pages(client, **params):
+    seen, cursor = [], None
+    while True:
+        page_params = dict(params, limit=7)
+        if cursor:
+            page_params["cursor"] = cursor
+        response, results = cats(client, **page_params)
+        seen += results
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+
+
+def main():
+    with TestClient(app) as client:
+        for i in range(CATS):
+            client.post("/api/cats/", json={
+                "name": NAMES[i % len(NAMES)], "gender": ("Male", "Female")[i % 2],
+                "litter_code": f"{'AB' if i < 15 else 'C_'}-{i:03}",
+                "date_of_birth": f"2024-{1 + i % 12:02}-{1 + i % 28:02}", "is_available": i % 3 != 0})
+
+        _, results = cats(client, available="true", fields="is_available")
+        check("available", len(results) == 20 and all(r["is_available"] for r in results))
+        _, results = cats(client, gender="female", fields="gender")
+        check("gender, any case", len(results) == 15 and {r["gender"] for r in results} == {"Female"})
+        _, results = cats(client, born_after="2024-03-01", born_before="2024-04-04", fields="date_of_birth")
+        check("birth date range is inclusive",
+              sorted(r["date_of_birth"] for r in results) == ["2024-03-03", "2024-03-15", "2024-03-27", "2024-04-04"])
+        _, results = cats(client, q="b", fields="name")
+        check("name prefix ignores case", {r["name"] for r in results} == {"Bella", "bear"})
+        _, results = cats(client, q="ab-01", fields="litter_code")
+        check("litter code prefix", sorted(r["litter_code"] for r in results) == ["AB-010", "AB-011", "AB-012",
+                                                                                   "AB-013", "AB-014"])
+        check("% and _ are literal", len(cats(client, q="c_")[1]) == 15 and cats(client, q="c%")[1] == []
+              and {r["name"] for r in cats(client, q="ziggy_", fields="name")[1]} == {"Ziggy_"})
+
+        # Cats created in one request burst share created_at seconds: ties must page by id
+        for sort in ("-created_at", "created_at", "name", "-name", "date_of_birth", "-date_of_birth", "litter_code"):
+            key = sort.lstrip("-")
+            seen = all_pages(client, sort=sort, available="true", fields=key)
+            keys = [(row.get(key), row["id"]) for row in seen]
+            check(f"sort={sort} pages through every match once, in order",
+                  len(seen) == 20 and len({row["id"] for row in seen}) == 20
+                  and (key == "created_at" or keys == sorted(keys, reverse=sort.startswith("-"))))
+
+        check("unknown sort is rejected", cats(client, sort="weight")[0].status_code == 400)
+        check("unknown gender is rejected", cats(client, gender="x")[0].status_code == 400)
+        check("empty gender means any", len(cats(client, gender="")[1]) == CATS)
+        check("bad cursor is rejected", cats(client, sort="name", cursor="nope")[0].status_code == 400)
+
+        page = client.get("/cats", params={"available": "true", "gender": "", "sort": "litter_code", "q": ""})
+        check("/cats renders only the matches", page.status_code == 200 and page.text.count("cat-card cursor") == 20)
+        check("/cats says when nothing matches", "No Kittens Match" in client.get("/cats", params={"q": "zzz"}).text)
+
+    finish("Cat filters work")
+
+
+if __name__ == "__main__":
+    main()
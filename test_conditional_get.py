@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Conditional GETs: the read APIs and pages answer a current If-None-Match or
+If-Modified-Since with a bodyless 304 (from the endpoint and from the response
+cache), a write makes them send the new representation, and a copy from
+before a release is never answered with a 304 - Last-Modified is at least the
+release time (RELEASE_TIME, here an hour after the data was written, as if
+the release had been deployed then).
+
+Runs in-process against a throwaway SQLite database:
+    python test_conditional_get.py
+"""
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi.testclient import TestClient
+
+from test_support import check, finish, setup_env
+
+release = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=1)
+app = setup_env("conditional_get_", RELEASE_TIME=release.isoformat())
+
+from app.response_cache import response_cache
+
+
+def main():
+    with TestClient(app) as client:
+        client.post("/api/cats/", json={"name": "Luna", "gender": "Female", "litter_code": "A-1",
+                                        "date_of_birth": "2024-01-01"})
+        before_release = format_datetime(datetime.now(timezone.utc), usegmt=True)
+
+        for path in ("/api/cats/", "/cats"):
+            first = client.get(path)
+            etag, last_modified = first.headers.get("etag"), first.headers.get("last-modified")
+            check(f"{path} sends validators", first.status_code == 200 and etag and last_modified)
+            check(f"{path} Last-Modified is the release time",
+                  parsedate_to_datetime(last_modified) == release)
+
+            for source, cached in (("endpoint", False), ("response cache", True)):
+                if cached:
+                    client.get(path)
+                else:
+                    response_cache.clear()
+                by_etag = client.get(path, headers={"If-None-Match": etag})
+                by_date = client.get(path, headers={"If-Modified-Since": last_modified})
+                check(f"{path} current copy is a 304 from the {source}",
+                      by_etag.status_code == 304 and by_date.status_code == 304
+                      and by_etag.content == b"" and by_etag.headers.get("etag") == etag
+                      and (by_etag.headers.get("x-cache") == "HIT") == cached)
+
+            stale = client.get(path, headers={"If-Modified-Since": before_release})
+            check(f"{path} copy from before the release is sent again", stale.status_code == 200)
+
+        etag = client.get("/api/cats/").headers["etag"]
+        client.post("/api/cats/", json={"name": "Leo", "gender": "Male", "litter_code": "A-2",
+                                        "date_of_birth": "2024-01-01"})
+        changed = client.get("/api/cats/", headers={"If-None-Match": etag})
+        check("a write changes the ETag", changed.status_code == 200 and len(changed.json()) == 2
+              and changed.headers["etag"] != etag)
+
+    finish("Conditional GETs answer 304 only for current copies")
+
+
+if __name__ == "__main__":
+    main()
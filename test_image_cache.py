@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+The resize cache (DiskLRUCache) must evict least recently used files first,
+keep the directory within its byte budget, create a file once for concurrent
+misses, and share its directory between worker processes: a file another
+worker wrote is a hit, and a file another worker evicted is created again.
+
+Runs against a throwaway directory (two caches on one directory stand in for
+two worker processes):
+    python test_image_cache.py
+"""
+import asyncio
+import os
+import tempfile
+
+from app.image_cache import DiskLRUCache
+from test_support import check, finish
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="image_cache_")
+    created = []
+
+    def maker(name, size=100):
+        async def create():
+            created.append(name)
+            await asyncio.sleep(0.05)
+            return name.encode().ljust(size, b".")
+        return create
+
+    def on_disk():
+        return sorted(name for name in os.listdir(root) if not name.startswith("."))
+
+    async def scenario():
+        cache = DiskLRUCache(root, 250)
+        data = await cache.get_or_create("a", maker("a"))
+        await cache.get_or_create("b", maker("b"))
+        check("a miss stores the created bytes", data.startswith(b"a") and len(data) == 100)
+        check("a hit returns them without creating", (await cache.get_or_create("a", maker("a"))) == data
+                                                       and created == ["a", "b"])
+        await cache.get_or_create("c", maker("c"))
+        check("the least recently used file is evicted first", on_disk() == ["a", "c"])
+        check("the directory stays within the budget",
+              cache.stats()["bytes"] == 200 and cache.stats()["evictions"] == 1)
+
+        created.clear()
+        results = await asyncio.gather(*[cache.get_or_create("d", maker("d")) for _ in range(5)])
+        check("concurrent misses create the file once",
+              created == ["d"] and len(set(results)) == 1 and cache.stats()["coalesced"] == 4)
+
+        # Another worker process on the same directory
+        other = DiskLRUCache(root, 250)
+        created.clear()
+        await other.get_or_create("e", maker("e"))
+        check("a file written by another worker is a hit",
+              (await cache.get_or_create("e", maker("e"))).startswith(b"e") and created == ["e"])
+        check("the budget covers both workers' files", sum(os.path.getsize(os.path.join(root, name))
+                                                          for name in on_disk()) <= 250)
+
+        evicted = next(name for name in ("a", "c", "d") if name not in on_disk())
+        created.clear()
+        await cache.get_or_create(evicted, maker(evicted))
+        check("a file another worker evicted is created again", created == [evicted])
+
+    asyncio.run(scenario())
+
+    finish("Resize cache evicts, stays in budget and coalesces misses")
+
+
+if __name__ == "__main__":
+    main()
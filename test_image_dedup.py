@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Uploads must only reuse a stored image when they are the same picture: exact
+re-uploads and re-encoded copies of a photo are deduplicated, while different
+solid-colour images (whose perceptual hashes are all zero) and a recoloured
+copy of a photo are stored on their own.
+
+Runs in-process against a throwaway SQLite database and media store:
+    python test_image_dedup.py
+"""
+import os
+from io import BytesIO
+
+from fastapi.testclient import TestClient
+from PIL import Image, ImageDraw
+
+from test_support import check, finish, setup_env
+
+app = setup_env("image_dedup_")
+
+
+def solid(color, fmt, size=(120, 90)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def photo(fmt="JPEG", quality=90, tint=(0, 0, 0)):
+    """A textured image: diagonal stripes and circles, optionally colour-shifted."""
+    img = Image.new("RGB", (320, 240), (200 - tint[0], 170 - tint[1], 120 - tint[2]))
+    draw = ImageDraw.Draw(img)
+    for x in range(-240, 320, 24):
+        draw.line([(x, 0), (x + 240, 240)], fill=(60, 40 + tint[1], 30 + tint[2]), width=9)
+    for i in range(6):
+        draw.ellipse([20 + i * 48, 60 + (i % 3) * 40, 60 + i * 48, 100 + (i % 3) * 40], fill=(250, 240, 230))
+    buffer = BytesIO()
+    img.save(buffer, fmt, quality=quality)
+    return buffer.getvalue()
+
+
+# Legacy full/thumbnail files are written under static/: removed once the app has stopped
+legacy_files = []
+
+
+def upload(client, name, data):
+    response = client.post("/api/upload/photo", files={"file": (name, data, "application/octet-stream")})
+    result = response.json()["data"]
+    legacy_files.extend(os.path.join("static", path) for path in (result["full_image"], result["thumbnail"]) if path)
+    return result
+
+
+def main():
+    with TestClient(app) as client:
+        red = upload(client, "red.png", solid((220, 20, 20), "PNG"))
+        blue = upload(client, "blue.jpg", solid((20, 20, 220), "JPEG"))
+        green = upload(client, "green.webp", solid((20, 200, 20), "WEBP"))
+        check("solid colours are stored separately",
+              not blue["reused"] and not green["reused"]
+              and len({red["media_hash"], blue["media_hash"], green["media_hash"]}) == 3)
+        small_red = upload(client, "small-red.png", solid((220, 20, 20), "PNG", size=(60, 45)))
+        check("flat images never near-match, even in the same colour", not small_red["reused"])
+        again = upload(client, "red-again.png", solid((220, 20, 20), "PNG"))
+        check("exact re-upload is reused", again["reused"] and again["media_hash"] == red["media_hash"])
+
+        original = upload(client, "kitten.jpg", photo())
+        resaved = upload(client, "kitten-resaved.jpg", photo(quality=60))
+        check("re-encoded photo is reused", resaved["reused"] and resaved["media_hash"] == original["media_hash"])
+        recoloured = upload(client, "kitten-blue.jpg", photo(tint=(150, 20, -100)))
+        check("recoloured photo is stored on its own",
+              not recoloured["reused"] and recoloured["media_hash"] != original["media_hash"])
+
+    for path in legacy_files:
+        if os.path.exists(path):
+            os.remove(path)
+    finish("Image dedup only reuses the same picture")
+
+
+if __name__ == "__main__":
+    main()
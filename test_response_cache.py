@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+RedisResponseCache must share entries between workers, evict a write's tables
+on every worker (the invalidation broadcast), and keep serving - uncached - when
+Redis is down, at startup too, catching up on missed invalidations once it is
+back. The middleware must only look up routes that cache their responses.
+
+Runs in-process against fakeredis (two caches on one fake server stand in for
+two worker processes):
+    python test_response_cache.py
+"""
+import asyncio
+import time
+
+import fakeredis
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from test_support import check, finish, setup_env
+
+setup_env("response_cache_")
+
+from app.api.conditional import CACHE_RESOURCES_STATE
+from app.response_cache import CachedResponse, MemoryResponseCache, RedisResponseCache, ResponseCacheMiddleware
+
+
+def worker(server, prefix="test"):
+    return RedisResponseCache(fakeredis.FakeRedis(server=server), 60, MemoryResponseCache(60, 1024 * 1024),
+                              prefix=prefix, retry_seconds=0.1)
+
+
+def response(body, *resources):
+    return CachedResponse(200, [(b"content-type", b"application/json")], body, resources,
+                          time.monotonic() + 60)
+
+
+def eventually(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def lookup(cache, key):
+    return asyncio.run(cache.lookup(key))
+
+
+def main():
+    server = fakeredis.FakeServer()
+    redis = fakeredis.FakeRedis(server=server)
+    a, b = worker(server), worker(server)
+    a.start()
+    b.start()
+    check("both workers subscribe", eventually(lambda: a.subscribed and b.subscribed))
+
+    a.put("/api/cats/?", response(b"[1]", "cats"), a.generation)
+    a.put("/api/articles/?", response(b"[2]", "articles"), a.generation)
+    check("put reaches Redis", eventually(lambda: redis.exists("test:entry:/api/cats/?")))
+    entry = lookup(b, "/api/cats/?")
+    check("another worker gets it", entry is not None and entry.body == b"[1]" and entry.resources == ("cats",))
+    check("and keeps it in its near cache", b.near_cache.get("/api/cats/?") is not None)
+
+    a.invalidate(["cats"])
+    check("invalidate deletes the shared entry",
+          eventually(lambda: not redis.exists("test:entry:/api/cats/?", "test:tag:cats")))
+    check("the broadcast empties the other worker's near cache",
+          eventually(lambda: b.near_cache.get("/api/cats/?") is None) and b.remote_invalidations == 1)
+    check("other tables are kept", lookup(b, "/api/articles/?") is not None)
+
+    stale = a.generation
+    a.invalidate(["articles"])
+    a.put("/api/articles/?", response(b"[old]", "articles"), stale)
+    check("a response rendered before a write is not stored",
+          eventually(lambda: not redis.exists("test:tag:articles")) and lookup(b, "/api/articles/?") is None)
+
+    a.stop()
+    b.stop()
+
+    # Redis down from the start
+    server.connected = False
+    down = worker(server)
+    started = time.monotonic()
+    down.start()
+    check("startup does not wait for or fail on Redis", time.monotonic() - started < 0.5)
+    check("lookups miss", lookup(down, "/api/cats/?") is None and not down.available)
+    down.put("/api/cats/?", response(b"[3]", "cats"), down.generation)
+    check("near cache still serves", lookup(down, "/api/cats/?").body == b"[3]")
+
+    # A stale shared entry written before the outage, then a write during it
+    server.connected = True
+    redis.set("test:entry:/api/articles/?", response(b"[stale]", "articles").dumps(), px=60000)
+    redis.sadd("test:tag:articles", "/api/articles/?")
+    server.connected = False
+    down.invalidate(["articles"])
+    check("no lookups while down", lookup(down, "/api/articles/?") is None)
+
+    server.connected = True
+    check("reconnects in the background", eventually(lambda: down.available and down.subscribed))
+    check("invalidations missed while down are applied",
+          eventually(lambda: not redis.exists("test:entry:/api/articles/?"))
+          and lookup(down, "/api/articles/?") is None)
+    down.stop()
+
+    # Middleware: only routes that have cached a response are looked up
+    cache = worker(server, prefix="app")
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+
+    @app.get("/tagged")
+    async def tagged(request: Request):
+        setattr(request.state, CACHE_RESOURCES_STATE, ("cats",))
+        return {"rendered": time.monotonic()}
+
+    @app.get("/plain")
+    async def plain():
+        return {"rendered": time.monotonic()}
+
+    redis.set("app:entry:/plain?", response(b'{"cached": true}', "cats").dumps(), px=60000)
+    with TestClient(app) as client:
+        check("routes that never cached are not looked up", "x-cache" not in client.get("/plain").headers)
+        first = client.get("/tagged")
+        check("cacheable routes are looked up",
+              eventually(lambda: redis.exists("app:entry:/tagged?"))
+              and client.get("/tagged").headers.get("x-cache") == "HIT"
+              and client.get("/tagged").json() == first.json())
+    cache.stop()
+
+    finish("Response cache works across workers and without Redis")
+
+
+if __name__ == "__main__":
+    main()
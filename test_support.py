@@ -0,0 +1,51 @@
+"""
+Shared setup for the in-process test scripts (python test_*.py):
+
+    from test_support import setup_env, check, finish
+
+    app = setup_env("cat_filters_")
+    ...
+    check("filters by gender", ok)
+    finish("Cat filters work")
+"""
+import os
+import sys
+import tempfile
+
+checks = []
+
+
+def setup_env(prefix: str, **environ):
+    """
+    Point the app at a throwaway SQLite database and media store (plus any extra
+    environment variables), silence SQL echo, and import the app. Call it before
+    importing anything else from app/: settings are read at import time.
+    Returns the FastAPI app.
+    """
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/test.db"
+    os.environ["MEDIA_ROOT"] = f"{workdir}/media"
+    os.environ.setdefault("SECRET_KEY", "test")
+    os.environ.update(environ)
+
+    from app.database import engine, async_engine
+
+    engine.echo = async_engine.echo = False
+
+    from app.main import app
+    return app
+
+
+def check(name: str, ok) -> bool:
+    """Print a ✓/✗ line for one check and remember its result."""
+    ok = bool(ok)
+    checks.append(ok)
+    print(f'{"✓" if ok else "✗"} {name}')
+    return ok
+
+
+def finish(summary: str):
+    """Exit with status 1 if any check failed, otherwise print the summary line."""
+    if not all(checks):
+        sys.exit(1)
+    print(f"✓ {summary}")